@@ -4,11 +4,18 @@ Flask Web Application for Viral Video Clip Generator
 
 import os
 import json
-from flask import Flask, render_template, request, jsonify, send_file, url_for
+import time
+from flask import (
+    Flask, Request, Response, render_template, request, jsonify, send_file, stream_with_context, url_for
+)
 from werkzeug.utils import secure_filename
-from viral_analyzer import ViralMomentAnalyzer
-from video_editor import ViralVideoEditor
-from tts_generator import TTSGenerator
+from viral_analyzer import get_shared_analyzer
+from call_policy import LLMCallError
+from job_queue import JobQueue, add_counters
+from upload_store import UploadStore
+from pipeline import JOB_HANDLERS, worker_counters
+from video_editor import RENDER_BACKENDS
+from render_profiles import RENDER_PROFILES, DEFAULT_PROFILE
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,11 +26,29 @@ app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['OUTPUT_FOLDER'] = 'outputs'
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'mp4', 'avi', 'mov', 'mkv', 'webm'}
+app.config['EVENTS_POLL_INTERVAL'] = 0.25  # seconds between job event checks per SSE stream
+app.config['EVENTS_KEEPALIVE'] = 15  # seconds of silence before an SSE keep-alive comment
 
 # Create necessary directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 
+# Pipeline jobs run in worker processes; queued jobs survive restarts
+job_queue = JobQueue(JOB_HANDLERS, counters=worker_counters)
+
+# Uploads are stored once per distinct content, named by their SHA-256
+upload_store = UploadStore(app.config['UPLOAD_FOLDER'])
+
+
+class UploadRequest(Request):
+    """Request that hashes file uploads while writing them to the upload store."""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return upload_store.open_incoming()
+
+
+app.request_class = UploadRequest
+
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
@@ -31,6 +56,62 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 
+def parse_keep_ratio(data):
+    """
+    Read the optional pre-filter keep_ratio from a request body.
+    
+    Returns:
+        keep_ratio as a float, or None if not given
+    
+    Raises:
+        ValueError: If it is not a number in (0, 1]
+    """
+    keep_ratio = data.get('keep_ratio')
+    if keep_ratio is None:
+        return None
+    try:
+        keep_ratio = float(keep_ratio)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid keep_ratio: {keep_ratio!r}')
+    if not 0 < keep_ratio <= 1:
+        raise ValueError(f'keep_ratio must be in (0, 1]: {keep_ratio}')
+    return keep_ratio
+
+
+def parse_count(value, name):
+    """
+    Validate an optional count given in a request body or query string.
+    
+    Returns:
+        Count as an int, or None if not given
+    
+    Raises:
+        ValueError: If it is not an integer of at least 1
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'Invalid {name}: {value!r}')
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError(f'Invalid {name}: {value!r}')
+    if count < 1:
+        raise ValueError(f'{name} must be at least 1: {count}')
+    return count
+
+
+def parse_workers(data):
+    """Read the optional parallel render worker count from a request body."""
+    return parse_count(data.get('workers'), 'workers')
+
+
+@app.before_request
+def start_job_queue():
+    """Start dispatching jobs, including any left queued by a previous run."""
+    job_queue.start()
+
+
 @app.route('/')
 def index():
     """Render the main page."""
@@ -53,11 +134,10 @@ def upload_videos():
     for file in files:
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            stored = upload_store.save(file.stream)
             uploaded_files.append({
                 'filename': filename,
-                'path': filepath
+                **stored
             })
         else:
             return jsonify({'error': f'Invalid file: {file.filename}'}), 400
@@ -85,14 +165,26 @@ def analyze_video():
         return jsonify({'error': 'Transcription required'}), 400
     
     try:
-        analyzer = ViralMomentAnalyzer()
-        viral_moments = analyzer.analyze_transcription(transcription, visuals_description)
+        keep_ratio = parse_keep_ratio(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        analyzer = get_shared_analyzer(
+            use_cache=False if data.get('bypass_cache') else None,
+            backend=data.get('analyzer')
+        )
+        viral_moments = analyzer.analyze_transcription(
+            transcription, visuals_description, keep_ratio=keep_ratio
+        )
         
         return jsonify({
             'success': True,
             'viral_moments': viral_moments
         })
     
+    except LLMCallError as e:
+        return jsonify({'error': str(e), 'error_details': e.to_dict()}), 502
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -109,7 +201,10 @@ def generate_tts_script():
     style = data.get('style', 'engaging')
     
     try:
-        analyzer = ViralMomentAnalyzer()
+        analyzer = get_shared_analyzer(
+            use_cache=False if data.get('bypass_cache') else None,
+            backend=data.get('analyzer')
+        )
         script = analyzer.generate_tts_script(viral_moments, style)
         
         return jsonify({
@@ -117,6 +212,8 @@ def generate_tts_script():
             'script': script
         })
     
+    except LLMCallError as e:
+        return jsonify({'error': str(e), 'error_details': e.to_dict()}), 502
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -132,137 +229,227 @@ def generate_text_overlays():
     viral_moments = data['viral_moments']
     
     try:
-        analyzer = ViralMomentAnalyzer()
-        all_overlays = []
-        
-        for moment in viral_moments:
-            overlays = analyzer.generate_onscreen_text(moment)
-            all_overlays.append(overlays)
+        analyzer = get_shared_analyzer(
+            use_cache=False if data.get('bypass_cache') else None,
+            backend=data.get('analyzer')
+        )
+        all_overlays = analyzer.generate_onscreen_text_batch(viral_moments)
         
         return jsonify({
             'success': True,
             'text_overlays': all_overlays
         })
     
+    except LLMCallError as e:
+        return jsonify({'error': str(e), 'error_details': e.to_dict()}), 502
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/compile', methods=['POST'])
 def compile_video():
-    """Compile viral clips with transitions and text overlays."""
+    """Queue compilation of viral clips with transitions and text overlays."""
     data = request.get_json()
     
     required_fields = ['video_path', 'viral_moments']
-    if not all(field in data for field in required_fields):
+    if not data or not all(field in data for field in required_fields):
         return jsonify({'error': 'Missing required fields'}), 400
     
-    video_path = data['video_path']
-    viral_moments = data['viral_moments']
-    text_overlays = data.get('text_overlays', [])
-    tts_audio_path = data.get('tts_audio_path')
-    output_name = data.get('output_name', 'viral_compilation.mp4')
+    profile = data.get('profile', DEFAULT_PROFILE)
+    if profile not in RENDER_PROFILES:
+        return jsonify({'error': f'Unknown render profile: {profile}'}), 400
+    
+    backend = data.get('backend', 'moviepy')
+    if backend not in RENDER_BACKENDS:
+        return jsonify({'error': f'Unknown render backend: {backend}'}), 400
     
     try:
-        editor = ViralVideoEditor(output_dir=app.config['OUTPUT_FOLDER'])
-        
-        # Create the compilation
-        output_path = editor.create_viral_compilation(
-            video_path,
-            viral_moments,
-            text_overlays,
-            output_name
-        )
-        
-        # Add TTS audio if provided
-        if tts_audio_path and os.path.exists(tts_audio_path):
-            final_output = os.path.join(
-                app.config['OUTPUT_FOLDER'],
-                f"final_{output_name}"
-            )
-            output_path = editor.add_audio_overlay(
-                output_path,
-                tts_audio_path,
-                final_output
-            )
-        
-        return jsonify({
-            'success': True,
-            'output_path': output_path,
-            'download_url': url_for('download_video', filename=os.path.basename(output_path))
-        })
+        workers = parse_workers(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    # Single-pass and ffmpeg renders cut and encode in one go, without the
+    # per-moment clips these options speed up
+    single_pass = bool(data.get('single_pass', False))
+    fast_extract = bool(data.get('fast_extract', False))
+    if (single_pass or backend == 'ffmpeg') and (fast_extract or workers):
+        mode = 'single_pass' if single_pass else 'backend ffmpeg'
+        return jsonify({'error': f'fast_extract and workers cannot be combined with {mode}'}), 400
+    
+    payload = {
+        'video_path': data['video_path'],
+        'viral_moments': data['viral_moments'],
+        'text_overlays': data.get('text_overlays', []),
+        'tts_audio_path': data.get('tts_audio_path'),
+        'output_name': data.get('output_name', 'viral_compilation.mp4'),
+        'fast_extract': fast_extract,
+        'single_pass': single_pass,
+        'workers': workers,
+        'backend': backend,
+        'profile': profile,
+        'preview': bool(data.get('preview', False))
+    }
+    return enqueue_job('compile', payload)
 
 
 @app.route('/process-complete', methods=['POST'])
 def process_complete_workflow():
-    """Process complete workflow: analyze, generate TTS, compile."""
+    """Queue the complete workflow: analyze, generate TTS, compile."""
     data = request.get_json()
     
     required_fields = ['video_path', 'transcription']
-    if not all(field in data for field in required_fields):
+    if not data or not all(field in data for field in required_fields):
         return jsonify({'error': 'Missing required fields'}), 400
     
-    video_path = data['video_path']
-    transcription = data['transcription']
-    visuals_description = data.get('visuals_description', '')
-    tts_style = data.get('tts_style', 'engaging')
-    output_name = data.get('output_name', 'viral_compilation.mp4')
+    profile = data.get('profile', DEFAULT_PROFILE)
+    if profile not in RENDER_PROFILES:
+        return jsonify({'error': f'Unknown render profile: {profile}'}), 400
+    
+    backend = data.get('backend', 'moviepy')
+    if backend not in RENDER_BACKENDS:
+        return jsonify({'error': f'Unknown render backend: {backend}'}), 400
     
     try:
-        # Step 1: Analyze for viral moments
-        analyzer = ViralMomentAnalyzer()
-        viral_moments = analyzer.analyze_transcription(transcription, visuals_description)
-        
-        if not viral_moments:
-            return jsonify({'error': 'No viral moments identified'}), 400
-        
-        # Step 2: Generate text overlays
-        text_overlays = []
-        for moment in viral_moments:
-            overlays = analyzer.generate_onscreen_text(moment)
-            text_overlays.append(overlays)
-        
-        # Step 3: Generate TTS script
-        tts_script = analyzer.generate_tts_script(viral_moments, tts_style)
-        
-        # Step 4: Generate TTS audio
-        tts_generator = TTSGenerator()
-        tts_audio_path = tts_generator.generate_tts(tts_script)
-        
-        # Step 5: Compile video
-        editor = ViralVideoEditor(output_dir=app.config['OUTPUT_FOLDER'])
-        output_path = editor.create_viral_compilation(
-            video_path,
-            viral_moments,
-            text_overlays,
-            output_name
-        )
-        
-        # Step 6: Add TTS audio if generated
-        if tts_audio_path and os.path.exists(tts_audio_path):
-            final_output = os.path.join(
-                app.config['OUTPUT_FOLDER'],
-                f"final_{output_name}"
-            )
-            output_path = editor.add_audio_overlay(
-                output_path,
-                tts_audio_path,
-                final_output
-            )
-        
-        return jsonify({
-            'success': True,
-            'viral_moments': viral_moments,
-            'tts_script': tts_script,
-            'output_path': output_path,
-            'download_url': url_for('download_video', filename=os.path.basename(output_path))
-        })
+        keep_ratio = parse_keep_ratio(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
+    payload = {
+        'video_path': data['video_path'],
+        'transcription': data['transcription'],
+        'visuals_description': data.get('visuals_description', ''),
+        'tts_style': data.get('tts_style', 'engaging'),
+        'output_name': data.get('output_name', 'viral_compilation.mp4'),
+        'single_pass': bool(data.get('single_pass', False)),
+        'backend': backend,
+        'profile': profile,
+        'keep_ratio': keep_ratio,
+        'analyzer': data.get('analyzer'),
+        'bypass_cache': bool(data.get('bypass_cache', False))
+    }
+    return enqueue_job('process-complete', payload)
+
+
+def enqueue_job(kind, payload):
+    """Queue a pipeline job and answer 202 with where to poll it."""
+    payload['output_dir'] = app.config['OUTPUT_FOLDER']
+    try:
+        job_id = job_queue.submit(kind, payload)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('get_job', job_id=job_id),
+        'events_url': url_for('stream_job_events', job_id=job_id)
+    }), 202
+
+
+def job_response(job):
+    """Public view of a job, with a download URL once it has succeeded."""
+    response = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': round(job['progress'], 3),
+        'attempts': job['attempts'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'timings': job_queue.store.timings(job['id']),
+        'error': job['error']
+    }
+    
+    result = job['result']
+    if job['status'] == 'failed':
+        response['error_details'] = result
+    elif result is not None:
+        result = dict(result)
+        if result.get('output_path'):
+            result['download_url'] = url_for(
+                'download_video', filename=os.path.basename(result['output_path'])
+            )
+        response['result'] = result
+    return response
+
+
+@app.route('/jobs')
+def list_jobs():
+    """List recent jobs, optionally filtered by status."""
+    status = request.args.get('status')
+    try:
+        limit = min(parse_count(request.args.get('limit'), 'limit') or 50, 500)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    jobs = job_queue.store.list(status=status, limit=limit)
+    return jsonify({'jobs': [job_response(job) for job in jobs]})
+
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Status, stage progress and result of a job."""
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_response(job))
+
+
+def sse_message(event, data, event_id=None):
+    """Format one Server-Sent Events message."""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+@app.route('/jobs/<job_id>/events')
+def stream_job_events(job_id):
+    """Stream a job's stage and render progress as Server-Sent Events."""
+    if job_queue.store.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # EventSource resends the last id it saw when it reconnects
+    after = request.headers.get('Last-Event-ID') or request.args.get('after') or 0
+    try:
+        after = int(after)
+    except ValueError:
+        after = 0
+    
+    def stream():
+        last_id = after
+        last_sent = time.monotonic()
+        while True:
+            # Read the job before its events: once it has finished, every
+            # event it will ever have is already stored
+            job = job_queue.store.get(job_id)
+            if job is None:
+                # Removed while streaming; end like a failed job so clients stop waiting
+                yield sse_message('failed', {'job_id': job_id, 'status': 'failed', 'error': 'Job not found'})
+                return
+            events = job_queue.store.events(job_id, after=last_id)
+            for event in events:
+                last_id = event['id']
+                yield sse_message(event['type'], event, event['id'])
+            
+            if job['status'] in ('succeeded', 'failed'):
+                yield sse_message(job['status'], job_response(job))
+                return
+            
+            if events:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent > app.config['EVENTS_KEEPALIVE']:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(app.config['EVENTS_POLL_INTERVAL'])
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/download/<filename>')
@@ -279,7 +466,15 @@ def download_video(filename):
 @app.route('/health')
 def health_check():
     """Health check endpoint."""
-    return jsonify({'status': 'healthy'})
+    # Requests answered here plus the recent jobs run by the worker processes
+    counters = add_counters(worker_counters(), job_queue.store.counter_totals())
+    return jsonify({
+        'status': 'healthy',
+        'overlay_cache': counters['overlay_cache'],
+        'groq_calls': counters['groq_calls'],
+        'jobs': job_queue.stats(),
+        'uploads': upload_store.stats()
+    })
 
 
 if __name__ == '__main__':
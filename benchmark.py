@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Benchmark Script for Viral Video Clip Generator
+
+Times the render paths against a synthetic source video, and transcript
+pre-filtering against a synthetic long transcript, so changes can be
+compared without real uploads. The render benchmark requires FFmpeg; the
+load benchmark runs analysis against mock_groq_server.py.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def make_source_video(path, duration=120, size="1280x720", fps=30):
+    """Generate a synthetic test video with a tone as its audio track."""
+    subprocess.run(
+        [
+            'ffmpeg', '-y', '-v', 'error',
+            '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={fps}:duration={duration}',
+            '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+            '-c:v', 'libx264', '-preset', 'veryfast', '-g', str(fps * 2),
+            '-c:a', 'aac', '-shortest', path
+        ],
+        check=True
+    )
+    return path
+
+
+def make_moments(duration, count=5, length=15.0):
+    """Spread evenly spaced moments with overlays across the source."""
+    step = duration / count
+    moments = []
+    overlays = []
+    for i in range(count):
+        start = round(i * step + 1.0, 2)
+        moments.append({
+            'start_time': start,
+            'end_time': min(duration, start + length),
+            'score': 90 - i,
+            'reason': f'Synthetic moment {i + 1}',
+            'hook': 'Watch this!'
+        })
+        overlays.append([
+            {'text': 'WAIT FOR IT...', 'delay': 0, 'duration': 2.0, 'position': 'top'},
+            {'text': f'Moment #{i + 1}', 'delay': 5, 'duration': 2.0, 'position': 'bottom'}
+        ])
+    return moments, overlays
+
+
+FILLER_LINES = [
+    "So anyway, let me go over the next part of the setup",
+    "I'm just going to adjust this a little bit here",
+    "Okay so this is the part where we prepare everything",
+    "Let me check the settings before we continue",
+    "Alright, moving on to the next step of the process"
+]
+
+HYPE_LINES = [
+    "WOW! Did you see that? That is insane!",
+    "Wait for it... BOOM! Incredible!",
+    "This is the craziest thing I have ever seen, watch this!",
+    "No way! That actually worked, unbelievable!"
+]
+
+
+def timestamp(seconds):
+    """Format seconds as [HH:MM:SS]."""
+    seconds = int(seconds)
+    return f"[{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}]"
+
+
+def make_transcript(duration, interval=5, hype_every=120, seed=0):
+    """Generate a long timestamped transcript and visuals, mostly filler."""
+    rng = random.Random(seed)
+    transcript = []
+    visuals = []
+    for t in range(0, duration, interval):
+        if t % hype_every < interval:
+            transcript.append(f"{timestamp(t)} {rng.choice(HYPE_LINES)}")
+            visuals.append(f"{timestamp(t)} Dramatic zoom with quick cuts and a reaction close-up")
+        else:
+            transcript.append(f"{timestamp(t)} {rng.choice(FILLER_LINES)}")
+            if t % 30 == 0:
+                visuals.append(f"{timestamp(t)} Static wide shot of the desk")
+    return '\n'.join(transcript), '\n'.join(visuals)
+
+
+def time_call(label, func):
+    """Run func once and print its wall time."""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:32} {elapsed:8.2f}s")
+    return elapsed
+
+
+def bench_render(args):
+    """Compare the MoviePy and ffmpeg render backends on the same job."""
+    from video_editor import ViralVideoEditor
+    
+    work_dir = tempfile.mkdtemp(prefix='bench_')
+    try:
+        source = make_source_video(os.path.join(work_dir, 'source.mp4'), args.duration)
+        moments, overlays = make_moments(args.duration, args.moments)
+        editor = ViralVideoEditor(output_dir=work_dir)
+        
+        print(f"\nRender benchmark: {args.moments} moments from a {args.duration}s source")
+        results = {
+            'moviepy (multi-pass)': time_call(
+                'moviepy (multi-pass)',
+                lambda: editor.create_viral_compilation(source, moments, overlays, 'multi.mp4')
+            ),
+            'moviepy (single-pass)': time_call(
+                'moviepy (single-pass)',
+                lambda: editor.create_viral_compilation(
+                    source, moments, overlays, 'single.mp4', single_pass=True
+                )
+            ),
+            'ffmpeg filtergraph': time_call(
+                'ffmpeg filtergraph',
+                lambda: editor.create_viral_compilation(
+                    source, moments, overlays, 'ffmpeg.mp4', backend='ffmpeg'
+                )
+            )
+        }
+        
+        baseline = results['moviepy (multi-pass)']
+        print("\nSpeedup vs multi-pass:")
+        for label, elapsed in results.items():
+            print(f"  {label:32} {baseline / elapsed:8.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_analyze(args):
+    """Measure how much the local pre-filter shrinks and speeds up analysis."""
+    from prefilter import prune_transcript
+    
+    transcription, visuals = make_transcript(args.duration)
+    print(f"\nAnalyze benchmark: {args.duration}s transcript, keep ratio {args.keep_ratio}")
+    
+    start = time.perf_counter()
+    pruned, _, stats = prune_transcript(transcription, visuals, args.keep_ratio)
+    elapsed = time.perf_counter() - start
+    print(f"  {'pre-filter':32} {elapsed * 1000:8.1f}ms")
+    print(f"  {'segments kept':32} {stats['kept_segments']:>8}/{stats['segments']}")
+    print(f"  {'pruning ratio':32} {stats['pruning_ratio']:8.1%}")
+    print(f"  {'prompt chars':32} {stats['chars_before']:>8} -> {stats['chars_after']}")
+    
+    from heuristic_analyzer import HeuristicAnalyzer
+    start = time.perf_counter()
+    HeuristicAnalyzer().analyze_transcription(transcription, visuals)
+    elapsed = time.perf_counter() - start
+    print(f"  {'heuristic analyzer (offline)':32} {elapsed * 1000:8.1f}ms")
+    
+    if not os.getenv('GROQ_API_KEY'):
+        print("\nSet GROQ_API_KEY to time end-to-end analysis")
+        return
+    
+    from viral_analyzer import ViralMomentAnalyzer
+    analyzer = ViralMomentAnalyzer(use_cache=False)
+    full = time_call(
+        'analyze (full transcript)',
+        lambda: analyzer.analyze_transcription(transcription, visuals, keep_ratio=1.0)
+    )
+    filtered = time_call(
+        'analyze (pre-filtered)',
+        lambda: analyzer.analyze_transcription(transcription, visuals, keep_ratio=args.keep_ratio)
+    )
+    print(f"\nLatency reduction: {1 - filtered / full:.1%}")
+
+
+def bench_load(args):
+    """Fire concurrent analysis requests at a local mock Groq server."""
+    import statistics
+    from concurrent.futures import ThreadPoolExecutor
+    from mock_groq_server import serve
+    
+    server = serve(
+        port=0, latency=args.latency, latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate, seed=0
+    )
+    os.environ['GROQ_BASE_URL'] = f"http://127.0.0.1:{server.server_port}"
+    work_dir = tempfile.mkdtemp(prefix='bench_')
+    
+    from llm_cache import ResponseCache
+    from viral_analyzer import ViralMomentAnalyzer
+    
+    try:
+        analyzer = ViralMomentAnalyzer(
+            api_key='mock',
+            cache=ResponseCache(os.path.join(work_dir, 'cache.sqlite3')),
+            use_cache=args.cache
+        )
+        transcripts = [make_transcript(600, seed=i % args.unique)[0] for i in range(args.requests)]
+        
+        def run(transcription):
+            start = time.perf_counter()
+            moments = analyzer.analyze_transcription(transcription)
+            analyzer.generate_moment_content(moments)
+            return time.perf_counter() - start
+        
+        print(f"\nLoad benchmark: {args.requests} jobs, concurrency {args.concurrency}, "
+              f"latency {args.latency}s, error rate {args.error_rate:.0%}")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            latencies = sorted(executor.map(run, transcripts))
+        elapsed = time.perf_counter() - start
+        
+        print(f"  {'wall time':32} {elapsed:8.2f}s")
+        print(f"  {'throughput':32} {args.requests / elapsed:8.2f} jobs/s")
+        print(f"  {'p50 job latency':32} {statistics.median(latencies):8.2f}s")
+        print(f"  {'p95 job latency':32} {latencies[int(0.95 * (len(latencies) - 1))]:8.2f}s")
+        print(f"  {'server requests':32} {server.mock.stats['requests']:>8}")
+        print(f"  {'server errors':32} {server.mock.stats['errors']:>8}")
+        print(f"  {'peak in-flight requests':32} {server.mock.stats['max_in_flight']:>8}")
+        if analyzer.cache is not None:
+            print(f"  {'cache hits/misses':32} {analyzer.cache.hits:>8}/{analyzer.cache.misses}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the viral clip pipeline')
+    subparsers = parser.add_subparsers(dest='command', help='Benchmark to run')
+    
+    render_parser = subparsers.add_parser('render', help='Compare render backends')
+    render_parser.add_argument('--duration', type=int, default=120, help='Source length in seconds')
+    render_parser.add_argument('--moments', type=int, default=5, help='Number of moments')
+    
+    analyze_parser = subparsers.add_parser('analyze', help='Measure transcript pre-filtering')
+    analyze_parser.add_argument('--duration', type=int, default=7200, help='Transcript length in seconds')
+    analyze_parser.add_argument('--keep-ratio', type=float, default=0.2,
+                                help='Fraction of segments the pre-filter keeps')
+    
+    load_parser = subparsers.add_parser('load', help='Load test analysis against a mock Groq server')
+    load_parser.add_argument('--requests', type=int, default=40, help='Number of jobs')
+    load_parser.add_argument('--concurrency', type=int, default=8, help='Concurrent jobs')
+    load_parser.add_argument('--unique', type=int, default=10, help='Distinct transcripts (repeats hit the cache)')
+    load_parser.add_argument('--latency', type=float, default=0.5, help='Median mock latency in seconds')
+    load_parser.add_argument('--latency-sigma', type=float, default=0.5, help='Log-normal latency spread')
+    load_parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of mock requests that fail')
+    load_parser.add_argument('--no-cache', dest='cache', action='store_false', help='Disable the response cache')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'render':
+        bench_render(args)
+    elif args.command == 'analyze':
+        bench_analyze(args)
+    elif args.command == 'load':
+        bench_load(args)
+    else:
+        parser.print_help()
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""
+Call Policy Module
+Deadlines, retries with backoff and hedged requests for Groq calls.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+from groq import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+
+# Attempts run here when they may be hedged, so the caller can wait on two at once
+_attempt_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix='groq-call')
+
+
+class LLMCallError(Exception):
+    """A Groq call that failed for good, with what went wrong and how often it was tried."""
+    
+    def __init__(self, kind: str, message: str, retryable: bool = False,
+                 status_code: int = None, attempts: int = 1, elapsed: float = 0.0):
+        """
+        Initialize the error.
+        
+        Args:
+            kind: One of timeout, connection, rate_limit, server, client, parse,
+                deadline or unknown
+            message: Underlying error message
+            retryable: Whether another attempt could succeed
+            status_code: HTTP status, if the API answered
+            attempts: Attempts made before giving up
+            elapsed: Seconds spent across all attempts
+        """
+        super().__init__(message)
+        self.kind = kind
+        self.message = message
+        self.retryable = retryable
+        self.status_code = status_code
+        self.attempts = attempts
+        self.elapsed = elapsed
+    
+    def __str__(self) -> str:
+        status = f" (HTTP {self.status_code})" if self.status_code else ""
+        return (f"{self.kind}{status} after {self.attempts} attempt(s) in "
+                f"{self.elapsed:.1f}s: {self.message}")
+    
+    def to_dict(self) -> Dict:
+        """Error fields as a JSON-serializable dict."""
+        return {
+            'kind': self.kind,
+            'message': self.message,
+            'status_code': self.status_code,
+            'attempts': self.attempts,
+            'elapsed': round(self.elapsed, 3)
+        }
+
+
+def classify_error(error: Exception) -> LLMCallError:
+    """
+    Map an exception from a call attempt to an LLMCallError.
+    
+    Timeouts, connection errors, rate limits, 5xx responses and unparseable
+    replies are retryable; other 4xx responses and unknown errors are not.
+    
+    Args:
+        error: Exception raised by the attempt
+    
+    Returns:
+        LLMCallError describing it
+    """
+    if isinstance(error, LLMCallError):
+        return error
+    if isinstance(error, APITimeoutError):
+        return LLMCallError('timeout', str(error), retryable=True)
+    if isinstance(error, APIConnectionError):
+        return LLMCallError('connection', str(error), retryable=True)
+    if isinstance(error, RateLimitError):
+        return LLMCallError('rate_limit', str(error), retryable=True, status_code=429)
+    if isinstance(error, APIStatusError):
+        kind = 'server' if error.status_code >= 500 else 'client'
+        return LLMCallError(kind, str(error), retryable=kind == 'server', status_code=error.status_code)
+    if isinstance(error, ValueError):
+        # Includes json.JSONDecodeError; a resample usually parses
+        return LLMCallError('parse', str(error), retryable=True)
+    return LLMCallError('unknown', f"{type(error).__name__}: {error}")
+
+
+class CallPolicy:
+    """Runs a call under a deadline with retries, backoff and optional hedging."""
+    
+    def __init__(self, deadline: float = None, attempt_timeout: float = None,
+                 max_retries: int = None, backoff_base: float = None,
+                 backoff_max: float = None, hedge_percentile: float = None,
+                 hedge_after: float = None, min_samples: int = 20):
+        """
+        Initialize the policy.
+        
+        Args:
+            deadline: Total seconds allowed for a call including retries.
+                If None, uses GROQ_DEADLINE (default 90).
+            attempt_timeout: Seconds allowed per attempt. If None, uses
+                GROQ_TIMEOUT (default 60).
+            max_retries: Retries after the first attempt. If None, uses
+                GROQ_MAX_RETRIES (default 3).
+            backoff_base: First backoff in seconds, doubled per retry with full
+                jitter. If None, uses GROQ_BACKOFF_BASE (default 0.5).
+            backoff_max: Backoff cap in seconds. If None, uses GROQ_BACKOFF_MAX (default 8).
+            hedge_percentile: Send a duplicate request once an attempt is slower
+                than this percentile of recent latencies (0 disables). If None,
+                uses GROQ_HEDGE_PERCENTILE (default 95).
+            hedge_after: Fixed hedge delay in seconds, overriding the percentile.
+                If None, uses GROQ_HEDGE_AFTER when set.
+            min_samples: Latencies observed before percentile hedging starts
+        """
+        self.deadline = deadline or float(os.getenv('GROQ_DEADLINE', '90'))
+        self.attempt_timeout = attempt_timeout or float(os.getenv('GROQ_TIMEOUT', '60'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('GROQ_MAX_RETRIES', '3'))
+        self.backoff_base = backoff_base or float(os.getenv('GROQ_BACKOFF_BASE', '0.5'))
+        self.backoff_max = backoff_max or float(os.getenv('GROQ_BACKOFF_MAX', '8'))
+        if hedge_percentile is None:
+            hedge_percentile = float(os.getenv('GROQ_HEDGE_PERCENTILE', '95'))
+        self.hedge_percentile = hedge_percentile
+        if hedge_after is None and os.getenv('GROQ_HEDGE_AFTER'):
+            hedge_after = float(os.getenv('GROQ_HEDGE_AFTER'))
+        self.hedge_after = hedge_after
+        self.min_samples = min_samples
+        
+        self._latencies = deque(maxlen=200)
+        self._errors = deque(maxlen=20)
+        self._counters = {'calls': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0}
+        self._failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def call(self, attempt: Callable[[float], object], label: str = 'groq call', hedge: bool = True):
+        """
+        Run attempt(timeout) until it succeeds, fails for good or the deadline passes.
+        
+        Args:
+            attempt: Callable taking the per-attempt timeout in seconds
+            label: Name recorded with errors
+            hedge: Allow hedged duplicates (off for streamed responses, whose
+                losing stream would be left open)
+        
+        Returns:
+            Result of the first successful attempt
+        
+        Raises:
+            LLMCallError: When the call cannot succeed within the policy
+        """
+        with self._lock:
+            self._counters['calls'] += 1
+        
+        start = time.monotonic()
+        attempts = 0
+        while True:
+            remaining = self.deadline - (time.monotonic() - start)
+            if remaining <= 0:
+                raise self._fail(
+                    LLMCallError('deadline', f"no response within {self.deadline:.0f}s"),
+                    label, attempts, start
+                )
+            
+            attempts += 1
+            try:
+                return self._attempt(attempt, min(self.attempt_timeout, remaining), hedge)
+            except Exception as e:
+                error = classify_error(e)
+                if not error.retryable or attempts > self.max_retries:
+                    raise self._fail(error, label, attempts, start) from e
+                
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)))
+                if time.monotonic() - start + delay >= self.deadline:
+                    raise self._fail(error, label, attempts, start) from e
+                
+                with self._lock:
+                    self._counters['retries'] += 1
+                print(f"Retrying {label} in {delay:.1f}s after {error.kind}: {error.message}")
+                time.sleep(delay)
+    
+    def _attempt(self, attempt: Callable[[float], object], timeout: float, hedge: bool = True):
+        """Run one attempt, hedging it with a duplicate if it runs long."""
+        hedge_delay = self.hedge_delay() if hedge else None
+        started = time.monotonic()
+        
+        if hedge_delay is None or hedge_delay >= timeout:
+            result = attempt(timeout)
+            self._record_latency(time.monotonic() - started)
+            return result
+        
+        primary = _attempt_pool.submit(attempt, timeout)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if not done:
+            with self._lock:
+                self._counters['hedges'] += 1
+            duplicate = _attempt_pool.submit(attempt, timeout - hedge_delay)
+            pending = {primary, duplicate}
+            error = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    # The slower request is left to finish in the background
+                    with self._lock:
+                        if future is duplicate:
+                            self._counters['hedge_wins'] += 1
+                    self._record_latency(time.monotonic() - started)
+                    return result
+            raise error
+        
+        result = primary.result()
+        self._record_latency(time.monotonic() - started)
+        return result
+    
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Seconds to wait before sending a duplicate request.
+        
+        Returns:
+            Fixed hedge_after if set, else the hedge_percentile of recent
+            latencies once min_samples are known, else None (no hedging)
+        """
+        if self.hedge_after is not None:
+            return self.hedge_after
+        if not self.hedge_percentile:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * self.hedge_percentile / 100))
+        return latencies[index]
+    
+    def _record_latency(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+    
+    def _fail(self, error: LLMCallError, label: str, attempts: int, start: float) -> LLMCallError:
+        """Stamp attempts and elapsed time on a final error and record it."""
+        error.attempts = attempts
+        error.elapsed = time.monotonic() - start
+        with self._lock:
+            self._failures[error.kind] = self._failures.get(error.kind, 0) + 1
+            self._errors.append({'call': label, 'time': time.time(), **error.to_dict()})
+        return error
+    
+    def stats(self) -> Dict:
+        """Call, retry, hedge and failure counters, latency percentiles and recent errors."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self._counters)
+            stats['failures'] = dict(self._failures)
+            stats['recent_errors'] = list(self._errors)
+        
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))], 3)
+        
+        stats['latency_p50'] = percentile(50)
+        stats['latency_p95'] = percentile(95)
+        stats['hedge_delay'] = self.hedge_delay()
+        return stats
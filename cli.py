@@ -4,10 +4,24 @@ Command Line Interface for Viral Video Clip Generator
 
 import argparse
 import os
+import shutil
 import sys
-from viral_analyzer import ViralMomentAnalyzer
-from video_editor import ViralVideoEditor
+import tempfile
+from viral_analyzer import ANALYZER_BACKENDS, create_analyzer
+from video_editor import RENDER_BACKENDS, ViralVideoEditor
 from tts_generator import TTSGenerator
+from render_profiles import RENDER_PROFILES, DEFAULT_PROFILE
+
+
+def keep_ratio(value):
+    """Parse --keep-ratio as a fraction in (0, 1]."""
+    try:
+        ratio = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid keep ratio: {value!r}")
+    if not 0 < ratio <= 1:
+        raise argparse.ArgumentTypeError(f"keep ratio must be in (0, 1]: {value}")
+    return ratio
 
 
 def main():
@@ -35,6 +49,11 @@ Examples:
     analyze_parser.add_argument('--transcription', '-t', required=True, help='Path to transcription file')
     analyze_parser.add_argument('--visuals', '-v', help='Path to visual descriptions file')
     analyze_parser.add_argument('--output', '-o', default='viral_moments.json', help='Output JSON file')
+    analyze_parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM response cache')
+    analyze_parser.add_argument('--analyzer', default=None, choices=ANALYZER_BACKENDS,
+                               help='Analysis backend (heuristic runs offline without an API key)')
+    analyze_parser.add_argument('--keep-ratio', type=keep_ratio,
+                               help='Fraction of transcript segments to send to the LLM after local pre-filtering')
     
     # Process command (complete workflow)
     process_parser = subparsers.add_parser('process', help='Complete processing workflow')
@@ -46,7 +65,26 @@ Examples:
                                choices=['engaging', 'dramatic', 'casual'], 
                                help='TTS narration style')
     process_parser.add_argument('--no-tts', action='store_true', help='Skip TTS generation')
+    process_parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM response cache')
+    process_parser.add_argument('--analyzer', default=None, choices=ANALYZER_BACKENDS,
+                               help='Analysis backend (heuristic runs offline without an API key)')
+    process_parser.add_argument('--keep-ratio', type=keep_ratio,
+                               help='Fraction of transcript segments to send to the LLM after local pre-filtering')
     process_parser.add_argument('--no-transitions', action='store_true', help='Skip transitions')
+    process_parser.add_argument('--stream', action='store_true',
+                               help='Stream moments from the model and cut each clip as it arrives')
+    process_parser.add_argument('--fast-cut', action='store_true',
+                               help='Cut on keyframes with stream copy instead of re-encoding')
+    process_parser.add_argument('--single-pass', action='store_true',
+                               help='Render clips, overlays and narration with a single encode')
+    process_parser.add_argument('--workers', '-w', type=int, default=None,
+                               help='Render moments in parallel with this many processes')
+    process_parser.add_argument('--backend', '-b', default='moviepy',
+                               choices=RENDER_BACKENDS,
+                               help='Render backend (ffmpeg runs one filtergraph, no Python frames)')
+    process_parser.add_argument('--profile', '-p', default=DEFAULT_PROFILE,
+                               choices=list(RENDER_PROFILES),
+                               help='Render profile (draft renders fast previews)')
     
     # TTS command
     tts_parser = subparsers.add_parser('tts', help='Generate TTS script')
@@ -55,6 +93,9 @@ Examples:
                            choices=['engaging', 'dramatic', 'casual'],
                            help='TTS style')
     tts_parser.add_argument('--output', '-o', default='tts_script.txt', help='Output text file')
+    tts_parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM response cache')
+    tts_parser.add_argument('--analyzer', default=None, choices=ANALYZER_BACKENDS,
+                           help='Analysis backend (heuristic runs offline without an API key)')
     
     # Compile command
     compile_parser = subparsers.add_parser('compile', help='Compile viral clips')
@@ -62,6 +103,18 @@ Examples:
     compile_parser.add_argument('--moments', '-m', required=True, help='Path to viral moments JSON')
     compile_parser.add_argument('--output', '-o', default='compilation.mp4', help='Output video file')
     compile_parser.add_argument('--no-transitions', action='store_true', help='Skip transitions')
+    compile_parser.add_argument('--fast-cut', action='store_true',
+                               help='Cut on keyframes with stream copy instead of re-encoding')
+    compile_parser.add_argument('--workers', '-w', type=int, default=None,
+                               help='Render moments in parallel with this many processes')
+    compile_parser.add_argument('--backend', '-b', default='moviepy',
+                               choices=RENDER_BACKENDS,
+                               help='Render backend (ffmpeg runs one filtergraph, no Python frames)')
+    compile_parser.add_argument('--profile', '-p', default=DEFAULT_PROFILE,
+                               choices=list(RENDER_PROFILES),
+                               help='Render profile (draft renders fast previews)')
+    compile_parser.add_argument('--preview', action='store_true',
+                               help='Render a quick low-resolution preview from a cached proxy')
     
     args = parser.parse_args()
     
@@ -69,6 +122,14 @@ Examples:
         parser.print_help()
         return
     
+    # Single-pass and ffmpeg renders cut and encode in one go, without the
+    # per-moment clips these options speed up
+    if args.command in ('process', 'compile'):
+        one_pass = args.backend == 'ffmpeg' or getattr(args, 'single_pass', False)
+        if one_pass and (args.fast_cut or args.workers):
+            mode = '--single-pass' if getattr(args, 'single_pass', False) else '--backend ffmpeg'
+            parser.error(f"--fast-cut and --workers cannot be combined with {mode}")
+    
     try:
         if args.command == 'analyze':
             analyze_command(args)
@@ -100,8 +161,8 @@ def analyze_command(args):
             visuals = f.read()
     
     # Analyze
-    analyzer = ViralMomentAnalyzer()
-    viral_moments = analyzer.analyze_transcription(transcription, visuals)
+    analyzer = create_analyzer(args.analyzer, use_cache=False if args.no_cache else None)
+    viral_moments = analyzer.analyze_transcription(transcription, visuals, keep_ratio=args.keep_ratio)
     
     # Save results
     with open(args.output, 'w') as f:
@@ -135,48 +196,74 @@ def process_command(args):
     
     # Step 1: Analyze
     print("\n🔍 Step 1: Analyzing for viral moments...")
-    analyzer = ViralMomentAnalyzer()
-    viral_moments = analyzer.analyze_transcription(transcription, visuals)
+    analyzer = create_analyzer(args.analyzer, use_cache=False if args.no_cache else None)
+    editor = ViralVideoEditor(profile=args.profile)
+    if args.stream and hasattr(analyzer, 'stream_viral_moments'):
+        # Cut each clip as soon as its moment is generated
+        viral_moments, render_moments = editor.prefetch_clips(
+            args.video, analyzer.stream_viral_moments(transcription, visuals, keep_ratio=args.keep_ratio)
+        )
+    else:
+        viral_moments = analyzer.analyze_transcription(transcription, visuals, keep_ratio=args.keep_ratio)
+        render_moments = viral_moments
     print(f"   Found {len(viral_moments)} viral moments")
     
-    # Step 2: Generate text overlays
+    # Steps 2-3: Generate text overlays and TTS script concurrently
     print("\n📝 Step 2: Generating on-screen text...")
-    text_overlays = []
-    for moment in viral_moments:
-        overlays = analyzer.generate_onscreen_text(moment)
-        text_overlays.append(overlays)
-    
-    # Step 3: Generate TTS
-    tts_audio_path = None
     if not args.no_tts:
-        print(f"\n🎙️ Step 3: Generating TTS script ({args.style})...")
-        tts_script = analyzer.generate_tts_script(viral_moments, args.style)
-        print(f"   Script: {tts_script[:100]}...")
-        
-        tts_generator = TTSGenerator()
-        tts_audio_path = tts_generator.generate_tts(tts_script)
-        if tts_audio_path:
-            print(f"   Audio saved to: {tts_audio_path}")
-    
-    # Step 4: Compile video
-    print("\n🎬 Step 4: Compiling viral clips...")
-    editor = ViralVideoEditor()
-    output_path = editor.create_viral_compilation(
-        args.video,
-        viral_moments,
-        text_overlays,
-        args.output
+        print(f"🎙️ Step 3: Generating TTS script ({args.style})...")
+    text_overlays, tts_script = analyzer.generate_moment_content(
+        viral_moments, args.style, include_tts=not args.no_tts
     )
     
-    # Step 5: Add TTS if generated
-    if tts_audio_path and os.path.exists(tts_audio_path):
-        print("\n🔊 Step 5: Adding TTS narration...")
-        final_output = args.output.replace('.mp4', '_final.mp4')
-        output_path = editor.add_audio_overlay(
-            output_path,
-            tts_audio_path,
-            final_output
-        )
+    # Narration is only an intermediate; keep it out of the output directory
+    tts_dir = tempfile.mkdtemp(prefix='tts_', dir=editor.scratch_dir)
+    try:
+        tts_audio_path = None
+        if not args.no_tts:
+            print(f"   Script: {tts_script[:100]}...")
+            
+            tts_generator = TTSGenerator(output_dir=tts_dir)
+            tts_audio_path = tts_generator.generate_tts(tts_script)
+        
+        has_audio = bool(tts_audio_path and os.path.exists(tts_audio_path))
+        
+        # Step 4: Compile video
+        print("\n🎬 Step 4: Compiling viral clips...")
+        mixes_audio = args.single_pass or args.backend == 'ffmpeg'
+        if mixes_audio:
+            output_path = editor.create_viral_compilation(
+                args.video,
+                render_moments,
+                text_overlays,
+                args.output.replace('.mp4', '_final.mp4') if has_audio else args.output,
+                single_pass=args.single_pass,
+                audio_path=tts_audio_path if has_audio else None,
+                backend=args.backend
+            )
+        else:
+            output_path = editor.create_viral_compilation(
+                args.video,
+                render_moments,
+                text_overlays,
+                args.output,
+                fast_extract=args.fast_cut,
+                workers=args.workers
+            )
+        
+        # Step 5: Add TTS if generated
+        if has_audio and not mixes_audio:
+            print("\n🔊 Step 5: Adding TTS narration...")
+            final_output = args.output.replace('.mp4', '_final.mp4')
+            output_path = editor.add_audio_overlay(
+                output_path,
+                tts_audio_path,
+                final_output
+            )
+    
+    finally:
+        editor.cleanup_prefetched(render_moments)
+        shutil.rmtree(tts_dir, ignore_errors=True)
     
     print(f"\n✅ Complete! Video saved to: {output_path}")
 
@@ -190,7 +277,7 @@ def tts_command(args):
         viral_moments = json.load(f)
     
     # Generate script
-    analyzer = ViralMomentAnalyzer()
+    analyzer = create_analyzer(args.analyzer, use_cache=False if args.no_cache else None)
     script = analyzer.generate_tts_script(viral_moments, args.style)
     
     # Save script
@@ -213,12 +300,16 @@ def compile_command(args):
     print(f"Compiling {len(viral_moments)} clips from: {args.video}")
     
     # Compile
-    editor = ViralVideoEditor()
-    output_path = editor.create_viral_compilation(
+    editor = ViralVideoEditor(profile=args.profile)
+    compile_fn = editor.create_preview if args.preview else editor.create_viral_compilation
+    output_path = compile_fn(
         args.video,
         viral_moments,
         [],  # No text overlays in simple compile
-        args.output
+        args.output,
+        fast_extract=args.fast_cut,
+        workers=args.workers,
+        backend=args.backend
     )
     
     print(f"✅ Compilation saved to: {output_path}")
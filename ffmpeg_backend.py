@@ -0,0 +1,198 @@
+"""
+FFmpeg Backend Module
+Translates a compilation description into a single ffmpeg filter_complex run.
+"""
+
+import os
+import json
+import subprocess
+from typing import List, Dict, Optional
+
+
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = os.getenv('FFPROBE_BINARY', 'ffprobe')
+
+
+def probe_media(path: str) -> Dict:
+    """
+    Read the stream layout of a media file.
+    
+    Args:
+        path: Path to media file
+    
+    Returns:
+        Dict with width, height, fps, has_audio and duration
+    """
+    result = subprocess.run(
+        [
+            FFPROBE_BINARY, '-v', 'error',
+            '-show_entries', 'stream=codec_type,width,height,avg_frame_rate:format=duration',
+            '-of', 'json', path
+        ],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.strip()}")
+    
+    probe = json.loads(result.stdout or '{}')
+    streams = probe.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+    
+    fps = None
+    rate = video.get('avg_frame_rate', '0/0')
+    num, _, den = rate.partition('/')
+    if num and den and float(den):
+        fps = float(num) / float(den)
+    
+    return {
+        'width': int(video.get('width') or 0),
+        'height': int(video.get('height') or 0),
+        'fps': fps,
+        'has_audio': any(s.get('codec_type') == 'audio' for s in streams),
+        'duration': float(probe.get('format', {}).get('duration') or 0.0)
+    }
+
+
+def run_ffmpeg(command: List[str]) -> None:
+    """
+    Run an ffmpeg command, raising with its stderr on failure.
+    
+    Args:
+        command: Full argument list including the binary
+    """
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-2000:]}")
+
+
+def build_compilation_command(segments: List[Dict], output_path: str,
+                              narration_path: Optional[str] = None,
+                              audio_volume: float = 0.5, video_volume: float = 0.3,
+                              add_transitions: bool = True,
+                              transition_duration: float = 0.5,
+                              text_fade_duration: float = 0.3,
+                              fps: float = 24,
+                              encoder_args: List[str] = None) -> List[str]:
+    """
+    Build one ffmpeg invocation rendering a whole compilation.
+    
+    Each segment is seeked in its source, overlaid with its pre-rendered
+    text images, faded, padded to a common canvas and concatenated; the
+    narration (if any) is mixed in with the same volumes as the MoviePy path.
+    
+    Args:
+        segments: Segment descriptions, each with video_path, start_time,
+            end_time, width, height, has_audio and overlays (image_path, x, y,
+            start, end)
+        output_path: Path for output video
+        narration_path: Optional narration audio to mix in
+        audio_volume: Volume of narration audio (0-1)
+        video_volume: Volume of original audio when narration is mixed in (0-1)
+        add_transitions: Whether to fade each segment in and out
+        transition_duration: Duration of transitions
+        text_fade_duration: Fade in/out duration of text overlays
+        fps: Output frame rate
+        encoder_args: Output encoder arguments (defaults to libx264/aac)
+    
+    Returns:
+        Argument list for subprocess
+    """
+    inputs: List[str] = []
+    input_paths: List[str] = []
+    filters: List[str] = []
+    
+    def add_input(path: str, *options: str) -> int:
+        inputs.extend(list(options) + ['-i', path])
+        input_paths.append(path)
+        return len(input_paths) - 1
+    
+    canvas_w = max(segment['width'] for segment in segments)
+    canvas_h = max(segment['height'] for segment in segments)
+    canvas_w += canvas_w % 2
+    canvas_h += canvas_h % 2
+    
+    concat_inputs = []
+    for i, segment in enumerate(segments):
+        start, end = segment['start_time'], segment['end_time']
+        length = end - start
+        
+        # Input-level seeking: each segment gets its own demuxer positioned
+        # at the cut, so nothing before it is decoded
+        source = add_input(
+            segment['video_path'],
+            '-ss', f"{start:.6f}", '-t', f"{length:.6f}"
+        )
+        
+        video_label = f"v{i}"
+        filters.append(
+            f"[{source}:v]setpts=PTS-STARTPTS,fps={fps},format=yuv420p[{video_label}]"
+        )
+        
+        for j, overlay in enumerate(segment.get('overlays', [])):
+            shown = overlay['end'] - overlay['start']
+            if shown <= 0:
+                continue
+            image = add_input(
+                overlay['image_path'],
+                '-loop', '1', '-framerate', str(fps), '-t', f"{shown:.6f}"
+            )
+            fade = min(text_fade_duration, shown / 2)
+            filters.append(
+                f"[{image}:v]format=rgba,"
+                f"fade=t=in:st=0:d={fade:.3f}:alpha=1,"
+                f"fade=t=out:st={shown - fade:.6f}:d={fade:.3f}:alpha=1,"
+                f"setpts=PTS-STARTPTS+{overlay['start']:.6f}/TB[t{i}_{j}]"
+            )
+            filters.append(
+                f"[{video_label}][t{i}_{j}]overlay=x={overlay['x']}:y={overlay['y']}:"
+                f"eof_action=pass:enable='between(t,{overlay['start']:.6f},{overlay['end']:.6f})'"
+                f"[v{i}_{j}]"
+            )
+            video_label = f"v{i}_{j}"
+        
+        chain = []
+        if add_transitions:
+            chain.append(f"fade=t=in:st=0:d={transition_duration}")
+            chain.append(
+                f"fade=t=out:st={max(0.0, length - transition_duration):.6f}:d={transition_duration}"
+            )
+        if (segment['width'], segment['height']) != (canvas_w, canvas_h):
+            chain.append(f"pad={canvas_w}:{canvas_h}:(ow-iw)/2:(oh-ih)/2")
+        chain.append('setsar=1')
+        filters.append(f"[{video_label}]{','.join(chain)}[vs{i}]")
+        
+        if segment['has_audio']:
+            filters.append(
+                f"[{source}:a]asetpts=PTS-STARTPTS,"
+                f"aresample=44100,aformat=channel_layouts=stereo[as{i}]"
+            )
+        else:
+            filters.append(
+                f"anullsrc=r=44100:cl=stereo,atrim=duration={length:.6f}[as{i}]"
+            )
+        concat_inputs.append(f"[vs{i}][as{i}]")
+    
+    filters.append(
+        f"{''.join(concat_inputs)}concat=n={len(segments)}:v=1:a=1[vout][acat]"
+    )
+    
+    audio_label = 'acat'
+    if narration_path:
+        narration = add_input(narration_path)
+        filters.append(f"[acat]volume={video_volume}[orig]")
+        filters.append(f"[{narration}:a]volume={audio_volume}[nar]")
+        filters.append("[orig][nar]amix=inputs=2:duration=first:normalize=0[aout]")
+        audio_label = 'aout'
+    
+    if encoder_args is None:
+        encoder_args = ['-c:v', 'libx264', '-c:a', 'aac']
+    
+    return (
+        [FFMPEG_BINARY, '-y', '-v', 'error']
+        + inputs
+        + ['-filter_complex', ';'.join(filters),
+           '-map', '[vout]', '-map', f"[{audio_label}]"]
+        + encoder_args
+        + ['-r', str(fps), '-movflags', '+faststart', output_path]
+    )
@@ -0,0 +1,178 @@
+"""
+Heuristic Analyzer Module
+Offline, deterministic stand-in for the Groq analyzer.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from prefilter import score_segments, smooth_scores
+from transcript_index import TranscriptIndex
+
+
+HOOKS = [
+    "Watch what happens next!",
+    "Wait for it...",
+    "You won't believe this!",
+    "This changes everything!",
+    "Don't blink!"
+]
+
+TTS_TEMPLATES = {
+    'engaging': "Get ready, because these are the moments everyone is talking about. {hooks} Stick around until the end!",
+    'dramatic': "Some moments change everything. {hooks} What comes next will leave you speechless.",
+    'casual': "Okay, so check these out. {hooks} Pretty wild, right?"
+}
+
+
+class HeuristicAnalyzer:
+    """
+    Finds viral moments with local transcript scoring instead of an LLM.
+    
+    Exposes the same methods and return shapes as ViralMomentAnalyzer, so
+    either can be used by the CLI, the API or as a fallback. Results are
+    deterministic and take milliseconds, with no network or API key.
+    """
+    
+    def __init__(self, moment_length: float = 15.0, lead_in: float = 3.0, max_moments: int = 5):
+        """
+        Initialize the heuristic analyzer.
+        
+        Args:
+            moment_length: Length of each returned moment in seconds
+            lead_in: Seconds included before the peak segment
+            max_moments: Maximum number of moments returned
+        """
+        self.moment_length = moment_length
+        self.lead_in = lead_in
+        self.max_moments = max_moments
+        self.max_concurrency = 1
+    
+    def analyze_transcription(self, transcription: str, visuals_description: str = "",
+                              long_input: bool = None, keep_ratio: float = None) -> List[Dict]:
+        """
+        Identify viral moments from transcript and visual scores.
+        
+        Args:
+            transcription: Transcription with timestamps in format "[00:00:00] text"
+            visuals_description: Description of visual elements with timestamps
+            long_input: Accepted for compatibility; scoring is always linear
+            keep_ratio: Accepted for compatibility; every segment is scored
+        
+        Returns:
+            List of viral moments with start_time, end_time, score, reason and hook
+        """
+        transcript = TranscriptIndex.parse(transcription)
+        if not transcript.has_timestamps:
+            print("Heuristic analysis needs a timestamped transcription")
+            return []
+        
+        visuals = TranscriptIndex.parse(visuals_description)
+        if not visuals.has_timestamps:
+            visuals = None
+        
+        ranking = smooth_scores(transcript, score_segments(transcript, visuals))
+        peak = ranking.max()
+        if peak <= 0:
+            return []
+        
+        viral_moments = []
+        for i in np.argsort(-ranking, kind='stable'):
+            if len(viral_moments) >= self.max_moments or ranking[i] <= 0:
+                break
+            
+            start = transcript.snap(max(0.0, transcript.starts[i] - self.lead_in))
+            end = min(start + self.moment_length, transcript.duration)
+            if end - start < self.moment_length:
+                # Peak near the end of the source: move the moment back instead
+                start = transcript.snap(max(0.0, end - self.moment_length))
+            if end - start < self.moment_length / 2:
+                continue
+            if any(start < m['end_time'] and m['start_time'] < end for m in viral_moments):
+                continue
+            
+            viral_moments.append({
+                'start_time': start,
+                'end_time': end,
+                'score': int(round(40 + 59 * ranking[i] / peak)),
+                'reason': self._reason(transcript, visuals, int(i)),
+                'hook': HOOKS[len(viral_moments) % len(HOOKS)]
+            })
+        
+        return viral_moments
+    
+    @staticmethod
+    def _reason(transcript: TranscriptIndex, visuals: Optional[TranscriptIndex], i: int) -> str:
+        """Describe why a segment scored well, quoting its line and visuals."""
+        line = transcript.text(i)
+        if len(line) > 80:
+            line = line[:77] + '...'
+        reason = f'High-energy line "{line}"'
+        
+        if visuals is not None:
+            events = visuals.overlapping(transcript.starts[i], transcript.end_of(i))
+            if events:
+                reason += f" with {visuals.text(events[0]).lower().rstrip('.')}"
+        return reason
+    
+    def generate_tts_script(self, viral_moments: List[Dict], style: str = "engaging") -> str:
+        """
+        Build a TTS script from the moments' hooks.
+        
+        Args:
+            viral_moments: List of identified viral moments
+            style: Style of narration (engaging, dramatic, casual)
+        
+        Returns:
+            TTS script text
+        """
+        hooks = ' '.join(m.get('hook', 'Watch this!') for m in viral_moments[:3])
+        template = TTS_TEMPLATES.get(style, TTS_TEMPLATES['engaging'])
+        return template.format(hooks=hooks or "Check out these incredible moments!")
+    
+    def generate_onscreen_text(self, moment: Dict) -> List[Dict]:
+        """
+        Build text overlays for a moment from its hook.
+        
+        Args:
+            moment: Viral moment dict with timing and context
+        
+        Returns:
+            List of text overlays with timing and position
+        """
+        overlays = [{"text": moment.get('hook', 'Watch this!'), "delay": 0, "duration": 2.0, "position": "top"}]
+        
+        duration = moment['end_time'] - moment['start_time']
+        if duration >= 8:
+            overlays.append({
+                "text": "WATCH TILL THE END", "delay": round(duration / 2 - 1, 1),
+                "duration": 2.0, "position": "bottom"
+            })
+        return overlays
+    
+    def generate_onscreen_text_batch(self, viral_moments: List[Dict]) -> List[List[Dict]]:
+        """
+        Build text overlays for several moments.
+        
+        Args:
+            viral_moments: List of viral moments
+        
+        Returns:
+            Text overlays for each moment, in the same order
+        """
+        return [self.generate_onscreen_text(moment) for moment in viral_moments]
+    
+    def generate_moment_content(self, viral_moments: List[Dict], style: str = "engaging",
+                                include_tts: bool = True) -> Tuple[List[List[Dict]], Optional[str]]:
+        """
+        Build text overlays for every moment and the TTS script.
+        
+        Args:
+            viral_moments: List of viral moments
+            style: Style of narration (engaging, dramatic, casual)
+            include_tts: Whether to generate the TTS script as well
+        
+        Returns:
+            Tuple of (text overlays per moment, TTS script or None)
+        """
+        tts_script = self.generate_tts_script(viral_moments, style) if include_tts else None
+        return self.generate_onscreen_text_batch(viral_moments), tts_script
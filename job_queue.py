@@ -0,0 +1,716 @@
+"""
+Job Queue Module
+Persistent SQLite job store and a bounded pool of worker processes.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+
+JOB_STATUSES = ['queued', 'running', 'succeeded', 'failed']
+
+
+def _owner_id() -> str:
+    """Identify this web process as host:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def add_counters(total: Dict, more: Dict, sign: int = 1) -> Dict:
+    """
+    Add (or, with sign=-1, subtract) nested dicts of numeric counters.
+    
+    Args:
+        total: Counters to start from (not modified)
+        more: Counters to add; non-numeric values are ignored
+        sign: 1 to add, -1 to subtract
+    
+    Returns:
+        New dict with the combined counters
+    """
+    combined = dict(total)
+    for name, value in more.items():
+        if isinstance(value, dict):
+            combined[name] = add_counters(combined.get(name) or {}, value, sign)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            combined[name] = combined.get(name, 0) + sign * value
+    return combined
+
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a local process is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """SQLite-backed record of jobs, shared by every web process on the machine."""
+    
+    def __init__(self, path: str = None, max_attempts: int = None):
+        """
+        Initialize job store.
+        
+        Args:
+            path: SQLite file. If None, uses JOB_STORE_PATH (default cache/jobs.sqlite3).
+            max_attempts: Times a job is started before an interrupted run counts
+                as failed. If None, uses JOB_MAX_ATTEMPTS (default 2).
+        """
+        self.path = path or os.getenv('JOB_STORE_PATH', os.path.join('cache', 'jobs.sqlite3'))
+        self.max_attempts = max_attempts or int(os.getenv('JOB_MAX_ATTEMPTS', '2'))
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY,'
+                ' kind TEXT NOT NULL,'
+                ' payload TEXT NOT NULL,'
+                ' status TEXT NOT NULL,'
+                ' stage TEXT,'
+                ' progress REAL NOT NULL DEFAULT 0,'
+                ' result TEXT,'
+                ' error TEXT,'
+                ' owner TEXT,'
+                ' attempts INTEGER NOT NULL DEFAULT 0,'
+                ' created_at REAL NOT NULL,'
+                ' started_at REAL,'
+                ' finished_at REAL,'
+                ' updated_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS job_events ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' job_id TEXT NOT NULL,'
+                ' type TEXT NOT NULL,'
+                ' stage TEXT,'
+                ' progress REAL,'
+                ' data TEXT,'
+                ' created_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id)'
+            )
+    
+    def create(self, kind: str, payload: Dict) -> str:
+        """
+        Add a queued job.
+        
+        Args:
+            kind: Job type, used to pick its handler
+            payload: JSON-serializable job arguments
+        
+        Returns:
+            New job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, payload, status, created_at, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, kind, json.dumps(payload), 'queued', now, now)
+            )
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Look up a job.
+        
+        Args:
+            job_id: Job id from create
+        
+        Returns:
+            Job dict with decoded payload and result, or None if unknown
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+    
+    def list(self, status: str = None, limit: int = 50) -> List[Dict]:
+        """
+        List the most recent jobs, without payloads.
+        
+        Args:
+            status: Only return jobs with this status
+            limit: Maximum number of jobs
+        
+        Returns:
+            Job dicts, newest first
+        """
+        query = 'SELECT * FROM jobs'
+        params = []
+        if status:
+            query += ' WHERE status = ?'
+            params.append(status)
+        query += ' ORDER BY created_at DESC LIMIT ?'
+        params.append(limit)
+        
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        jobs = []
+        for row in rows:
+            job = self._to_dict(row)
+            del job['payload']
+            jobs.append(job)
+        return jobs
+    
+    def claim(self, owner: str, limit: int) -> Optional[Dict]:
+        """
+        Mark the oldest queued job as running, if fewer than limit are running.
+        
+        The check and update happen in one write transaction, so web processes
+        sharing the store never start the same job twice or exceed the limit.
+        
+        Args:
+            owner: Id of the claiming process (host:pid)
+            limit: Machine-wide number of concurrently running jobs
+        
+        Returns:
+            The claimed job, or None if the limit is reached or nothing is queued
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            running = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'running'"
+            ).fetchone()[0]
+            if running >= limit:
+                return None
+            
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, attempts = attempts + 1,"
+                ' started_at = ?, updated_at = ? WHERE id = ?',
+                (owner, now, now, row[0])
+            )
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (row[0],)).fetchone()
+        return self._to_dict(row)
+    
+    def update_progress(self, job_id: str, stage: str, progress: float):
+        """
+        Record the stage a running job has reached.
+        
+        Args:
+            job_id: Job id
+            stage: Stage name
+            progress: Overall progress from 0 to 1
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, updated_at = ?"
+                " WHERE id = ? AND status = 'running'",
+                (stage, min(1.0, max(0.0, progress)), time.time(), job_id)
+            )
+    
+    def finish(self, job_id: str, result: Dict):
+        """
+        Mark a job as succeeded.
+        
+        Args:
+            job_id: Job id
+            result: JSON-serializable job result
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'succeeded', stage = 'done', progress = 1,"
+                ' result = ?, error = NULL, finished_at = ?, updated_at = ? WHERE id = ?',
+                (json.dumps(result), now, now, job_id)
+            )
+    
+    def fail(self, job_id: str, error: str, details: Dict = None):
+        """
+        Mark a job as failed.
+        
+        Args:
+            job_id: Job id
+            error: Error message
+            details: Optional JSON-serializable description of the failure
+                (such as an LLMCallError's kind and status code), stored as
+                the job result
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', result = ?, error = ?, finished_at = ?,"
+                ' updated_at = ? WHERE id = ?',
+                (json.dumps(details) if details else None, error, now, now, job_id)
+            )
+    
+    def add_event(self, job_id: str, event_type: str, stage: str = None,
+                  progress: float = None, data: Dict = None) -> int:
+        """
+        Append a progress event to a job's event log.
+        
+        Args:
+            job_id: Job id
+            event_type: stage_start, progress, stage_end or counters
+            stage: Stage the event belongs to
+            progress: Overall job progress from 0 to 1
+            data: Optional JSON-serializable details
+        
+        Returns:
+            Event id, increasing within the store
+        """
+        if progress is not None:
+            progress = round(min(1.0, max(0.0, progress)), 4)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'INSERT INTO job_events (job_id, type, stage, progress, data, created_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, event_type, stage, progress,
+                 json.dumps(data) if data else None, time.time())
+            )
+            return cursor.lastrowid
+    
+    def events(self, job_id: str, after: int = 0, limit: int = 500) -> List[Dict]:
+        """
+        Read a job's events in order.
+        
+        Args:
+            job_id: Job id
+            after: Only return events with a larger id
+            limit: Maximum number of events
+        
+        Returns:
+            Event dicts with id, type, stage, progress, data and time
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT id, type, stage, progress, data, created_at FROM job_events'
+                ' WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?',
+                (job_id, after, limit)
+            ).fetchall()
+        return [
+            {
+                'id': row['id'],
+                'type': row['type'],
+                'stage': row['stage'],
+                'progress': row['progress'],
+                'data': json.loads(row['data']) if row['data'] else {},
+                'time': row['created_at']
+            }
+            for row in rows
+        ]
+    
+    def timings(self, job_id: str) -> Dict[str, float]:
+        """
+        Seconds spent in each finished stage of a job (latest attempt wins).
+        
+        Args:
+            job_id: Job id
+        
+        Returns:
+            Dict mapping stage name to seconds, in stage order
+        """
+        timings = {}
+        for event in self.events(job_id, limit=10000):
+            if event['type'] == 'stage_end':
+                timings[event['stage']] = event['data'].get('seconds')
+        return timings
+    
+    def stage_timings(self, limit: int = 1000) -> Dict[str, Dict]:
+        """
+        Stage duration percentiles over the most recent finished stages.
+        
+        Args:
+            limit: Number of recent stage_end events considered
+        
+        Returns:
+            Dict mapping stage name to count, p50 and p95 seconds
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT stage, data FROM job_events WHERE type = 'stage_end'"
+                ' ORDER BY id DESC LIMIT ?',
+                (limit,)
+            ).fetchall()
+        
+        durations: Dict[str, List[float]] = {}
+        for stage, data in rows:
+            seconds = json.loads(data).get('seconds') if data else None
+            if seconds is not None:
+                durations.setdefault(stage, []).append(seconds)
+        
+        timings = {}
+        for stage, values in durations.items():
+            values.sort()
+            timings[stage] = {
+                'count': len(values),
+                'p50': values[min(len(values) - 1, len(values) * 50 // 100)],
+                'p95': values[min(len(values) - 1, len(values) * 95 // 100)]
+            }
+        return timings
+    
+    def counter_totals(self, limit: int = 1000) -> Dict:
+        """
+        Sum the counters recorded by the most recent jobs.
+        
+        Args:
+            limit: Number of recent counters events considered
+        
+        Returns:
+            Nested dict of summed counters
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM job_events WHERE type = 'counters' ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        
+        totals: Dict = {}
+        for (data,) in rows:
+            if data:
+                totals = add_counters(totals, json.loads(data))
+        return totals
+    
+    def requeue_orphaned(self) -> int:
+        """
+        Requeue running jobs whose web process on this host has exited.
+        
+        Jobs already started max_attempts times are failed instead, so a job
+        that crashes its worker is not retried forever.
+        
+        Returns:
+            Number of jobs requeued or failed
+        """
+        host = socket.gethostname()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, owner, attempts FROM jobs WHERE status = 'running'"
+            ).fetchall()
+        
+        orphaned = 0
+        for job_id, owner, attempts in rows:
+            owner_host, _, pid = (owner or '').rpartition(':')
+            if owner_host != host or not pid.isdigit() or _pid_alive(int(pid)):
+                continue
+            
+            now = time.time()
+            with self._connect() as conn:
+                if attempts >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?,"
+                        " updated_at = ? WHERE id = ? AND status = 'running'",
+                        (f'Interrupted after {attempts} attempt(s)', now, now, job_id)
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', owner = NULL, stage = NULL,"
+                        " progress = 0, updated_at = ? WHERE id = ? AND status = 'running'",
+                        (now, job_id)
+                    )
+            orphaned += 1
+        return orphaned
+    
+    def stats(self) -> Dict:
+        """Return the number of jobs in each status."""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update(dict(rows))
+        return counts
+    
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+    
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection, committing and closing it on exit."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+class JobProgress:
+    """
+    Progress callback handed to job handlers.
+    
+    Called as progress(stage, overall_progress, **details). Records a
+    stage_start event and a stage_end event with the stage's duration
+    whenever the stage changes, and throttled progress events in between.
+    """
+    
+    def __init__(self, store: JobStore, job_id: str, min_interval: float = 0.25):
+        """
+        Initialize progress recorder.
+        
+        Args:
+            store: Job store
+            job_id: Job being run
+            min_interval: Minimum seconds between progress events within a
+                stage, unless their details change
+        """
+        self.store = store
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self.stage = None
+        self.progress = 0.0
+        self._stage_started = 0.0
+        self._last_event = 0.0
+        self._last_details = None
+    
+    def __call__(self, stage: str, progress: float, **details):
+        now = time.monotonic()
+        if stage != self.stage:
+            self.close()
+            self.stage = stage
+            self._stage_started = now
+            event_type = 'stage_start'
+        elif now - self._last_event < self.min_interval and details == self._last_details:
+            return
+        else:
+            event_type = 'progress'
+        
+        self.progress = max(self.progress, progress)
+        self._last_event = now
+        self._last_details = details
+        try:
+            self.store.update_progress(self.job_id, stage, self.progress)
+            self.store.add_event(self.job_id, event_type, stage, self.progress, details)
+        except sqlite3.Error as e:
+            print(f"Error recording job progress: {e}")
+    
+    def close(self):
+        """Record the end and duration of the current stage, if any."""
+        if self.stage is None:
+            return
+        seconds = round(time.monotonic() - self._stage_started, 3)
+        try:
+            self.store.add_event(self.job_id, 'stage_end', self.stage, self.progress, {'seconds': seconds})
+        except sqlite3.Error as e:
+            print(f"Error recording job progress: {e}")
+        self.stage = None
+
+
+def run_job(store_path: str, job_id: str, handler: Callable[[Dict, Callable], Dict],
+            counters: Callable[[], Dict] = None):
+    """
+    Run one job inside a worker process and record its outcome.
+    
+    Module-level so it can run inside a ProcessPoolExecutor worker. When
+    the handler raises an exception with a to_dict method (LLMCallError),
+    that dict is stored with the failure so callers can see its kind.
+    
+    Args:
+        store_path: Job store SQLite file
+        job_id: Job to run
+        handler: Callable taking (payload, progress) and returning the result;
+            progress is a JobProgress
+        counters: Optional callable returning this process's counters; what
+            they grew by during the job is recorded as a counters event
+    """
+    store = JobStore(store_path)
+    job = store.get(job_id)
+    if job is None:
+        return
+    
+    before = counters() if counters else None
+    progress = JobProgress(store, job_id)
+    try:
+        result = handler(job['payload'], progress)
+    except Exception as e:
+        print(f"Error running job {job_id}: {e}")
+        progress.close()
+        _record_counters(store, job_id, counters, before)
+        details = e.to_dict() if hasattr(e, 'to_dict') else None
+        store.fail(job_id, str(e), details)
+        return
+    progress.close()
+    _record_counters(store, job_id, counters, before)
+    store.finish(job_id, result)
+
+
+def _record_counters(store: JobStore, job_id: str, counters: Optional[Callable[[], Dict]],
+                     before: Optional[Dict]):
+    """Store how much the worker's counters grew during a job."""
+    if counters is None:
+        return
+    try:
+        store.add_event(job_id, 'counters', data=add_counters(counters(), before, sign=-1))
+    except Exception as e:
+        print(f"Error recording counters for job {job_id}: {e}")
+
+
+class JobQueue:
+    """
+    Dispatches queued jobs from a JobStore to a pool of worker processes.
+    
+    A background thread claims jobs while fewer than `workers` are running
+    on the machine, so the limit holds across every web process sharing the
+    store. Jobs left running by a web process that exited are requeued.
+    """
+    
+    def __init__(self, handlers: Dict[str, Callable], store: JobStore = None,
+                 workers: int = None, poll_interval: float = 0.5,
+                 counters: Callable[[], Dict] = None):
+        """
+        Initialize job queue.
+        
+        Args:
+            handlers: Module-level handler for each job kind, taking
+                (payload, progress) and returning a JSON-serializable result
+            store: Job store. If None, a JobStore with default settings.
+            workers: Jobs run concurrently per machine. If None, uses
+                JOB_WORKERS (default 2).
+            poll_interval: Seconds between checks for queued jobs
+            counters: Optional module-level callable returning a worker
+                process's counters (e.g. cache hits, API calls); per-job
+                growth is summed by JobStore.counter_totals
+        """
+        self.handlers = handlers
+        self.counters = counters
+        self.store = store or JobStore()
+        self.workers = workers or int(os.getenv('JOB_WORKERS', '2'))
+        self.poll_interval = poll_interval
+        self.owner = _owner_id()
+        
+        self._executor = None
+        self._thread = None
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+    
+    def start(self):
+        """Start the dispatcher thread, if it isn't running yet."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+            self._thread.start()
+    
+    def stop(self, wait: bool = True):
+        """
+        Stop dispatching and shut down the worker pool.
+        
+        Args:
+            wait: Wait for running jobs to finish
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+    
+    def submit(self, kind: str, payload: Dict) -> str:
+        """
+        Queue a job.
+        
+        Args:
+            kind: Job type, one of the handler names
+            payload: JSON-serializable job arguments
+        
+        Returns:
+            Job id
+        
+        Raises:
+            ValueError: If there is no handler for kind
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        
+        job_id = self.store.create(kind, payload)
+        self.start()
+        self._wake.set()
+        return job_id
+    
+    def _dispatch(self):
+        """Claim and start jobs until stopped."""
+        last_recovery = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - last_recovery > 10 * self.poll_interval:
+                    self.store.requeue_orphaned()
+                    last_recovery = time.monotonic()
+                
+                while self._active < self.workers:
+                    job = self.store.claim(self.owner, self.workers)
+                    if job is None:
+                        break
+                    self._start(job)
+            except Exception as e:
+                print(f"Error dispatching jobs: {e}")
+            
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+    
+    def _start(self, job: Dict):
+        """Hand a claimed job to the worker pool."""
+        handler = self.handlers.get(job['kind'])
+        if handler is None:
+            self.store.fail(job['id'], f"Unknown job kind: {job['kind']}")
+            return
+        
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers don't inherit this process's threads and sockets
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            executor = self._executor
+            self._active += 1
+        
+        future = executor.submit(run_job, self.store.path, job['id'], handler, self.counters)
+        future.add_done_callback(lambda f, job_id=job['id']: self._finished(job_id, f))
+    
+    def _finished(self, job_id: str, future):
+        """Record worker crashes and free the slot."""
+        error = future.exception()
+        if error is not None:
+            print(f"Error running job {job_id}: {error}")
+            self.store.fail(job_id, f"Worker failed: {error}")
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    self._executor = None
+        
+        with self._lock:
+            self._active -= 1
+        self._wake.set()
+    
+    def stats(self) -> Dict:
+        """Job counts by status, this process's worker usage and recent stage timings."""
+        stats = self.store.stats()
+        with self._lock:
+            stats['active'] = self._active
+        stats['workers'] = self.workers
+        stats['stage_seconds'] = self.store.stage_timings()
+        return stats
@@ -0,0 +1,140 @@
+"""
+JSON Extraction Module
+Tolerant parsing of JSON arrays from LLM replies, whole or streamed.
+"""
+
+import json
+from typing import Iterable, Iterator, List
+
+
+def extract_json_array(text: str) -> List:
+    """
+    Find the first JSON array in an LLM reply.
+    
+    Code fences, prose before or after the array and an enclosing object
+    (e.g. {"moments": [...]}) are all tolerated. If the reply was cut off
+    mid-array, the elements that did complete are returned.
+    
+    Args:
+        text: Reply content
+    
+    Returns:
+        Parsed array
+    
+    Raises:
+        ValueError: If no array (or complete element) can be found
+    """
+    decoder = json.JSONDecoder()
+    start = text.find('[')
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+        except ValueError:
+            start = text.find('[', start + 1)
+            continue
+        if isinstance(value, list):
+            return value
+        start = text.find('[', start + 1)
+    
+    items = JSONArrayStream().feed(text)
+    if items:
+        return items
+    raise ValueError(f"No JSON array found in response: {text[:200]!r}")
+
+
+class JSONArrayStream:
+    """
+    Incremental parser yielding the elements of a streamed JSON array.
+    
+    Feed it text as it arrives; each element of the first top-level array
+    is returned as soon as its closing character has been seen, so the
+    first moment can be acted on while the rest is still being generated.
+    Elements that fail to parse are skipped.
+    """
+    
+    def __init__(self):
+        self.started = False
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._element: List[str] = []
+    
+    def feed(self, chunk: str) -> List:
+        """
+        Consume a chunk of text.
+        
+        Args:
+            chunk: Next piece of the reply
+        
+        Returns:
+            Elements completed by this chunk, in order
+        """
+        items = []
+        for char in chunk:
+            if self.done:
+                break
+            
+            if not self.started:
+                self.started = char == '['
+                continue
+            
+            if self._in_string:
+                self._element.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            
+            if char == '"':
+                self._in_string = True
+                self._element.append(char)
+            elif char in '{[':
+                self._depth += 1
+                self._element.append(char)
+            elif char in '}]':
+                if self._depth == 0:
+                    # Closing bracket of the array itself
+                    self._flush(items)
+                    self.done = True
+                    continue
+                self._depth -= 1
+                self._element.append(char)
+                if self._depth == 0:
+                    self._flush(items)
+            elif char == ',' and self._depth == 0:
+                self._flush(items)
+            else:
+                self._element.append(char)
+        return items
+    
+    def _flush(self, items: List):
+        """Parse the buffered element, if any, into items."""
+        text = ''.join(self._element).strip()
+        self._element = []
+        if not text:
+            return
+        try:
+            items.append(json.loads(text))
+        except ValueError:
+            pass
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator:
+    """
+    Yield array elements from an iterable of text chunks as they complete.
+    
+    Args:
+        chunks: Streamed reply text
+    
+    Yields:
+        Parsed array elements
+    """
+    parser = JSONArrayStream()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            break
@@ -0,0 +1,157 @@
+"""
+LLM Response Cache Module
+Persistent SQLite cache for chat completion responses.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class ResponseCache:
+    """SQLite-backed cache of LLM responses with TTL and size-bounded eviction."""
+    
+    def __init__(self, path: str = None, ttl: float = None, max_entries: int = None):
+        """
+        Initialize response cache.
+        
+        Args:
+            path: SQLite file. If None, uses LLM_CACHE_PATH (default cache/llm_cache.sqlite3).
+            ttl: Seconds before an entry expires. If None, uses LLM_CACHE_TTL (default 7 days).
+            max_entries: Entries kept before least recently used ones are evicted.
+                If None, uses LLM_CACHE_MAX_ENTRIES (default 5000).
+        """
+        self.path = path or os.getenv('LLM_CACHE_PATH', os.path.join('cache', 'llm_cache.sqlite3'))
+        self.ttl = ttl if ttl is not None else float(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600)))
+        self.max_entries = max_entries or int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                ' key TEXT PRIMARY KEY,'
+                ' content TEXT NOT NULL,'
+                ' created_at REAL NOT NULL,'
+                ' accessed_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)'
+            )
+    
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+        """
+        Hash the inputs that determine a completion.
+        
+        Args:
+            model: Model name
+            messages: Chat messages
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+        
+        Returns:
+            Hex digest cache key
+        """
+        payload = json.dumps(
+            {'model': model, 'messages': messages, 'temperature': temperature,
+             'max_tokens': max_tokens},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return a cached response if present and not expired.
+        
+        Args:
+            key: Cache key from make_key
+        
+        Returns:
+            Response content, or None on a miss
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT content, created_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                with self._lock:
+                    self.misses += 1
+                return None
+            
+            conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+        
+        with self._lock:
+            self.hits += 1
+        return row[0]
+    
+    def put(self, key: str, content: str):
+        """
+        Store a response, evicting the least recently used entries over the limit.
+        
+        Args:
+            key: Cache key from make_key
+            content: Response content
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, content, created_at, accessed_at)'
+                ' VALUES (?, ?, ?, ?)',
+                (key, content, now, now)
+            )
+            conn.execute(
+                'DELETE FROM responses WHERE key IN ('
+                ' SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+    
+    def purge_expired(self) -> int:
+        """
+        Delete expired entries.
+        
+        Returns:
+            Number of entries removed
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'DELETE FROM responses WHERE created_at < ?', (time.time() - self.ttl,)
+            )
+            return cursor.rowcount
+    
+    def clear(self):
+        """Delete every entry."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM responses')
+    
+    def stats(self) -> Dict:
+        """Return hit/miss counters and the number of stored entries."""
+        with self._connect() as conn:
+            entries = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+    
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection, committing and closing it on exit."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
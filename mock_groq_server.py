@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Mock Groq Server
+
+A local stand-in for the Groq chat-completions API, for load testing the
+analysis path without a network. Point the analyzer at it with
+
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=mock python cli.py analyze ...
+
+Responses are canned: analysis prompts are answered by the heuristic
+analyzer (so moment times match the transcript), overlay prompts (single
+or batched) with a fixed overlay list and anything else with a fixed
+script. Latency follows
+a log-normal distribution and a share of requests can be made to fail.
+
+Use a separate LLM_CACHE_PATH (or LLM_CACHE_DISABLED=1) so mock responses
+don't end up in the real response cache.
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+CHAT_PATHS = ('/openai/v1/chat/completions', '/v1/chat/completions')
+
+CANNED_OVERLAYS = [
+    {"text": "WAIT FOR IT...", "delay": 0, "duration": 2.0, "position": "top"},
+    {"text": "NO WAY!", "delay": 5, "duration": 2.0, "position": "bottom"}
+]
+
+CANNED_SCRIPT = "Get ready for the most incredible moments you'll see today. Don't blink!"
+
+
+class MockGroq:
+    """Latency, failure and response policy shared by every request thread."""
+    
+    def __init__(self, latency: float = 0.8, latency_sigma: float = 0.5,
+                 error_rate: float = 0.0, error_status: int = 500,
+                 responses: Optional[Dict[str, str]] = None, seed: int = None,
+                 token_delay: float = 0.02):
+        """
+        Initialize the mock.
+        
+        Args:
+            latency: Median response latency in seconds
+            latency_sigma: Log-normal sigma of the latency (0 for a fixed latency)
+            error_rate: Fraction of requests answered with error_status (0-1)
+            error_status: HTTP status of failed requests (e.g. 500, 503 or 429)
+            responses: Optional {substring: content} overrides, matched against
+                the user prompt before the built-in canned responses
+            seed: Random seed for reproducible runs
+            token_delay: Seconds between chunks of a streamed response
+        """
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.responses = responses or {}
+        self.token_delay = token_delay
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'in_flight': 0, 'max_in_flight': 0}
+    
+    def sample_latency(self) -> float:
+        """Draw a response latency in seconds."""
+        with self._lock:
+            if self.latency_sigma <= 0:
+                return self.latency
+            return self._random.lognormvariate(math.log(max(self.latency, 1e-6)), self.latency_sigma)
+    
+    def should_fail(self) -> bool:
+        """Decide whether the next request fails."""
+        with self._lock:
+            return self._random.random() < self.error_rate
+    
+    def content_for(self, messages: List[Dict]) -> str:
+        """
+        Pick the canned reply for a chat request.
+        
+        Args:
+            messages: Chat messages from the request
+        
+        Returns:
+            Assistant message content
+        """
+        prompt = messages[-1].get('content', '') if messages else ''
+        for needle, content in self.responses.items():
+            if needle in prompt:
+                return content
+        
+        if 'Transcription:' in prompt:
+            return json.dumps(self._analyze(prompt))
+        if 'JSON array of their ids' in prompt:
+            ids = [int(i) for i in re.findall(r'"id": (\d+)', prompt)]
+            return json.dumps(ids[:5])
+        if 'for each of these viral moments' in prompt:
+            count = len(re.findall(r'"moment": \d+', prompt)) - 1  # minus the example
+            return json.dumps([{'moment': i, 'overlays': CANNED_OVERLAYS} for i in range(count)])
+        if 'text overlays' in prompt:
+            return json.dumps(CANNED_OVERLAYS)
+        return CANNED_SCRIPT
+    
+    @staticmethod
+    def _analyze(prompt: str) -> List[Dict]:
+        """Answer an analysis prompt with the heuristic analyzer."""
+        from heuristic_analyzer import HeuristicAnalyzer
+        
+        match = re.search(r'Transcription:\n(.*?)\n\nVisual Descriptions:\n(.*?)\n\nIdentify', prompt, re.S)
+        if not match:
+            return []
+        return HeuristicAnalyzer().analyze_transcription(match.group(1), match.group(2))
+    
+    def enter(self):
+        """Count a request as started."""
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+    
+    def leave(self, failed: bool):
+        """Count a request as finished."""
+        with self._lock:
+            self.stats['in_flight'] -= 1
+            if failed:
+                self.stats['errors'] += 1
+
+
+def completion_body(model: str, content: str, prompt_chars: int) -> Dict:
+    """Build a chat completion in the shape the Groq SDK parses."""
+    prompt_tokens = prompt_chars // 4
+    completion_tokens = len(content) // 4
+    return {
+        'id': f"chatcmpl-{uuid.uuid4().hex}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'system_fingerprint': 'mock',
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'logprobs': {'content': None},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    }
+
+
+def make_handler(mock: MockGroq):
+    """Create a request handler class bound to a MockGroq."""
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def log_message(self, format, *args):
+            pass
+        
+        def send_json(self, status: int, body: Dict):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            if status == 429:
+                self.send_header('retry-after', '1')
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def send_stream(self, model: str, content: str, piece: int = 16):
+            """Send content as server-sent chat.completion.chunk events."""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            pieces = [content[i:i + piece] for i in range(0, len(content), piece)]
+            for i, text in enumerate(pieces + ['']):
+                chunk = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': model,
+                    'system_fingerprint': 'mock',
+                    'choices': [{
+                        'index': 0,
+                        'delta': {'role': 'assistant', 'content': text},
+                        'logprobs': {'content': None},
+                        'finish_reason': 'stop' if i == len(pieces) else None
+                    }]
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(mock.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+        
+        def do_GET(self):
+            if self.path == '/stats':
+                self.send_json(200, mock.stats)
+            else:
+                self.send_json(404, {'error': {'message': 'Not found'}})
+        
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length)
+            
+            if self.path not in CHAT_PATHS:
+                self.send_json(404, {'error': {'message': 'Not found'}})
+                return
+            
+            try:
+                request = json.loads(raw or b'{}')
+            except ValueError:
+                self.send_json(400, {'error': {'message': 'Invalid JSON body'}})
+                return
+            
+            mock.enter()
+            failed = mock.should_fail()
+            try:
+                time.sleep(mock.sample_latency())
+                if failed:
+                    self.send_json(mock.error_status, {
+                        'error': {'message': 'Mock failure', 'type': 'server_error'}
+                    })
+                    return
+                
+                messages = request.get('messages', [])
+                content = mock.content_for(messages)
+                if request.get('stream'):
+                    self.send_stream(request.get('model', 'mock'), content)
+                    return
+                prompt_chars = sum(len(m.get('content', '')) for m in messages)
+                self.send_json(200, completion_body(request.get('model', 'mock'), content, prompt_chars))
+            finally:
+                mock.leave(failed)
+    
+    return Handler
+
+
+def serve(host: str = '127.0.0.1', port: int = 8765, **options) -> ThreadingHTTPServer:
+    """
+    Start the mock server on a background thread.
+    
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free one)
+        **options: Passed to MockGroq
+    
+    Returns:
+        Running server; its base URL is http://host:server.server_port and
+        server.mock holds the request statistics
+    """
+    mock = MockGroq(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.daemon_threads = True
+    server.mock = mock
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Groq chat-completions API')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=8765, help='Port to bind')
+    parser.add_argument('--latency', type=float, default=0.8, help='Median latency in seconds')
+    parser.add_argument('--latency-sigma', type=float, default=0.5,
+                        help='Log-normal spread of the latency (0 for fixed latency)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=500, help='HTTP status of failed requests')
+    parser.add_argument('--responses', help='JSON file mapping prompt substrings to canned replies')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    parser.add_argument('--token-delay', type=float, default=0.02,
+                        help='Seconds between chunks of streamed responses')
+    
+    args = parser.parse_args()
+    
+    responses = None
+    if args.responses:
+        with open(args.responses, 'r') as f:
+            responses = json.load(f)
+    
+    server = ThreadingHTTPServer(
+        (args.host, args.port),
+        make_handler(MockGroq(
+            latency=args.latency, latency_sigma=args.latency_sigma,
+            error_rate=args.error_rate, error_status=args.error_status,
+            responses=responses, seed=args.seed, token_delay=args.token_delay
+        ))
+    )
+    server.daemon_threads = True
+    print(f"Mock Groq listening on http://{args.host}:{server.server_port}")
+    print(f"Set GROQ_BASE_URL=http://{args.host}:{server.server_port} to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Overlay Cache Module
+Caches rasterized text overlays so recurring captions skip re-rendering.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+import numpy as np
+
+
+class OverlayCache:
+    """Content-addressed LRU cache of RGBA overlay images with an optional disk tier."""
+    
+    def __init__(self, max_entries: int = 256, cache_dir: str = None):
+        """
+        Initialize overlay cache.
+        
+        Args:
+            max_entries: Maximum number of images kept in memory
+            cache_dir: Optional directory for the on-disk tier
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(**params) -> str:
+        """
+        Build a content address from the overlay parameters.
+        
+        Args:
+            **params: Text, font, size, stroke, width and any other style inputs
+        
+        Returns:
+            Hex digest identifying the rendered image
+        """
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Look up an image in memory, then on disk.
+        
+        Args:
+            key: Content address from make_key
+        
+        Returns:
+            RGBA image array, or None if not cached
+        """
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+        
+        image = self._load_from_disk(key)
+        with self._lock:
+            if image is not None:
+                self.disk_hits += 1
+                self._store(key, image)
+            else:
+                self.misses += 1
+        return image
+    
+    def put(self, key: str, image: np.ndarray):
+        """
+        Store an image in memory and, if configured, on disk.
+        
+        Args:
+            key: Content address from make_key
+            image: RGBA image array
+        """
+        with self._lock:
+            self._store(key, image)
+        self._save_to_disk(key, image)
+    
+    def get_or_render(self, key: str, render: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Return a cached image, rendering and caching it on a miss.
+        
+        Args:
+            key: Content address from make_key
+            render: Callable producing the RGBA image
+        
+        Returns:
+            RGBA image array
+        """
+        image = self.get(key)
+        if image is None:
+            image = render()
+            self.put(key, image)
+        return image
+    
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+    
+    def clear(self):
+        """Drop all in-memory entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+    
+    def _store(self, key: str, image: np.ndarray):
+        """Insert into the LRU, evicting the oldest entries. Caller holds the lock."""
+        image.setflags(write=False)
+        self._entries[key] = image
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _disk_path(self, key: str) -> str:
+        """Path of a key in the disk tier."""
+        return os.path.join(self.cache_dir, f"{key}.npy")
+    
+    def _load_from_disk(self, key: str) -> Optional[np.ndarray]:
+        """Read an image from the disk tier, if present."""
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, allow_pickle=False)
+        except Exception as e:
+            print(f"Error reading cached overlay {key}: {e}")
+            return None
+    
+    def _save_to_disk(self, key: str, image: np.ndarray):
+        """Write an image to the disk tier atomically."""
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, image, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error caching overlay {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+# Process-wide cache shared by every editor instance
+default_overlay_cache = OverlayCache(
+    max_entries=int(os.getenv('OVERLAY_CACHE_SIZE', '256')),
+    cache_dir=os.getenv('OVERLAY_CACHE_DIR') or None
+)
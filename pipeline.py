@@ -0,0 +1,318 @@
+"""
+Pipeline Module
+Compilation and end-to-end workflows, run by background jobs.
+"""
+
+import os
+import time
+import uuid
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from viral_analyzer import get_call_policy, get_shared_analyzer
+from overlay_cache import default_overlay_cache
+from video_editor import ViralVideoEditor
+from tts_generator import TTSGenerator
+
+
+# Stage name and the job progress (0-1) reached when it starts
+PROCESS_STAGES = [
+    ('analyze', 0.0),
+    ('overlays', 0.2),
+    ('tts', 0.35),
+    ('render', 0.45)
+]
+
+# Share of a render taken by each editor stage, as (start, end) fractions
+RENDER_STAGES = {
+    'extract': (0.0, 0.45),
+    'compile': (0.45, 0.9),
+    'audio_mix': (0.9, 1.0)
+}
+
+
+# Job directories older than this are left over from killed workers
+STALE_WORKSPACE_SECONDS = 24 * 3600
+
+
+def _remove_stale(root: str, prefix: str = 'job_'):
+    """Delete job directories under root that have not been touched for a day."""
+    cutoff = time.time() - STALE_WORKSPACE_SECONDS
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.name.startswith(prefix) and entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError as e:
+            print(f"Error removing stale workspace {entry.path}: {e}")
+
+
+@contextmanager
+def job_workspace(output_dir: str, scratch_root: str = None) -> Iterator[Tuple[str, str]]:
+    """
+    Private directories for one job, removed when it ends.
+    
+    Renders go to a job directory under output_dir/.work, on the same
+    filesystem as the outputs, so a finished video can be renamed into
+    place. Intermediate files go to a scratch directory under scratch_root
+    (e.g. /dev/shm for tmpfs), or to the job directory when it is unset.
+    Directories abandoned by killed workers are pruned after a day.
+    
+    Args:
+        output_dir: Directory finished videos are published to
+        scratch_root: Parent of the scratch directory. If None, uses
+            JOB_SCRATCH_DIR when set.
+    
+    Yields:
+        Tuple of (render directory, scratch directory)
+    """
+    work_root = os.path.join(output_dir, '.work')
+    os.makedirs(work_root, exist_ok=True)
+    _remove_stale(work_root)
+    render_dir = tempfile.mkdtemp(prefix='job_', dir=work_root)
+    directories = [render_dir]
+    
+    try:
+        scratch_root = scratch_root or os.getenv('JOB_SCRATCH_DIR')
+        scratch_dir = render_dir
+        if scratch_root:
+            os.makedirs(scratch_root, exist_ok=True)
+            _remove_stale(scratch_root)
+            scratch_dir = tempfile.mkdtemp(prefix='job_', dir=scratch_root)
+            directories.append(scratch_dir)
+        
+        yield render_dir, scratch_dir
+    
+    finally:
+        for directory in directories:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def publish_output(path: str, output_dir: str) -> str:
+    """
+    Move a finished render into output_dir under a name no other job uses.
+    
+    Args:
+        path: Rendered file
+        output_dir: Directory served by /download
+    
+    Returns:
+        Path of the published file
+    """
+    stem, ext = os.path.splitext(os.path.basename(path))
+    published = os.path.join(output_dir, f"{stem}_{uuid.uuid4().hex[:8]}{ext}")
+    shutil.move(path, published)
+    return published
+
+
+def render_compilation(editor, video_path, viral_moments, text_overlays, output_name,
+                       tts_audio_path=None, single_pass=False, preview=False, **options):
+    """
+    Compile a video and mix in TTS audio when available.
+    
+    In single-pass mode and with the ffmpeg backend the narration is mixed
+    into the same render, so the output is encoded once instead of once per
+    stage. Previews render from low-resolution proxies in a single pass.
+    """
+    has_audio = bool(tts_audio_path and os.path.exists(tts_audio_path))
+    
+    if preview:
+        return editor.create_preview(
+            video_path,
+            viral_moments,
+            text_overlays,
+            f"preview_{output_name}",
+            single_pass=options.get('backend', 'moviepy') == 'moviepy',
+            audio_path=tts_audio_path if has_audio else None,
+            **options
+        )
+    
+    if single_pass or options.get('backend') == 'ffmpeg':
+        return editor.create_viral_compilation(
+            video_path,
+            viral_moments,
+            text_overlays,
+            f"final_{output_name}" if has_audio else output_name,
+            single_pass=single_pass,
+            audio_path=tts_audio_path if has_audio else None,
+            **options
+        )
+    
+    output_path = editor.create_viral_compilation(
+        video_path,
+        viral_moments,
+        text_overlays,
+        output_name,
+        **options
+    )
+    
+    if has_audio:
+        final_output = os.path.join(
+            editor.output_dir,
+            f"final_{output_name}"
+        )
+        output_path = editor.add_audio_overlay(
+            output_path,
+            tts_audio_path,
+            final_output
+        )
+    
+    return output_path
+
+
+def render_progress(report: Callable[..., None], start: float, end: float) -> Callable[..., None]:
+    """
+    Adapt job progress reporting to a ViralVideoEditor progress callback.
+    
+    Editor stages (extract, compile, audio_mix) are reported as job stages,
+    with their fractions mapped onto the job progress range [start, end].
+    
+    Args:
+        report: Job progress callback taking (stage, progress, **details)
+        start: Job progress when rendering starts
+        end: Job progress when rendering is done
+    
+    Returns:
+        Callback taking (stage, fraction, **details)
+    """
+    def progress(stage, fraction, **details):
+        low, high = RENDER_STAGES.get(stage, (0.0, 1.0))
+        report(stage, start + (end - start) * (low + (high - low) * fraction), **details)
+    
+    return progress
+
+
+def run_compile(payload: Dict, report: Optional[Callable[..., None]] = None) -> Dict:
+    """
+    Compile viral clips as described by a /compile request.
+    
+    Args:
+        payload: Request fields plus output_dir
+        report: Optional callback taking (stage, progress 0-1, **details)
+    
+    Returns:
+        Dict with output_path
+    """
+    report = report or (lambda stage, progress, **details: None)
+    
+    report('render', 0.0)
+    with job_workspace(payload['output_dir']) as (render_dir, scratch_dir):
+        editor = ViralVideoEditor(
+            output_dir=render_dir,
+            profile=payload['profile'],
+            progress=render_progress(report, 0.0, 1.0),
+            scratch_dir=scratch_dir
+        )
+        workers = payload.get('workers')
+        output_path = render_compilation(
+            editor,
+            payload['video_path'],
+            payload['viral_moments'],
+            payload.get('text_overlays', []),
+            payload['output_name'],
+            payload.get('tts_audio_path'),
+            fast_extract=bool(payload.get('fast_extract', False)),
+            single_pass=bool(payload.get('single_pass', False)),
+            preview=bool(payload.get('preview', False)),
+            workers=int(workers) if workers else None,
+            backend=payload.get('backend', 'moviepy')
+        )
+        
+        return {'output_path': publish_output(output_path, payload['output_dir'])}
+
+
+def run_process_complete(payload: Dict, report: Optional[Callable[..., None]] = None) -> Dict:
+    """
+    Analyze, generate overlays and TTS, and compile, as for /process-complete.
+    
+    Args:
+        payload: Request fields plus output_dir
+        report: Optional callback taking (stage, progress 0-1, **details)
+    
+    Returns:
+        Dict with viral_moments, tts_script and output_path
+    
+    Raises:
+        ValueError: If no viral moments are identified
+    """
+    report = report or (lambda stage, progress, **details: None)
+    progress = dict(PROCESS_STAGES)
+    
+    # Step 1: Analyze for viral moments
+    report('analyze', progress['analyze'])
+    analyzer = get_shared_analyzer(
+        use_cache=False if payload.get('bypass_cache') else None,
+        backend=payload.get('analyzer')
+    )
+    keep_ratio = payload.get('keep_ratio')
+    viral_moments = analyzer.analyze_transcription(
+        payload['transcription'],
+        payload.get('visuals_description', ''),
+        keep_ratio=float(keep_ratio) if keep_ratio is not None else None
+    )
+    
+    if not viral_moments:
+        raise ValueError('No viral moments identified')
+    
+    # Steps 2-3: Generate text overlays and TTS script concurrently
+    report('overlays', progress['overlays'], moments=len(viral_moments))
+    text_overlays, tts_script = analyzer.generate_moment_content(
+        viral_moments, payload.get('tts_style', 'engaging')
+    )
+    
+    with job_workspace(payload['output_dir']) as (render_dir, scratch_dir):
+        # Step 4: Generate TTS audio
+        report('tts', progress['tts'])
+        tts_audio_path = TTSGenerator(output_dir=scratch_dir).generate_tts(tts_script)
+        
+        # Step 5: Compile video and add TTS audio if generated
+        report('render', progress['render'])
+        editor = ViralVideoEditor(
+            output_dir=render_dir,
+            profile=payload['profile'],
+            progress=render_progress(report, progress['render'], 1.0),
+            scratch_dir=scratch_dir
+        )
+        output_path = render_compilation(
+            editor,
+            payload['video_path'],
+            viral_moments,
+            text_overlays,
+            payload['output_name'],
+            tts_audio_path,
+            single_pass=bool(payload.get('single_pass', False)),
+            backend=payload.get('backend', 'moviepy')
+        )
+        
+        return {
+            'viral_moments': viral_moments,
+            'tts_script': tts_script,
+            'output_path': publish_output(output_path, payload['output_dir'])
+        }
+
+
+def worker_counters() -> Dict:
+    """
+    Overlay cache and Groq call counters of this process.
+    
+    Recorded per job by the job queue, since rendering and LLM calls for
+    jobs happen in worker processes rather than the web process.
+    """
+    cache = default_overlay_cache.stats()
+    calls = get_call_policy().stats()
+    return {
+        'overlay_cache': {name: cache[name] for name in ('hits', 'disk_hits', 'misses')},
+        'groq_calls': {
+            name: calls[name] for name in ('calls', 'retries', 'hedges', 'hedge_wins', 'failures')
+        }
+    }
+
+
+JOB_HANDLERS = {
+    'compile': run_compile,
+    'process-complete': run_process_complete
+}
@@ -0,0 +1,205 @@
+"""
+Transcript Pre-filter Module
+Cheap local scoring that drops filler before a transcript is sent to Groq.
+"""
+
+import math
+from typing import Dict, List, Tuple
+import numpy as np
+from transcript_index import TranscriptIndex
+
+
+# Words and phrases that tend to mark a hook, reveal or reaction
+VIRAL_KEYWORDS = [
+    'amazing', 'incredible', 'insane', 'crazy', 'unbelievable', 'wow', 'boom',
+    'watch', 'look', 'secret', 'never', 'best', 'worst', 'shocking', 'mind',
+    'viral', 'wait', 'finally', 'huge', 'epic', 'fail', 'win', 'omg', 'what'
+]
+
+# Visual description terms that suggest a high-energy shot
+VISUAL_KEYWORDS = [
+    'dramatic', 'zoom', 'quick cut', 'close-up', 'close up', 'reaction',
+    'explosion', 'flash', 'slow motion', 'spotlight', 'reveal', 'jump', 'shock'
+]
+
+# Relative weight of each feature in the segment score
+FEATURE_WEIGHTS = {
+    'keywords': 0.35,
+    'punctuation': 0.2,
+    'speech_rate': 0.2,
+    'visuals': 0.25
+}
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    """Scale a feature to [0, 1] by its maximum."""
+    peak = values.max() if values.size else 0.0
+    return values / peak if peak > 0 else np.zeros_like(values)
+
+
+def _keyword_counts(texts: np.ndarray, keywords: List[str]) -> np.ndarray:
+    """Total keyword occurrences per text, one vectorized pass per keyword."""
+    counts = np.zeros(texts.shape, dtype=np.float64)
+    for keyword in keywords:
+        counts += np.char.count(texts, keyword)
+    return counts
+
+
+def score_segments(transcript: TranscriptIndex, visuals: TranscriptIndex = None) -> np.ndarray:
+    """
+    Score every transcript segment for viral potential.
+    
+    Features are keyword density, exclamation/question density, speech
+    rate and how many (and how intense) visual events fall inside the
+    segment. Each is normalized to [0, 1] before weighting.
+    
+    Args:
+        transcript: Index of the transcript
+        visuals: Optional index of the visual descriptions
+    
+    Returns:
+        Array of scores in [0, 1], one per segment
+    """
+    count = len(transcript)
+    if count == 0:
+        return np.zeros(0)
+    
+    texts = np.char.lower(np.array([transcript.text(i) for i in range(count)], dtype=str))
+    starts = np.frombuffer(transcript.starts, dtype=np.float64)
+    ends = np.append(starts[1:], transcript.duration)
+    durations = np.maximum(ends - starts, 1.0)
+    
+    words = np.char.count(np.char.strip(texts), ' ') + 1
+    keywords = _keyword_counts(texts, VIRAL_KEYWORDS) / words
+    punctuation = (np.char.count(texts, '!') + np.char.count(texts, '?')) / words
+    speech_rate = words / durations
+    
+    visual_score = np.zeros(count)
+    if visuals is not None and len(visuals):
+        visual_starts = np.frombuffer(visuals.starts, dtype=np.float64)
+        visual_texts = np.char.lower(
+            np.array([visuals.text(i) for i in range(len(visuals))], dtype=str)
+        )
+        # Every event counts once, plus once per high-energy term
+        intensity = 1.0 + _keyword_counts(visual_texts, VISUAL_KEYWORDS)
+        cumulative = np.concatenate(([0.0], np.cumsum(intensity)))
+        left = np.searchsorted(visual_starts, starts, side='left')
+        right = np.searchsorted(visual_starts, ends, side='left')
+        visual_score = cumulative[right] - cumulative[left]
+    
+    return (
+        FEATURE_WEIGHTS['keywords'] * _normalize(keywords)
+        + FEATURE_WEIGHTS['punctuation'] * _normalize(punctuation)
+        + FEATURE_WEIGHTS['speech_rate'] * _normalize(speech_rate)
+        + FEATURE_WEIGHTS['visuals'] * _normalize(visual_score)
+    )
+
+
+def smooth_scores(transcript: TranscriptIndex, scores: np.ndarray,
+                  context_seconds: float = 10.0) -> np.ndarray:
+    """
+    Blend each segment's score with the mean score of its neighbourhood.
+    
+    Isolated spikes keep some surrounding context and busy stretches win
+    over single lines.
+    
+    Args:
+        transcript: Index of the transcript
+        scores: Segment scores from score_segments
+        context_seconds: Neighbourhood radius in seconds
+    
+    Returns:
+        Smoothed scores, one per segment
+    """
+    starts = np.frombuffer(transcript.starts, dtype=np.float64)
+    cumulative = np.concatenate(([0.0], np.cumsum(scores)))
+    low = np.searchsorted(starts, starts - context_seconds, side='left')
+    high = np.searchsorted(starts, starts + context_seconds, side='right')
+    neighbourhood = (cumulative[high] - cumulative[low]) / (high - low)
+    return 0.5 * scores + 0.5 * neighbourhood
+
+
+def select_regions(transcript: TranscriptIndex, scores: np.ndarray, keep_ratio: float,
+                   context_seconds: float = 10.0) -> List[Tuple[float, float]]:
+    """
+    Pick the highest scoring stretches of the transcript.
+    
+    Segments are ranked on their smoothed scores and exactly
+    ceil(keep_ratio * segments) of them are kept.
+    
+    Args:
+        transcript: Index of the transcript
+        scores: Segment scores from score_segments
+        keep_ratio: Fraction of segments to keep (0-1)
+        context_seconds: Neighbourhood used to smooth the scores
+    
+    Returns:
+        Sorted, non-overlapping (start, end) regions
+    """
+    count = len(transcript)
+    keep = min(count, max(1, math.ceil(count * keep_ratio)))
+    
+    starts = np.frombuffer(transcript.starts, dtype=np.float64)
+    ends = np.append(starts[1:], transcript.duration)
+    ranking = smooth_scores(transcript, scores, context_seconds)
+    
+    selected = np.sort(np.argpartition(-ranking, keep - 1)[:keep])
+    
+    # Merge runs of consecutive segments into one region
+    breaks = np.flatnonzero(np.diff(selected) > 1)
+    run_starts = selected[np.concatenate(([0], breaks + 1))]
+    run_ends = selected[np.concatenate((breaks, [len(selected) - 1]))]
+    return [(float(starts[i]), float(ends[j])) for i, j in zip(run_starts, run_ends)]
+
+
+def prune_transcript(transcription: str, visuals_description: str = "",
+                     keep_ratio: float = 0.3,
+                     context_seconds: float = 10.0) -> Tuple[str, str, Dict]:
+    """
+    Keep only the most promising regions of a transcript and its visuals.
+    
+    Kept lines retain their original timestamps, so moment times returned
+    for the pruned text still refer to the full video.
+    
+    Args:
+        transcription: Transcription with timestamps in format "[00:00:00] text"
+        visuals_description: Description of visual elements with timestamps
+        keep_ratio: Fraction of segments to keep (0-1); 1 disables pruning
+        context_seconds: Neighbourhood used to smooth segment scores
+    
+    Returns:
+        Tuple of (pruned transcription, pruned visuals, stats) where stats has
+        segments, kept_segments, pruning_ratio, chars_before and chars_after
+    """
+    transcript = TranscriptIndex.parse(transcription)
+    visuals = TranscriptIndex.parse(visuals_description)
+    
+    if keep_ratio >= 1 or not transcript.has_timestamps:
+        stats = {
+            'segments': len(transcript),
+            'kept_segments': len(transcript),
+            'pruning_ratio': 0.0,
+            'chars_before': len(transcription),
+            'chars_after': len(transcription)
+        }
+        return transcription, visuals_description, stats
+    
+    scores = score_segments(transcript, visuals if visuals.has_timestamps else None)
+    regions = select_regions(transcript, scores, keep_ratio, context_seconds)
+    
+    pruned_text = '\n'.join(transcript.slice_text(start, end) for start, end in regions)
+    pruned_visuals = visuals_description
+    if visuals.has_timestamps:
+        pruned_visuals = '\n'.join(
+            text for text in (visuals.slice_text(start, end) for start, end in regions) if text
+        )
+    
+    kept = sum(len(transcript.overlapping(start, end)) for start, end in regions)
+    stats = {
+        'segments': len(transcript),
+        'kept_segments': kept,
+        'pruning_ratio': 1 - kept / len(transcript),
+        'chars_before': len(transcription),
+        'chars_after': len(pruned_text)
+    }
+    return pruned_text, pruned_visuals, stats
@@ -0,0 +1,131 @@
+"""
+Render Profiles Module
+Named encoder settings shared by every render path.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+
+# fps: 'source' keeps the source frame rate, a number forces a fixed rate
+# threads: None uses every CPU core
+RENDER_PROFILES = {
+    'preview': {
+        'preset': 'ultrafast',
+        'crf': 32,
+        'threads': None,
+        'fps': 15,
+        'audio_bitrate': '64k',
+        'description': 'Low-resolution proxy preview'
+    },
+    'draft': {
+        'preset': 'ultrafast',
+        'crf': 30,
+        'threads': None,
+        'fps': 24,
+        'audio_bitrate': '96k',
+        'description': 'Fast preview for editors'
+    },
+    'standard': {
+        'preset': 'medium',
+        'crf': 23,
+        'threads': None,
+        'fps': 'source',
+        'audio_bitrate': '192k',
+        'description': 'Default quality for published clips'
+    },
+    'archive': {
+        'preset': 'slow',
+        'crf': 18,
+        'threads': None,
+        'fps': 'source',
+        'audio_bitrate': '320k',
+        'description': 'High quality master copy'
+    }
+}
+
+DEFAULT_PROFILE = 'standard'
+
+
+def get_profile(name: str = None) -> Dict:
+    """
+    Look up a render profile by name.
+    
+    Args:
+        name: Profile name (defaults to DEFAULT_PROFILE)
+    
+    Returns:
+        Copy of the profile settings, including its name
+    """
+    name = name or DEFAULT_PROFILE
+    if name not in RENDER_PROFILES:
+        raise ValueError(
+            f"Unknown render profile: {name}. Choose from {', '.join(RENDER_PROFILES)}"
+        )
+    return {'name': name, **RENDER_PROFILES[name]}
+
+
+def resolve_fps(profile: Dict, source_fps: Optional[float]) -> Optional[float]:
+    """
+    Output frame rate for a profile.
+    
+    Args:
+        profile: Render profile
+        source_fps: Frame rate of the source, if known
+    
+    Returns:
+        Frame rate to encode at (None lets the writer use the clip's own)
+    """
+    if profile['fps'] == 'source':
+        return source_fps
+    return profile['fps']
+
+
+def resolve_threads(profile: Dict, threads: int = None) -> int:
+    """Encoder thread count, preferring an explicit override."""
+    return threads or profile['threads'] or os.cpu_count() or 1
+
+
+def moviepy_write_kwargs(profile: Dict, threads: int = None) -> Dict:
+    """
+    Keyword arguments for MoviePy's write_videofile.
+    
+    Frame rate is resolved separately since it depends on the clip.
+    
+    Args:
+        profile: Render profile
+        threads: Optional encoder thread override
+    
+    Returns:
+        Keyword arguments (codec, preset, threads, audio and CRF settings)
+    """
+    return {
+        'codec': 'libx264',
+        'audio_codec': 'aac',
+        'preset': profile['preset'],
+        'threads': resolve_threads(profile, threads),
+        'audio_bitrate': profile['audio_bitrate'],
+        'ffmpeg_params': ['-crf', str(profile['crf'])]
+    }
+
+
+def ffmpeg_encoder_args(profile: Dict, threads: int = None) -> List[str]:
+    """
+    Output encoder arguments for a direct ffmpeg invocation.
+    
+    Args:
+        profile: Render profile
+        threads: Optional encoder thread override
+    
+    Returns:
+        ffmpeg arguments matching moviepy_write_kwargs
+    """
+    return [
+        '-c:v', 'libx264',
+        '-preset', profile['preset'],
+        '-crf', str(profile['crf']),
+        '-pix_fmt', 'yuv420p',
+        '-threads', str(resolve_threads(profile, threads)),
+        '-c:a', 'aac',
+        '-b:a', profile['audio_bitrate']
+    ]
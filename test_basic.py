@@ -42,9 +42,39 @@ def test_video_editor():
     """Test video editor initialization."""
     print("\nTesting Video Editor...")
     try:
+        import tempfile
         from video_editor import ViralVideoEditor
-        editor = ViralVideoEditor()
+        editor = ViralVideoEditor(output_dir=tempfile.mkdtemp())
         print("✅ Editor initialized successfully")
+        
+        # Without keyframes prefetch re-encodes; each cut needs its own reader
+        users = []
+        
+        def extract_clip(self, video_path, start_time, end_time, output_path=None, on_progress=None):
+            users.append(self)
+            open(output_path, 'w').close()
+            return output_path
+        
+        originals = ViralVideoEditor.get_keyframe_times, ViralVideoEditor.extract_clip
+        ViralVideoEditor.get_keyframe_times = lambda self, *args, **kwargs: []
+        ViralVideoEditor.extract_clip = extract_clip
+        try:
+            moments = [{'start_time': 10.0 * i, 'end_time': 10.0 * i + 5, 'score': i} for i in range(4)]
+            _, render_moments = editor.prefetch_clips('source.mp4', iter(moments))
+        finally:
+            ViralVideoEditor.get_keyframe_times, ViralVideoEditor.extract_clip = originals
+        
+        assert all(moment.get('prefetched') for moment in render_moments)
+        assert len({id(user) for user in users}) == len(moments) and editor not in users
+        editor.cleanup_prefetched(render_moments)
+        print("✅ Prefetch fallback uses one editor per cut")
+        
+        # A start before the first probed keyframe can't be stream-copied without losing its head
+        assert ViralVideoEditor._snap_to_keyframe([12.0, 14.0], 13.0) == 12.0
+        assert ViralVideoEditor._snap_to_keyframe([12.0, 14.0], 13.9, 'nearest') == 14.0
+        assert ViralVideoEditor._snap_to_keyframe([12.0, 14.0], 10.0) is None
+        assert ViralVideoEditor._snap_to_keyframe([12.0, 14.0], 10.0, 'nearest') is None
+        print("✅ Keyframe snapping never cuts after the requested start")
         return True
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -64,6 +94,381 @@ def test_tts_generator():
         return False
 
 
+def test_overlay_cache():
+    """Test overlay cache hits, misses and LRU eviction."""
+    print("\nTesting Overlay Cache...")
+    try:
+        import numpy as np
+        from overlay_cache import OverlayCache
+        cache = OverlayCache(max_entries=2)
+        renders = []
+        
+        def render():
+            renders.append(1)
+            return np.zeros((4, 4, 4), dtype=np.uint8)
+        
+        key = OverlayCache.make_key(text="WAIT FOR IT...", width=980)
+        cache.get_or_render(key, render)
+        cache.get_or_render(key, render)
+        assert len(renders) == 1
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+        
+        cache.put("b", render())
+        cache.put("c", render())
+        assert cache.get(key) is None
+        print("✅ Overlay cache works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_text_renderer():
+    """Test in-process text rendering produces a wrapped RGBA image."""
+    print("\nTesting Text Renderer...")
+    try:
+        from text_renderer import render_text
+        image = render_text("WAIT FOR IT... this one is going to be wild", 400)
+        assert image.ndim == 3 and image.shape[1] == 400 and image.shape[2] == 4
+        assert image[:, :, 3].max() == 255
+        assert (image == render_text("WAIT FOR IT... this one is going to be wild", 400)).all()
+        print("✅ Text renderer works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_response_cache():
+    """Test LLM response cache storage, expiry and eviction."""
+    print("\nTesting Response Cache...")
+    try:
+        import tempfile
+        from llm_cache import ResponseCache
+        path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+        cache = ResponseCache(path, ttl=60, max_entries=2)
+        key = ResponseCache.make_key('model', [{'role': 'user', 'content': 'hi'}], 0.7, 100)
+        
+        assert cache.get(key) is None
+        cache.put(key, '[]')
+        assert cache.get(key) == '[]'
+        
+        cache.put('b', '1')
+        cache.put('c', '2')
+        assert cache.stats()['entries'] == 2
+        
+        expired = ResponseCache(path, ttl=0)
+        assert expired.get('c') is None
+        print("✅ Response cache works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_transcript_index():
+    """Test timestamped transcript parsing, range lookup and snapping."""
+    print("\nTesting Transcript Index...")
+    try:
+        from transcript_index import TranscriptIndex, parse_timestamp
+        assert parse_timestamp("[01:02:03] text") == 3723.0
+        assert parse_timestamp("no timestamp") is None
+        
+        index = TranscriptIndex.parse(
+            "[00:00:05] first\n[00:00:15] second\ncontinued\n[00:00:25] third"
+        )
+        assert len(index) == 3
+        assert index.text(1) == "second continued"
+        assert list(index.overlapping(10, 20)) == [0, 1]
+        assert index.slice_text(16, 24) == "[00:00:15] second continued"
+        assert index.snap_range(14.2, 26.0) == (15.0, 25.0)
+        assert index.snap_range(20, 10) is None
+        assert index.snap_range(21.0, 90.0) == (21.0, index.duration)
+        print("✅ Transcript index works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_prefilter():
+    """Test that the transcript pre-filter keeps the high-energy segments."""
+    print("\nTesting Transcript Pre-filter...")
+    try:
+        from prefilter import prune_transcript
+        lines = [f"[00:{t // 60:02d}:{t % 60:02d}] Let me set this part up" for t in range(0, 600, 10)]
+        lines[30] = "[00:05:00] WOW! Watch this, it's insane!"
+        pruned, _, stats = prune_transcript('\n'.join(lines), keep_ratio=0.1)
+        
+        assert "WOW!" in pruned
+        assert stats['kept_segments'] == 6
+        assert abs(stats['pruning_ratio'] - 0.9) < 1e-9
+        print("✅ Pre-filter works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_heuristic_analyzer():
+    """Test the offline heuristic analyzer on the example files."""
+    print("\nTesting Heuristic Analyzer...")
+    try:
+        from heuristic_analyzer import HeuristicAnalyzer
+        from transcript_index import TranscriptIndex
+        with open('example_transcription.txt') as f:
+            transcription = f.read()
+        with open('example_visuals.txt') as f:
+            visuals = f.read()
+        
+        analyzer = HeuristicAnalyzer()
+        moments = analyzer.analyze_transcription(transcription, visuals)
+        assert moments and moments == analyzer.analyze_transcription(transcription, visuals)
+        assert all(
+            {'start_time', 'end_time', 'score', 'reason', 'hook'} <= set(moment)
+            for moment in moments
+        )
+        duration = TranscriptIndex.parse(transcription).duration
+        assert all(0 <= m['start_time'] < m['end_time'] <= duration for m in moments)
+        
+        # A peak in the last line still yields a moment inside the source
+        ending = "[00:00:00] hello there\n[00:00:20] calm\n[00:00:40] WOW this is INSANE!!!"
+        late = analyzer.analyze_transcription(ending)[0]
+        assert late['end_time'] <= TranscriptIndex.parse(ending).duration
+        assert late['end_time'] - late['start_time'] == analyzer.moment_length
+        
+        overlays, script = analyzer.generate_moment_content(moments)
+        assert len(overlays) == len(moments) and script
+        print("✅ Heuristic analyzer works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_call_policy():
+    """Test retries and structured errors of the Groq call policy."""
+    print("\nTesting Call Policy...")
+    try:
+        from call_policy import CallPolicy, LLMCallError
+        policy = CallPolicy(max_retries=2, backoff_base=0.01, hedge_percentile=0)
+        replies = iter([ValueError("not JSON"), "ok"])
+        
+        def flaky(timeout):
+            reply = next(replies)
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+        
+        assert policy.call(flaky) == "ok"
+        
+        def broken(timeout):
+            raise RuntimeError("boom")
+        
+        try:
+            policy.call(broken, label='broken')
+            assert False, "expected LLMCallError"
+        except LLMCallError as e:
+            assert e.kind == 'unknown' and e.attempts == 1
+        
+        stats = policy.stats()
+        assert stats['retries'] == 1 and stats['failures'] == {'unknown': 1}
+        
+        from types import SimpleNamespace
+        from viral_analyzer import ViralMomentAnalyzer
+        from heuristic_analyzer import HeuristicAnalyzer
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: broken(None))))
+        analyzer = ViralMomentAnalyzer(api_key='test', client=client, use_cache=False, policy=policy)
+        for call in (lambda: analyzer.analyze_transcription("[00:00:05] Hello"),
+                     lambda: analyzer.generate_tts_script([])):
+            try:
+                call()
+                assert False, "expected LLMCallError"
+            except LLMCallError as e:
+                assert e.to_dict()['kind'] == 'unknown'
+        
+        analyzer.fallback = HeuristicAnalyzer()
+        assert isinstance(analyzer.analyze_transcription("[00:00:05] Hello"), list)
+        print("✅ Call policy works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_json_extract():
+    """Test tolerant and streaming JSON array extraction."""
+    print("\nTesting JSON Extraction...")
+    try:
+        from json_extract import extract_json_array, iter_json_array
+        reply = 'Here you go:\n```json\n[{"text": "WAIT ]", "delay": 0}, {"text": "NO WAY!"}]\n```'
+        assert extract_json_array(reply) == [{"text": "WAIT ]", "delay": 0}, {"text": "NO WAY!"}]
+        assert extract_json_array('[{"a": 1}, {"b": 2}, {"c":') == [{"a": 1}, {"b": 2}]
+        
+        chunks = ['[{"start_', 'time": 1}, {"start_time"', ': 2}]']
+        assert list(iter_json_array(chunks)) == [{"start_time": 1}, {"start_time": 2}]
+        print("✅ JSON extraction works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_job_store():
+    """Test job store claiming, progress events, counters and recovery of interrupted jobs."""
+    print("\nTesting Job Store...")
+    try:
+        import socket
+        import tempfile
+        from job_queue import JobProgress, JobStore, run_job
+        store = JobStore(os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3'), max_attempts=2)
+        first = store.create('compile', {'video_path': 'a.mp4'})
+        second = store.create('compile', {'video_path': 'b.mp4'})
+        
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        assert store.claim(owner, limit=1)['id'] == first
+        assert store.claim(owner, limit=1) is None
+        progress = JobProgress(store, first)
+        progress('extract', 0.2, moment=0, moments=2)
+        progress('compile', 0.5)
+        progress.close()
+        assert store.get(first)['stage'] == 'compile'
+        assert [e['type'] for e in store.events(first)] == [
+            'stage_start', 'stage_end', 'stage_start', 'stage_end'
+        ]
+        assert list(store.timings(first)) == ['extract', 'compile']
+        store.add_event(first, 'counters', data={'groq_calls': {'calls': 2, 'failures': {'timeout': 1}}})
+        store.add_event(first, 'counters', data={'groq_calls': {'calls': 3, 'failures': {}}})
+        assert store.counter_totals() == {'groq_calls': {'calls': 5, 'failures': {'timeout': 1}}}
+        store.finish(first, {'output_path': 'outputs/a.mp4'})
+        assert store.get(first)['result'] == {'output_path': 'outputs/a.mp4'}
+        
+        # A job claimed by a process that has since exited goes back to the queue
+        assert store.claim(f"{socket.gethostname()}:999999999", limit=1)['id'] == second
+        assert store.requeue_orphaned() == 1
+        assert store.get(second)['status'] == 'queued'
+        
+        # A failed Groq call is recorded with its kind
+        from call_policy import LLMCallError
+        
+        def timed_out(payload, progress):
+            raise LLMCallError('timeout', 'Request timed out', retryable=True)
+        
+        run_job(store.path, second, timed_out)
+        assert store.get(second)['status'] == 'failed'
+        assert store.get(second)['result']['kind'] == 'timeout'
+        print("✅ Job store works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_job_workspace():
+    """Test per-job working directories are private and removed afterwards."""
+    print("\nTesting Job Workspace...")
+    try:
+        import tempfile
+        from pipeline import job_workspace, publish_output
+        output_dir = tempfile.mkdtemp()
+        scratch_root = os.path.join(output_dir, 'scratch')
+        
+        with job_workspace(output_dir) as (render_a, _), job_workspace(output_dir, scratch_root) as (render_b, scratch_b):
+            assert render_a != render_b
+            assert os.path.dirname(scratch_b) == scratch_root
+            rendered = os.path.join(render_b, 'viral.mp4')
+            open(rendered, 'w').close()
+            published = [publish_output(rendered, output_dir)]
+            open(rendered, 'w').close()
+            published.append(publish_output(rendered, output_dir))
+        
+        assert published[0] != published[1] and all(os.path.exists(p) for p in published)
+        assert not any(os.path.exists(d) for d in (render_a, render_b, scratch_b))
+        print("✅ Job workspace works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_upload_store():
+    """Test uploads are stored by content hash and duplicates are not stored again."""
+    print("\nTesting Upload Store...")
+    try:
+        import io
+        import tempfile
+        from upload_store import UploadStore
+        store = UploadStore(tempfile.mkdtemp(), chunk_size=1024)
+        content = os.urandom(10000)
+        
+        first = store.save(io.BytesIO(content))
+        second = store.save(io.BytesIO(content))
+        other = store.save(io.BytesIO(b'different'))
+        
+        assert not first['deduplicated'] and second['deduplicated']
+        assert second['path'] == first['path'] and other['path'] != first['path']
+        with open(first['path'], 'rb') as f:
+            assert f.read() == content
+        assert os.listdir(store.incoming_dir) == []
+        
+        # Concurrent uploads of new content that miss the lookup together still store one copy
+        from concurrent.futures import ThreadPoolExecutor
+        content = os.urandom(10000)
+        store.find = lambda digest: None
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: store.save(io.BytesIO(content)), range(4)))
+        assert len({result['path'] for result in results}) == 1
+        assert sum(not result['deduplicated'] for result in results) == 1
+        assert len([name for name in os.listdir(store.root) if not name.startswith('.')]) == 3
+        print("✅ Upload store works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+def test_upload_route():
+    """Test /upload streams multipart files into the store and deduplicates them."""
+    print("\nTesting Upload Route...")
+    try:
+        import io
+        import hashlib
+        import tempfile
+        import app
+        from upload_store import HashingFile, UploadStore
+        app.upload_store, original_store = UploadStore(tempfile.mkdtemp()), app.upload_store
+        try:
+            client = app.app.test_client()
+            content = os.urandom(600 * 1024)  # above Werkzeug's in-memory limit
+            digest = hashlib.sha256(content).hexdigest()
+            
+            # Werkzeug writes the file straight into a hashing temp file
+            with app.app.test_request_context(
+                '/upload', method='POST', content_type='multipart/form-data',
+                data={'videos': (io.BytesIO(content), 'clip.mp4')}
+            ) as ctx:
+                stream = ctx.request.files['videos'].stream
+                assert isinstance(stream, HashingFile) and stream.hexdigest() == digest
+            
+            responses = [
+                client.post('/upload', data={'videos': (io.BytesIO(content), name)},
+                            content_type='multipart/form-data').get_json()['files'][0]
+                for name in ('clip.mp4', 'copy.mov')
+            ]
+            
+            assert responses[0]['path'] == app.upload_store.path_for(digest)
+            assert not responses[0]['deduplicated'] and responses[1]['deduplicated']
+            assert responses[1]['path'] == responses[0]['path']
+            assert os.listdir(app.upload_store.incoming_dir) == []
+        finally:
+            app.upload_store = original_store
+        print("✅ Upload route works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
 def test_flask_app():
     """Test Flask app can be imported."""
     print("\nTesting Flask App...")
@@ -99,6 +504,18 @@ def main():
         test_viral_analyzer,
         test_video_editor,
         test_tts_generator,
+        test_overlay_cache,
+        test_text_renderer,
+        test_response_cache,
+        test_transcript_index,
+        test_prefilter,
+        test_heuristic_analyzer,
+        test_call_policy,
+        test_json_extract,
+        test_job_store,
+        test_job_workspace,
+        test_upload_store,
+        test_upload_route,
         test_flask_app,
         test_cli
     ]
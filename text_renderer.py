@@ -0,0 +1,139 @@
+"""
+Text Renderer Module
+Renders on-screen text overlays in-process with Pillow and NumPy.
+"""
+
+import os
+from functools import lru_cache
+from typing import List, Tuple
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+
+# Candidate font files tried for a font name, in order
+FONT_FALLBACKS = {
+    'Arial-Bold': ['Arial Bold.ttf', 'Arial_Bold.ttf', 'arialbd.ttf', 'DejaVuSans-Bold.ttf',
+                   'LiberationSans-Bold.ttf'],
+    'Arial': ['Arial.ttf', 'arial.ttf', 'DejaVuSans.ttf', 'LiberationSans-Regular.ttf']
+}
+
+FONT_DIRS = [
+    '/usr/share/fonts/truetype/dejavu',
+    '/usr/share/fonts/truetype/liberation',
+    '/usr/share/fonts/truetype/msttcorefonts',
+    '/usr/share/fonts/TTF',
+    '/Library/Fonts',
+    '/System/Library/Fonts/Supplemental',
+    'C:\\Windows\\Fonts'
+]
+
+
+@lru_cache(maxsize=32)
+def load_font(font: str, fontsize: int) -> ImageFont.ImageFont:
+    """
+    Resolve a font name or path to a Pillow font.
+    
+    OVERLAY_FONT_PATH overrides the lookup. Falls back to Pillow's
+    built-in font so rendering never fails on a missing font.
+    
+    Args:
+        font: Font name (e.g. 'Arial-Bold') or path to a font file
+        fontsize: Font size in pixels
+    
+    Returns:
+        Loaded font
+    """
+    candidates = [os.getenv('OVERLAY_FONT_PATH'), font]
+    candidates += FONT_FALLBACKS.get(font, [f"{font}.ttf"])
+    
+    for candidate in candidates:
+        if not candidate:
+            continue
+        paths = [candidate] + [os.path.join(d, candidate) for d in FONT_DIRS]
+        for path in paths:
+            try:
+                return ImageFont.truetype(path, fontsize)
+            except OSError:
+                continue
+    
+    print(f"Font '{font}' not found, using Pillow's default font")
+    return ImageFont.load_default(size=fontsize)
+
+
+def wrap_text(text: str, font: ImageFont.ImageFont, max_width: int) -> List[str]:
+    """
+    Greedy word-wrap so each line fits within max_width pixels.
+    
+    Args:
+        text: Text to wrap
+        font: Font used for measuring
+        max_width: Maximum line width in pixels
+    
+    Returns:
+        Wrapped lines (a single over-long word keeps its own line)
+    """
+    lines = []
+    for paragraph in text.splitlines() or ['']:
+        current = ''
+        for word in paragraph.split():
+            candidate = f"{current} {word}" if current else word
+            if current and font.getlength(candidate) > max_width:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        lines.append(current)
+    return lines
+
+
+def render_text(text: str, width: int, fontsize: int = 60, color: str = 'white',
+                font: str = 'Arial-Bold', stroke_color: str = 'black',
+                stroke_width: int = 2, line_spacing: float = 1.15) -> np.ndarray:
+    """
+    Render centred, word-wrapped, stroked text to an RGBA array.
+    
+    Matches the layout of MoviePy's TextClip(method='caption', size=(width, None)):
+    the image is exactly `width` wide and as tall as the wrapped text.
+    
+    Args:
+        text: Text to render
+        width: Image width in pixels (text wraps inside it)
+        fontsize: Font size in pixels
+        color: Fill colour
+        font: Font name or path
+        stroke_color: Outline colour
+        stroke_width: Outline width in pixels
+        line_spacing: Line height as a multiple of the font size
+    
+    Returns:
+        RGBA image array (height x width x 4, uint8)
+    """
+    pil_font = load_font(font, fontsize)
+    margin = stroke_width
+    lines = wrap_text(text, pil_font, max(1, width - 2 * margin))
+    
+    ascent, descent = pil_font.getmetrics()
+    line_height = max(int(round(fontsize * line_spacing)), ascent + descent)
+    height = line_height * (len(lines) - 1) + ascent + descent + 2 * margin
+    
+    image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    fill = _rgba(color)
+    stroke_fill = _rgba(stroke_color)
+    
+    for i, line in enumerate(lines):
+        line_width = pil_font.getlength(line)
+        x = (width - line_width) / 2
+        y = margin + i * line_height
+        draw.text(
+            (x, y), line, font=pil_font, fill=fill,
+            stroke_width=stroke_width, stroke_fill=stroke_fill
+        )
+    
+    return np.asarray(image, dtype=np.uint8)
+
+
+def _rgba(color: str) -> Tuple[int, int, int, int]:
+    """Convert a colour name or hex string to an opaque RGBA tuple."""
+    rgb = ImageColor.getrgb(color)
+    return rgb[:3] + (rgb[3] if len(rgb) == 4 else 255,)
@@ -0,0 +1,201 @@
+"""
+Transcript Index Module
+Parses "[HH:MM:SS] text" transcripts and visual descriptions into a sorted
+segment index with binary-search time lookups.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+
+TIMESTAMP_PATTERN = re.compile(r'^\s*\[(\d+):(\d{2})(?::(\d{2}))?(?:\.(\d+))?\]\s*')
+
+# Length assumed for the last segment, which has no following timestamp
+DEFAULT_LAST_SEGMENT = 5.0
+
+
+def parse_timestamp(line: str) -> Optional[float]:
+    """
+    Read the leading [HH:MM:SS] or [MM:SS] timestamp of a line.
+    
+    Args:
+        line: Transcript line
+    
+    Returns:
+        Time in seconds, or None if the line has no timestamp
+    """
+    match = TIMESTAMP_PATTERN.match(line)
+    if not match:
+        return None
+    
+    first, second, third, fraction = match.groups()
+    if third is None:
+        seconds = int(first) * 60 + int(second)
+    else:
+        seconds = int(first) * 3600 + int(second) * 60 + int(third)
+    if fraction:
+        seconds += float(f"0.{fraction}")
+    return float(seconds)
+
+
+class TranscriptIndex:
+    """Sorted, compact index of timestamped segments."""
+    
+    def __init__(self, segments: List[Tuple[float, str]],
+                 last_segment_duration: float = DEFAULT_LAST_SEGMENT):
+        """
+        Build an index from (start_time, line) pairs.
+        
+        Segment i runs from its own start to the start of segment i + 1.
+        Start times live in one array and the lines in one string, so a
+        long transcript costs little more than its text.
+        
+        Args:
+            segments: (start_time, line) pairs, in any order
+            last_segment_duration: Length of the final segment
+        """
+        segments = sorted(segments, key=lambda segment: segment[0])
+        self.starts = array('d', (start for start, _ in segments))
+        self.offsets = array('l', [0])
+        
+        parts = []
+        position = 0
+        for _, line in segments:
+            line = line.rstrip('\n') + '\n'
+            parts.append(line)
+            position += len(line)
+            self.offsets.append(position)
+        self._text = ''.join(parts)
+        
+        self.duration = self.starts[-1] + last_segment_duration if segments else 0.0
+        self.has_timestamps = bool(segments)
+    
+    @classmethod
+    def parse(cls, text: str, last_segment_duration: float = DEFAULT_LAST_SEGMENT) -> 'TranscriptIndex':
+        """
+        Parse "[HH:MM:SS] text" formatted text.
+        
+        Lines without a timestamp continue the previous segment; text before
+        the first timestamp starts at 0.
+        
+        Args:
+            text: Transcript or visual description text
+            last_segment_duration: Length of the final segment
+        
+        Returns:
+            TranscriptIndex
+        """
+        segments = []
+        timestamped = False
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            start = parse_timestamp(line)
+            timestamped = timestamped or start is not None
+            if start is None and segments:
+                segments[-1] = (segments[-1][0], f"{segments[-1][1]} {line.strip()}")
+            else:
+                segments.append((start or 0.0, line.strip()))
+        
+        index = cls(segments, last_segment_duration)
+        index.has_timestamps = timestamped
+        return index
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    def end_of(self, i: int) -> float:
+        """End time of segment i."""
+        return self.starts[i + 1] if i + 1 < len(self.starts) else self.duration
+    
+    def line(self, i: int) -> str:
+        """Original line of segment i, including its timestamp."""
+        return self._text[self.offsets[i]:self.offsets[i + 1] - 1]
+    
+    def text(self, i: int) -> str:
+        """Text of segment i without its timestamp."""
+        return TIMESTAMP_PATTERN.sub('', self.line(i), count=1)
+    
+    def segment(self, i: int) -> Dict:
+        """Segment i as a dict with start_time, end_time and text."""
+        return {'start_time': self.starts[i], 'end_time': self.end_of(i), 'text': self.text(i)}
+    
+    def overlapping(self, start: float, end: float) -> range:
+        """
+        Indices of segments overlapping [start, end), in O(log n).
+        
+        Args:
+            start: Range start in seconds
+            end: Range end in seconds
+        
+        Returns:
+            Range of segment indices
+        """
+        first = max(0, bisect_right(self.starts, start) - 1)
+        if first < len(self.starts) and self.end_of(first) <= start:
+            first += 1
+        last = bisect_left(self.starts, end)
+        return range(first, max(first, last))
+    
+    def slice_text(self, start: float, end: float) -> str:
+        """
+        Original lines of the segments overlapping [start, end).
+        
+        Used to feed only the relevant part of a transcript to a prompt.
+        """
+        indices = self.overlapping(start, end)
+        if not indices:
+            return ''
+        return self._text[self.offsets[indices.start]:self.offsets[indices.stop] - 1]
+    
+    def snap(self, time: float, tolerance: float = 2.0) -> float:
+        """
+        Move a time to the nearest segment boundary if one is within tolerance.
+        
+        Args:
+            time: Time in seconds
+            tolerance: Maximum distance to move, in seconds
+        
+        Returns:
+            Snapped time (never negative)
+        """
+        time = max(0.0, time)
+        if not len(self.starts):
+            return time
+        
+        i = bisect_left(self.starts, time)
+        candidates = [self.starts[j] for j in (i - 1, i) if 0 <= j < len(self.starts)]
+        candidates.append(self.duration)
+        nearest = min(candidates, key=lambda boundary: abs(boundary - time))
+        return nearest if abs(nearest - time) <= tolerance else time
+    
+    def snap_range(self, start_time: float, end_time: float,
+                   tolerance: float = 2.0) -> Optional[Tuple[float, float]]:
+        """
+        Validate, clamp and snap a (start, end) pair returned by the LLM.
+        
+        An end past the last segment is clamped to the transcript duration.
+        
+        Args:
+            start_time: Start in seconds
+            end_time: End in seconds
+            tolerance: Maximum distance to move each end, in seconds
+        
+        Returns:
+            Snapped (start, end), or None if the range is empty or outside the transcript
+        """
+        try:
+            start_time, end_time = float(start_time), float(end_time)
+        except (TypeError, ValueError):
+            return None
+        
+        if not len(self.starts) or end_time <= start_time or start_time >= self.duration:
+            return None
+        
+        start_time = self.snap(start_time, tolerance)
+        end_time = self.snap(min(end_time, self.duration), tolerance)
+        if end_time <= start_time:
+            return None
+        return start_time, end_time
@@ -4,6 +4,7 @@ Handles TTS generation using Groq Play AI or fallback to alternatives.
 """
 
 import os
+import uuid
 import requests
 from typing import Optional
 
@@ -11,17 +12,22 @@ from typing import Optional
 class TTSGenerator:
     """Generate text-to-speech audio for video narration."""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, output_dir: str = "outputs"):
         """
         Initialize TTS generator.
         
         Args:
             api_key: Groq API key for Play AI integration
+            output_dir: Directory for audio files written without an explicit path
         """
         self.api_key = api_key or os.getenv('GROQ_API_KEY')
-        self.output_dir = "outputs"
+        self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
     
+    def default_output_path(self) -> str:
+        """Unique audio path in output_dir, so concurrent generations never collide."""
+        return os.path.join(self.output_dir, f"tts_audio_{uuid.uuid4().hex[:12]}.mp3")
+    
     def generate_tts(self, text: str, output_path: str = None, 
                      voice: str = "default") -> Optional[str]:
         """
@@ -43,7 +49,7 @@ class TTSGenerator:
             Path to generated audio file, or None if failed
         """
         if output_path is None:
-            output_path = os.path.join(self.output_dir, "tts_audio.mp3")
+            output_path = self.default_output_path()
         
         # Placeholder implementation
         # In a real implementation, you would call Groq Play AI API here
@@ -97,7 +103,7 @@ class TTSGenerator:
             raise ValueError("Groq API key required for Play AI TTS")
         
         if output_path is None:
-            output_path = os.path.join(self.output_dir, "tts_audio.mp3")
+            output_path = self.default_output_path()
         
         # TODO: Implement actual Groq Play AI API call
         # Example structure (update when API is documented):
@@ -0,0 +1,161 @@
+"""
+Upload Store Module
+Content-addressed storage for uploaded source videos.
+"""
+
+import os
+import hashlib
+import shutil
+import tempfile
+import threading
+from typing import BinaryIO, Dict
+
+
+class HashingFile:
+    """
+    Temporary file that hashes everything written to it.
+    
+    Used as the stream Werkzeug writes a multipart upload into, so the
+    content hash is known as soon as the request has been parsed, without
+    reading the file back. The file is deleted when closed unless it has
+    been linked into the store.
+    """
+    
+    def __init__(self, directory: str):
+        self._file = tempfile.NamedTemporaryFile(mode='w+b', prefix='upload_', dir=directory)
+        self._hash = hashlib.sha256()
+        self.size = 0
+    
+    @property
+    def name(self) -> str:
+        return self._file.name
+    
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+    
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+    
+    def __getattr__(self, name):
+        # read, seek, flush, close and the rest come from the temporary file
+        return getattr(self._file, name)
+
+
+class UploadStore:
+    """Stores each distinct upload once, under the SHA-256 of its content."""
+    
+    def __init__(self, root: str, chunk_size: int = 1024 * 1024):
+        """
+        Initialize upload store.
+        
+        Args:
+            root: Directory uploads are stored in
+            chunk_size: Bytes read per chunk when copying a stream
+        """
+        self.root = root
+        self.chunk_size = chunk_size
+        self.incoming_dir = os.path.join(root, '.incoming')
+        os.makedirs(self.incoming_dir, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self.stored = 0
+        self.deduplicated = 0
+    
+    def open_incoming(self) -> HashingFile:
+        """
+        Open a temporary file for an upload in progress.
+        
+        It lives next to the store so a new upload can be hard-linked into
+        place instead of copied.
+        
+        Returns:
+            HashingFile to write the upload into
+        """
+        return HashingFile(self.incoming_dir)
+    
+    def path_for(self, digest: str) -> str:
+        """
+        Path an upload with this hash is stored at.
+        
+        The path carries no extension, so the same content uploaded under
+        different names or containers maps to a single file; ffmpeg probes
+        the container from the content.
+        """
+        return os.path.join(self.root, digest)
+    
+    def find(self, digest: str) -> str:
+        """
+        Look up a stored upload by hash.
+        
+        Args:
+            digest: SHA-256 hex digest of the content
+        
+        Returns:
+            Path of the stored file, or None if the content is new
+        """
+        path = self.path_for(digest)
+        return path if os.path.exists(path) else None
+    
+    def save(self, stream: BinaryIO) -> Dict:
+        """
+        Store an uploaded file unless identical content is already stored.
+        
+        A HashingFile (as produced by open_incoming) was hashed while it was
+        received and is linked into place without another write. Any other
+        stream is copied in chunks into a HashingFile first. The link fails
+        if the path already exists, so concurrent uploads of the same
+        content store it once.
+        
+        Args:
+            stream: Uploaded content
+        
+        Returns:
+            Dict with path, sha256, size and deduplicated
+        """
+        if not isinstance(stream, HashingFile):
+            incoming = self.open_incoming()
+            try:
+                shutil.copyfileobj(stream, incoming, self.chunk_size)
+                return self.save(incoming)
+            finally:
+                incoming.close()
+        
+        digest = stream.hexdigest()
+        path = self.find(digest)
+        deduplicated = path is not None
+        
+        if not deduplicated:
+            stream.flush()
+            path = self.path_for(digest)
+            try:
+                # Link rather than rename so the temporary file still cleans itself up
+                os.link(stream.name, path)
+            except FileExistsError:
+                # The same content finished uploading concurrently
+                deduplicated = True
+            except OSError:
+                # No hard links here: copy beside the store, then move into place atomically
+                fd, copy_path = tempfile.mkstemp(prefix='copy_', dir=self.incoming_dir)
+                os.close(fd)
+                shutil.copyfile(stream.name, copy_path)
+                os.replace(copy_path, path)
+        
+        with self._lock:
+            if deduplicated:
+                self.deduplicated += 1
+            else:
+                self.stored += 1
+        
+        return {
+            'path': path,
+            'sha256': digest,
+            'size': stream.size,
+            'deduplicated': deduplicated
+        }
+    
+    def stats(self) -> Dict:
+        """Counts of uploads stored and uploads answered from existing content."""
+        with self._lock:
+            return {'stored': self.stored, 'deduplicated': self.deduplicated}
@@ -4,30 +4,243 @@ Handles video cutting, compilation, transitions, and text overlays.
 """
 
 import os
-from typing import List, Dict, Optional
+import json
+import hashlib
+import shutil
+import subprocess
+import tempfile
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Dict, Optional, Tuple
 from moviepy.editor import (
     VideoFileClip, concatenate_videoclips, TextClip,
     CompositeVideoClip, AudioFileClip, vfx
 )
 from moviepy.video.fx.all import fadein, fadeout
+from proglog import ProgressBarLogger
 import numpy as np
+from PIL import Image
+from overlay_cache import OverlayCache, default_overlay_cache
+from text_renderer import render_text
+from ffmpeg_backend import (
+    FFMPEG_BINARY, FFPROBE_BINARY, build_compilation_command, probe_media, run_ffmpeg
+)
+from render_profiles import (
+    get_profile, resolve_fps, moviepy_write_kwargs, ffmpeg_encoder_args
+)
+
+# Style shared by every on-screen text overlay
+TEXT_STYLE = {
+    'fontsize': 60,
+    'color': 'white',
+    'font': 'Arial-Bold',
+    'stroke_color': 'black',
+    'stroke_width': 2
+}
+TEXT_FADE_DURATION = 0.3
+
+RENDER_BACKENDS = ['moviepy', 'ffmpeg']
+
+
+class FrameProgressLogger(ProgressBarLogger):
+    """MoviePy logger forwarding frame-write progress to a callback."""
+    
+    def __init__(self, on_progress: Callable[[float], None], min_step: float = 0.02):
+        """
+        Initialize the logger.
+        
+        Args:
+            on_progress: Called with the fraction of frames written (0-1)
+            min_step: Smallest change in fraction worth reporting
+        """
+        super().__init__()
+        # Not 'callback', which proglog calls on every state change
+        self.on_progress = on_progress
+        self.min_step = min_step
+        self._last = 0.0
+    
+    def bars_callback(self, bar, attr, value, old_value=None):
+        # 't' is the video frame loop; audio is written under 'chunk'
+        if bar != 't' or attr != 'index':
+            return
+        total = self.bars[bar].get('total')
+        if not total:
+            return
+        fraction = min(1.0, (value + 1) / total)
+        if fraction - self._last >= self.min_step or (fraction >= 1.0 > self._last):
+            self._last = fraction
+            self.on_progress(fraction)
+
+
+def _render_segment(output_dir: str, video_path: str, moment: Dict,
+                    text_overlays: List[Dict], segment_path: str,
+                    add_transitions: bool, transition_duration: float,
+                    threads: int, profile: str = None,
+                    text_scale: float = 1.0, text_backend: str = "pillow",
+                    overlay_cache_dir: str = None) -> str:
+    """
+    Render one moment (cut, overlays, fades) to its own file.
+    
+    Module-level so it can run inside a ProcessPoolExecutor worker. Text
+    settings mirror the parent editor so segments look like a sequential
+    render; overlays share the parent's on-disk cache when it has one.
+    """
+    overlay_cache = OverlayCache(cache_dir=overlay_cache_dir) if overlay_cache_dir else None
+    editor = ViralVideoEditor(
+        output_dir=output_dir, overlay_cache=overlay_cache, text_backend=text_backend,
+        profile=profile, text_scale=text_scale
+    )
+    with editor.source_session():
+        source = editor.open_source(moment.get('video_path', video_path))
+        clip = source.subclip(moment['start_time'], moment['end_time'])
+        
+        if text_overlays:
+            clip = editor.add_text_overlay(clip, text_overlays)
+        if add_transitions:
+            clip = editor.add_transition(clip, transition_duration)
+        
+        editor.write_video(clip, segment_path, threads=threads, logger=None)
+    
+    return segment_path
 
 
 class ViralVideoEditor:
     """Edits videos to create viral compilations."""
     
-    def __init__(self, output_dir: str = "outputs"):
+    def __init__(self, output_dir: str = "outputs", overlay_cache: OverlayCache = None,
+                 text_backend: str = "pillow", profile: str = None,
+                 text_scale: float = 1.0,
+                 progress: Callable[..., None] = None,
+                 scratch_dir: str = None):
         """
         Initialize video editor.
         
         Args:
             output_dir: Directory to save output videos
+            overlay_cache: Cache for rasterized text overlays (defaults to the shared one)
+            text_backend: Text rasterizer, 'pillow' (in-process) or 'imagemagick' (TextClip)
+            profile: Render profile name ('draft', 'standard', 'archive', 'preview')
+            text_scale: Scale of text size and margins, for renders below source resolution
+            progress: Optional callback taking (stage, fraction, **details), called
+                as moments are extracted ('extract'), the compilation is written
+                ('compile') and narration is mixed in ('audio_mix')
+            scratch_dir: Where intermediate files (cut clips, segments, overlay
+                images) are written, each render in its own temporary directory
+                so concurrent renders never share them. Defaults to output_dir;
+                point it at tmpfs to keep them off disk.
         """
+        if text_backend not in ('pillow', 'imagemagick'):
+            raise ValueError(f"Unknown text backend: {text_backend}")
+        
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
+        self.scratch_dir = scratch_dir or output_dir
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        self.overlay_cache = overlay_cache or default_overlay_cache
+        self.text_backend = text_backend
+        self.profile = get_profile(profile)
+        self.text_scale = text_scale
+        self.progress = progress
+        self.text_style = {
+            **TEXT_STYLE,
+            'fontsize': max(1, round(TEXT_STYLE['fontsize'] * text_scale)),
+            'stroke_width': max(1, round(TEXT_STYLE['stroke_width'] * text_scale))
+        }
+        self._sources: Dict[str, VideoFileClip] = {}
+        self._session_depth = 0
+    
+    @contextmanager
+    def source_session(self):
+        """
+        Keep opened source videos alive for the duration of a job.
+        
+        Sessions nest; sources are closed when the outermost one exits.
+        """
+        self._session_depth += 1
+        try:
+            yield self
+        finally:
+            self._session_depth -= 1
+            if self._session_depth == 0:
+                self.close_sources()
+    
+    def open_source(self, video_path: str) -> VideoFileClip:
+        """
+        Get a shared reader for a source video, opening it on first use.
+        
+        Args:
+            video_path: Path to source video
+            
+        Returns:
+            Open video clip shared by every request for this path
+        """
+        key = os.path.abspath(video_path)
+        if key not in self._sources:
+            self._sources[key] = VideoFileClip(video_path)
+        return self._sources[key]
+    
+    def close_sources(self):
+        """Close every cached source reader."""
+        sources, self._sources = self._sources, {}
+        for source in sources.values():
+            try:
+                source.close()
+            except Exception as e:
+                print(f"Error closing source video: {e}")
+    
+    def _report(self, stage: str, fraction: float, **details):
+        """Pass progress to the progress callback, if any."""
+        if self.progress is None:
+            return
+        try:
+            self.progress(stage, min(1.0, fraction), **details)
+        except Exception as e:
+            print(f"Error reporting progress: {e}")
+    
+    def _stage_progress(self, stage: str, start: float = 0.0, span: float = 1.0,
+                        **details) -> Optional[Callable[[float], None]]:
+        """
+        Frame-progress callback reporting into a slice of a stage.
+        
+        Args:
+            stage: Stage name
+            start: Stage fraction at the first frame
+            span: Share of the stage covered by this write
+            **details: Extra details passed with each report
+        
+        Returns:
+            Callback taking the fraction of frames written, or None without
+            a progress callback
+        """
+        if self.progress is None:
+            return None
+        return lambda fraction: self._report(stage, start + span * fraction, **details)
+    
+    def write_video(self, clip, output_path: str, threads: int = None,
+                    on_progress: Callable[[float], None] = None, **kwargs):
+        """
+        Encode a clip with the editor's render profile.
+        
+        Args:
+            clip: Clip to write
+            output_path: Path for output video
+            threads: Optional encoder thread override
+            on_progress: Optional callback taking the fraction of frames written
+            **kwargs: Extra write_videofile arguments
+        """
+        if on_progress is not None:
+            kwargs.setdefault('logger', FrameProgressLogger(on_progress))
+        clip.write_videofile(
+            output_path,
+            fps=resolve_fps(self.profile, clip.fps),
+            **moviepy_write_kwargs(self.profile, threads),
+            **kwargs
+        )
     
     def extract_clip(self, video_path: str, start_time: float, end_time: float, 
-                     output_path: str = None) -> str:
+                     output_path: str = None,
+                     on_progress: Callable[[float], None] = None) -> str:
         """
         Extract a clip from a video.
         
@@ -36,23 +249,24 @@ class ViralVideoEditor:
             start_time: Start time in seconds
             end_time: End time in seconds
             output_path: Optional output path
+            on_progress: Optional callback taking the fraction of frames written
             
         Returns:
             Path to extracted clip
         """
         try:
-            video = VideoFileClip(video_path)
-            clip = video.subclip(start_time, end_time)
-            
-            if output_path is None:
-                output_path = os.path.join(
-                    self.output_dir, 
-                    f"clip_{int(start_time)}_{int(end_time)}.mp4"
-                )
-            
-            clip.write_videofile(output_path, codec='libx264', audio_codec='aac')
-            video.close()
-            clip.close()
+            with self.source_session():
+                video = self.open_source(video_path)
+                clip = video.subclip(start_time, end_time)
+                
+                if output_path is None:
+                    output_path = os.path.join(
+                        self.output_dir, 
+                        f"clip_{int(start_time)}_{int(end_time)}.mp4"
+                    )
+                
+                # The subclip shares the source reader, which the session closes
+                self.write_video(clip, output_path, on_progress=on_progress)
             
             return output_path
         
@@ -60,10 +274,274 @@ class ViralVideoEditor:
             print(f"Error extracting clip: {e}")
             raise
     
+    def get_keyframe_times(self, video_path: str, start_time: float = 0.0,
+                           end_time: float = None) -> List[float]:
+        """
+        List keyframe timestamps of the first video stream.
+        
+        Only packets are demuxed (no decoding), and only the requested
+        window is read, so this stays fast on long sources.
+        
+        Args:
+            video_path: Path to source video
+            start_time: Start of the window to scan in seconds
+            end_time: End of the window to scan (None scans to the end)
+            
+        Returns:
+            Sorted keyframe times in seconds, relative to the start of the file
+        """
+        read_interval = f"{max(0.0, start_time)}%"
+        if end_time is not None:
+            read_interval += f"{end_time}"
+        
+        result = subprocess.run(
+            [
+                FFPROBE_BINARY, '-v', 'error',
+                '-select_streams', 'v:0',
+                '-read_intervals', read_interval,
+                '-show_entries', 'packet=pts_time,flags:format=start_time',
+                '-of', 'json', video_path
+            ],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ffprobe failed: {result.stderr.strip()}")
+        
+        probe = json.loads(result.stdout or '{}')
+        origin = float(probe.get('format', {}).get('start_time') or 0.0)
+        
+        keyframes = set()
+        for packet in probe.get('packets', []):
+            pts = packet.get('pts_time')
+            if pts in (None, 'N/A') or 'K' not in packet.get('flags', ''):
+                continue
+            keyframes.add(round(float(pts) - origin, 6))
+        
+        return sorted(keyframes)
+    
+    @staticmethod
+    def _snap_to_keyframe(keyframes: List[float], time: float, snap: str = 'previous') -> Optional[float]:
+        """
+        Snap a timestamp onto a keyframe.
+        
+        Args:
+            keyframes: Sorted keyframe times
+            time: Requested time in seconds
+            snap: 'previous' keeps the whole requested range, 'nearest' minimises drift
+            
+        Returns:
+            Keyframe time to cut at, or None when no keyframe comes at or
+            before time (cutting later would drop the head of the range)
+        """
+        index = bisect_right(keyframes, time + 1e-6)
+        if index == 0:
+            return None
+        previous = keyframes[index - 1]
+        
+        if snap == 'nearest' and index < len(keyframes):
+            following = keyframes[index]
+            if following - time < time - previous:
+                return following
+        
+        return previous
+    
+    def extract_clip_fast(self, video_path: str, start_time: float, end_time: float,
+                          output_path: str = None, snap: str = 'previous',
+                          search_window: float = 30.0) -> Dict:
+        """
+        Extract a clip without re-encoding by cutting on a keyframe.
+        
+        The start is snapped to a GOP boundary and the streams are copied
+        as-is, so the actual start can differ from the requested one. The
+        real cut times are returned so callers can realign overlays.
+        Falls back to extract_clip when no keyframe can be found at or
+        before the start.
+        
+        Args:
+            video_path: Path to source video
+            start_time: Requested start time in seconds
+            end_time: Requested end time in seconds
+            output_path: Optional output path
+            snap: Keyframe snapping mode ('previous' or 'nearest')
+            search_window: Seconds before start_time to scan for keyframes
+            
+        Returns:
+            Dict with path, start_time and end_time of the produced clip
+        """
+        if output_path is None:
+            output_path = os.path.join(
+                self.output_dir,
+                f"clip_{int(start_time)}_{int(end_time)}.mp4"
+            )
+        
+        try:
+            keyframes = self.get_keyframe_times(
+                video_path,
+                start_time - search_window,
+                min(end_time, start_time + search_window)
+            )
+        except Exception as e:
+            print(f"Error probing keyframes, re-encoding instead: {e}")
+            keyframes = []
+        
+        cut_start = self._snap_to_keyframe(keyframes, start_time, snap) if keyframes else None
+        if cut_start is not None and cut_start >= end_time:
+            cut_start = self._snap_to_keyframe(keyframes, start_time, 'previous')
+        
+        if cut_start is None:
+            self.extract_clip(video_path, start_time, end_time, output_path)
+            return {'path': output_path, 'start_time': start_time, 'end_time': end_time}
+        
+        result = subprocess.run(
+            [
+                FFMPEG_BINARY, '-y', '-v', 'error',
+                '-ss', f"{cut_start:.6f}",
+                '-i', video_path,
+                '-t', f"{end_time - cut_start:.6f}",
+                '-map', '0:v:0', '-map', '0:a?',
+                '-c', 'copy',
+                '-avoid_negative_ts', 'make_zero',
+                '-movflags', '+faststart',
+                output_path
+            ],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg stream copy failed: {result.stderr.strip()}")
+        
+        return {'path': output_path, 'start_time': cut_start, 'end_time': end_time}
+    
+    @staticmethod
+    def _extraction_order(video_path: str, viral_moments: List[Dict]) -> List[int]:
+        """
+        Order moment indices by source, then by start time.
+        
+        Args:
+            video_path: Path to the default source video
+            viral_moments: List of viral moments with timing
+            
+        Returns:
+            Indices into viral_moments in extraction order
+        """
+        return sorted(
+            range(len(viral_moments)),
+            key=lambda i: (
+                viral_moments[i].get('video_path', video_path),
+                viral_moments[i]['start_time']
+            )
+        )
+    
+    @staticmethod
+    def _shift_overlays(text_overlays: List[Dict], offset: float) -> List[Dict]:
+        """
+        Shift overlay delays to follow a moved cut point.
+        
+        Args:
+            text_overlays: List of text overlay configs
+            offset: Seconds to add to each overlay's delay
+            
+        Returns:
+            New list of overlay configs
+        """
+        return [
+            {**overlay, 'delay': max(0.0, overlay.get('delay', 0) + offset)}
+            for overlay in text_overlays
+        ]
+    
+    def worker_editor(self) -> 'ViralVideoEditor':
+        """
+        Editor with the same settings but its own source readers.
+        
+        Source readers are not thread-safe, so each thread that cuts or
+        renders concurrently needs its own editor.
+        """
+        return ViralVideoEditor(
+            output_dir=self.output_dir, overlay_cache=self.overlay_cache,
+            text_backend=self.text_backend, profile=self.profile['name'],
+            text_scale=self.text_scale, scratch_dir=self.scratch_dir
+        )
+    
+    def prefetch_clips(self, video_path: str, viral_moments: Iterable[Dict],
+                       max_workers: int = 2) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Stream-copy each moment out of the source as soon as it is known.
+        
+        Pass the generator from ViralMomentAnalyzer.stream_viral_moments to
+        cut the first clips while the model is still writing the rest. The
+        cuts are keyframe-aligned stream copies, so they are cheap; the
+        render pass still trims them precisely. Each cut runs on its own
+        editor, so re-encoding fallbacks never share a source reader
+        across threads.
+        
+        Args:
+            video_path: Path to source video (moments may carry their own 'video_path')
+            viral_moments: Moments, possibly still being generated
+            max_workers: Concurrent ffmpeg cuts
+            
+        Returns:
+            Tuple of (moments as returned by the analyzer, moments to render),
+            both sorted by score. Render moments point at the cut files with
+            times relative to them, and keep the original file in
+            'source_path'; pass them to create_viral_compilation and then to
+            cleanup_prefetched.
+        """
+        prefetch_dir = tempfile.mkdtemp(prefix='prefetch_', dir=self.scratch_dir)
+        moments = []
+        futures = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for i, moment in enumerate(viral_moments):
+                moments.append(moment)
+                futures.append(executor.submit(
+                    lambda *args: self.worker_editor().extract_clip_fast(*args),
+                    moment.get('video_path', video_path),
+                    moment['start_time'],
+                    moment['end_time'],
+                    os.path.join(prefetch_dir, f"prefetch_clip_{i}.mp4")
+                ))
+            
+            render_moments = []
+            for moment, future in zip(moments, futures):
+                try:
+                    cut = future.result()
+                except Exception as e:
+                    print(f"Error prefetching clip, using the source instead: {e}")
+                    render_moments.append(moment)
+                    continue
+                render_moments.append({
+                    **moment,
+                    'source_path': moment.get('video_path', video_path),
+                    'video_path': cut['path'],
+                    'start_time': moment['start_time'] - cut['start_time'],
+                    'end_time': moment['end_time'] - cut['start_time'],
+                    'prefetched': True
+                })
+        
+        if not any(moment.get('prefetched') for moment in render_moments):
+            shutil.rmtree(prefetch_dir, ignore_errors=True)
+        
+        order = sorted(range(len(moments)), key=lambda i: moments[i].get('score', 0), reverse=True)
+        return [moments[i] for i in order], [render_moments[i] for i in order]
+    
+    @staticmethod
+    def cleanup_prefetched(render_moments: List[Dict]):
+        """Delete the clip files and directory created by prefetch_clips."""
+        for directory in {
+            os.path.dirname(moment['video_path'])
+            for moment in render_moments if moment.get('prefetched')
+        }:
+            shutil.rmtree(directory, ignore_errors=True)
+    
     def add_text_overlay(self, clip: VideoFileClip, text_overlays: List[Dict]) -> VideoFileClip:
         """
         Add text overlays to a video clip.
         
+        Overlays are alpha-blended straight into the frames: only frames
+        inside an overlay's [delay, delay + duration] window are touched,
+        and only within the overlay's bounding box. Other frames pass
+        through unchanged.
+        
         Args:
             clip: Video clip
             text_overlays: List of text overlay configs
@@ -71,7 +549,7 @@ class ViralVideoEditor:
         Returns:
             Clip with text overlays
         """
-        video_clips = [clip]
+        layers = []
         
         for overlay in text_overlays:
             text = overlay.get('text', '')
@@ -79,36 +557,136 @@ class ViralVideoEditor:
             duration = overlay.get('duration', 2.0)
             position = overlay.get('position', 'top')
             
-            # Position mapping
-            pos_map = {
-                'top': ('center', 50),
-                'center': ('center', 'center'),
-                'bottom': ('center', clip.h - 100)
-            }
-            
             try:
-                txt_clip = TextClip(
-                    text, 
-                    fontsize=60, 
-                    color='white',
-                    font='Arial-Bold',
-                    stroke_color='black',
-                    stroke_width=2,
-                    method='caption',
-                    size=(clip.w - 100, None)
-                )
-                
-                txt_clip = txt_clip.set_position(pos_map.get(position, pos_map['top']))
-                txt_clip = txt_clip.set_start(delay).set_duration(duration)
-                txt_clip = txt_clip.fadein(0.3).fadeout(0.3)
+                image = self.render_text_image(text, self._text_width(clip.w))
+                layer = self._place_overlay(image, clip.w, clip.h, position, self.text_scale)
+                if layer is None:
+                    continue
                 
-                video_clips.append(txt_clip)
+                layer['start'] = delay
+                layer['end'] = delay + duration
+                layers.append(layer)
             
             except Exception as e:
                 print(f"Error creating text overlay '{text}': {e}")
                 # Continue without this overlay
         
-        return CompositeVideoClip(video_clips)
+        if not layers:
+            return clip
+        
+        def composite(get_frame, t):
+            frame = get_frame(t)
+            active = [layer for layer in layers if layer['start'] <= t < layer['end']]
+            if not active:
+                return frame
+            
+            frame = np.array(frame)
+            for layer in active:
+                opacity = min(
+                    1.0,
+                    (t - layer['start']) / TEXT_FADE_DURATION,
+                    (layer['end'] - t) / TEXT_FADE_DURATION
+                )
+                y0, y1, x0, x1 = layer['box']
+                region = frame[y0:y1, x0:x1].astype(np.float32)
+                region += (layer['rgb'] - region) * (layer['alpha'] * opacity)
+                frame[y0:y1, x0:x1] = (region + 0.5).astype(np.uint8)
+            
+            return frame
+        
+        return clip.fl(composite)
+    
+    def _text_width(self, frame_w: int) -> int:
+        """Wrap width for overlay text on a frame of the given width."""
+        return frame_w - round(100 * self.text_scale)
+    
+    @staticmethod
+    def _overlay_origin(w: int, h: int, frame_w: int, frame_h: int, position: str,
+                        scale: float = 1.0):
+        """
+        Top-left corner of a w x h overlay on the frame for a named position.
+        """
+        x = (frame_w - w) // 2
+        
+        # Position mapping
+        y_map = {
+            'top': round(50 * scale),
+            'center': (frame_h - h) // 2,
+            'bottom': frame_h - round(100 * scale)
+        }
+        return x, y_map.get(position, y_map['top'])
+    
+    @staticmethod
+    def _place_overlay(image: np.ndarray, frame_w: int, frame_h: int,
+                       position: str, scale: float = 1.0) -> Optional[Dict]:
+        """
+        Position an RGBA overlay on the frame and clip it to the frame bounds.
+        
+        Args:
+            image: RGBA overlay image
+            frame_w: Frame width
+            frame_h: Frame height
+            position: 'top', 'center' or 'bottom'
+            scale: Scale applied to the position margins
+            
+        Returns:
+            Dict with the float RGB and alpha planes of the visible part and
+            its (y0, y1, x0, x1) box in frame coordinates, or None if off-frame
+        """
+        h, w = image.shape[:2]
+        x, y = ViralVideoEditor._overlay_origin(w, h, frame_w, frame_h, position, scale)
+        
+        y0, y1 = max(0, y), min(frame_h, y + h)
+        x0, x1 = max(0, x), min(frame_w, x + w)
+        if y0 >= y1 or x0 >= x1:
+            return None
+        
+        visible = image[y0 - y:y1 - y, x0 - x:x1 - x]
+        return {
+            'rgb': visible[:, :, :3].astype(np.float32),
+            'alpha': visible[:, :, 3:4].astype(np.float32) / 255.0,
+            'box': (y0, y1, x0, x1)
+        }
+    
+    def render_text_image(self, text: str, width: int) -> np.ndarray:
+        """
+        Rasterize overlay text, serving repeats from the overlay cache.
+        
+        Args:
+            text: Overlay text
+            width: Target wrap width in pixels
+            
+        Returns:
+            RGBA image array (height x width x 4, uint8)
+        """
+        key = OverlayCache.make_key(
+            text=text, width=width, backend=self.text_backend, **self.text_style
+        )
+        return self.overlay_cache.get_or_render(
+            key, lambda: self._rasterize_text(text, width)
+        )
+    
+    def _rasterize_text(self, text: str, width: int) -> np.ndarray:
+        """
+        Render overlay text into an RGBA array with the configured backend.
+        
+        Args:
+            text: Overlay text
+            width: Target wrap width in pixels
+            
+        Returns:
+            RGBA image array
+        """
+        if self.text_backend == 'pillow':
+            return render_text(text, width, **self.text_style)
+        
+        txt_clip = TextClip(text, method='caption', size=(width, None), **self.text_style)
+        try:
+            rgb = txt_clip.get_frame(0)
+            alpha = txt_clip.mask.get_frame(0) * 255
+            return np.dstack([rgb, alpha]).astype(np.uint8)
+        finally:
+            txt_clip.close()
     
     def add_transition(self, clip: VideoFileClip, transition_duration: float = 0.5) -> VideoFileClip:
         """
@@ -148,12 +726,8 @@ class ViralVideoEditor:
                 clips = [self.add_transition(clip, transition_duration) for clip in clips]
             
             final_video = concatenate_videoclips(clips, method="compose")
-            final_video.write_videofile(
-                output_path,
-                codec='libx264',
-                audio_codec='aac',
-                fps=24
-            )
+            self._report('compile', 0.0)
+            self.write_video(final_video, output_path, on_progress=self._stage_progress('compile'))
             
             # Clean up
             for clip in clips:
@@ -166,6 +740,82 @@ class ViralVideoEditor:
             print(f"Error compiling clips: {e}")
             raise
     
+    def mix_audio(self, video, audio, audio_volume: float = 0.5,
+                  video_volume: float = 0.3):
+        """
+        Mix an audio track (like TTS) into a clip's own audio without rendering.
+        
+        Args:
+            video: Video clip
+            audio: Audio clip to overlay
+            audio_volume: Volume of overlay audio (0-1)
+            video_volume: Volume of original video audio (0-1)
+            
+        Returns:
+            Clip with the mixed audio track
+        """
+        # Adjust volumes
+        if video.audio:
+            original_audio = video.audio.volumex(video_volume)
+        else:
+            original_audio = None
+        
+        overlay_audio = audio.volumex(audio_volume)
+        
+        # Trim or loop audio to match video duration
+        if overlay_audio.duration < video.duration:
+            # Audio is shorter, just add it
+            pass
+        else:
+            # Audio is longer, trim it
+            overlay_audio = overlay_audio.subclip(0, video.duration)
+        
+        # Combine audio tracks
+        if original_audio:
+            from moviepy.audio.AudioClip import CompositeAudioClip
+            final_audio = CompositeAudioClip([original_audio, overlay_audio])
+        else:
+            final_audio = overlay_audio
+        
+        return video.set_audio(final_audio)
+    
+    def build_compilation(self, video_path: str, viral_moments: List[Dict],
+                          text_overlays_per_moment: List[List[Dict]],
+                          add_transitions: bool = True,
+                          transition_duration: float = 0.5):
+        """
+        Build the compilation as a lazy clip graph over the shared sources.
+        
+        Nothing is decoded or encoded here; frames are pulled from the
+        source only when the returned clip is written. A moment may carry
+        its own 'video_path' to pull from another upload. Call inside
+        source_session() so the readers outlive the render.
+        
+        Args:
+            video_path: Path to the default source video
+            viral_moments: List of viral moments with timing
+            text_overlays_per_moment: Text overlays for each moment
+            add_transitions: Whether to add transitions between clips
+            transition_duration: Duration of transitions
+            
+        Returns:
+            Concatenated compilation clip
+        """
+        clips = []
+        for i, moment in enumerate(viral_moments):
+            source = self.open_source(moment.get('video_path', video_path))
+            clip = source.subclip(moment['start_time'], moment['end_time'])
+            
+            if i < len(text_overlays_per_moment):
+                clip = self.add_text_overlay(clip, text_overlays_per_moment[i])
+            
+            if add_transitions:
+                clip = self.add_transition(clip, transition_duration)
+            
+            clips.append(clip)
+        
+        return concatenate_videoclips(clips, method="compose")
+    
     def add_audio_overlay(self, video_path: str, audio_path: str, output_path: str,
                          audio_volume: float = 0.5, video_volume: float = 0.3) -> str:
         """
@@ -185,31 +835,9 @@ class ViralVideoEditor:
             video = VideoFileClip(video_path)
             audio = AudioFileClip(audio_path)
             
-            # Adjust volumes
-            if video.audio:
-                original_audio = video.audio.volumex(video_volume)
-            else:
-                original_audio = None
-            
-            overlay_audio = audio.volumex(audio_volume)
-            
-            # Trim or loop audio to match video duration
-            if overlay_audio.duration < video.duration:
-                # Audio is shorter, just add it
-                pass
-            else:
-                # Audio is longer, trim it
-                overlay_audio = overlay_audio.subclip(0, video.duration)
-            
-            # Combine audio tracks
-            if original_audio:
-                from moviepy.audio.AudioClip import CompositeAudioClip
-                final_audio = CompositeAudioClip([original_audio, overlay_audio])
-            else:
-                final_audio = overlay_audio
-            
-            video = video.set_audio(final_audio)
-            video.write_videofile(output_path, codec='libx264', audio_codec='aac')
+            video = self.mix_audio(video, audio, audio_volume, video_volume)
+            self._report('audio_mix', 0.0)
+            self.write_video(video, output_path, on_progress=self._stage_progress('audio_mix'))
             
             # Clean up
             video.close()
@@ -221,9 +849,365 @@ class ViralVideoEditor:
             print(f"Error adding audio overlay: {e}")
             raise
     
+    def render_segments_parallel(self, video_path: str, viral_moments: List[Dict],
+                                 text_overlays_per_moment: List[List[Dict]],
+                                 workers: int, ffmpeg_threads: int = None,
+                                 add_transitions: bool = True,
+                                 transition_duration: float = 0.5,
+                                 prefix: str = "segment",
+                                 segment_dir: str = None) -> List[str]:
+        """
+        Render every moment to its own segment file in a process pool.
+        
+        All segments are encoded with identical settings so they can be
+        joined with concat_segments without re-encoding.
+        
+        Args:
+            video_path: Path to the default source video
+            viral_moments: List of viral moments with timing
+            text_overlays_per_moment: Text overlays for each moment
+            workers: Number of worker processes
+            ffmpeg_threads: Encoder threads per worker (defaults to an even share of the CPUs)
+            add_transitions: Whether to fade each segment in and out
+            transition_duration: Duration of transitions
+            prefix: File name prefix for the segments
+            segment_dir: Directory for the segments (defaults to output_dir)
+            
+        Returns:
+            Segment paths in compilation order
+        """
+        if ffmpeg_threads is None:
+            ffmpeg_threads = max(1, (os.cpu_count() or 1) // workers)
+        
+        segment_paths = [
+            os.path.join(segment_dir or self.output_dir, f"{prefix}_{i}.mp4")
+            for i in range(len(viral_moments))
+        ]
+        
+        self._report('compile', 0.0, segments=len(viral_moments))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _render_segment,
+                    self.output_dir,
+                    video_path,
+                    moment,
+                    text_overlays_per_moment[i] if i < len(text_overlays_per_moment) else [],
+                    segment_paths[i],
+                    add_transitions,
+                    transition_duration,
+                    ffmpeg_threads,
+                    self.profile['name'],
+                    self.text_scale,
+                    self.text_backend,
+                    self.overlay_cache.cache_dir
+                )
+                for i, moment in enumerate(viral_moments)
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                self._report('compile', done / len(futures), segments=len(futures))
+            return [future.result() for future in futures]
+    
+    def concat_segments(self, segment_paths: List[str], output_path: str) -> str:
+        """
+        Join encoded segments with ffmpeg's concat demuxer (stream copy).
+        
+        Segments must share codec, resolution and frame rate, as produced
+        by render_segments_parallel.
+        
+        Args:
+            segment_paths: Segment files in playback order
+            output_path: Path for output video
+            
+        Returns:
+            Path to joined video
+        """
+        list_path = f"{output_path}.concat.txt"
+        with open(list_path, 'w') as f:
+            for path in segment_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        
+        try:
+            result = subprocess.run(
+                [
+                    FFMPEG_BINARY, '-y', '-v', 'error',
+                    '-f', 'concat', '-safe', '0',
+                    '-i', list_path,
+                    '-c', 'copy',
+                    '-movflags', '+faststart',
+                    output_path
+                ],
+                capture_output=True,
+                text=True
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"ffmpeg concat failed: {result.stderr.strip()}")
+            return output_path
+        
+        finally:
+            if os.path.exists(list_path):
+                os.remove(list_path)
+    
+    def _create_compilation_parallel(self, video_path: str, viral_moments: List[Dict],
+                                     text_overlays_per_moment: List[List[Dict]],
+                                     output_name: str, workers: int,
+                                     ffmpeg_threads: int = None) -> str:
+        """
+        Render moments concurrently, then concatenate them without re-encoding.
+        
+        Args:
+            video_path: Path to the default source video
+            viral_moments: List of viral moments with timing
+            text_overlays_per_moment: Text overlays for each moment
+            output_name: Name of output file
+            workers: Number of worker processes
+            ffmpeg_threads: Encoder threads per worker
+            
+        Returns:
+            Path to final compilation
+        """
+        output_path = os.path.join(self.output_dir, output_name)
+        segment_dir = tempfile.mkdtemp(prefix='segments_', dir=self.scratch_dir)
+        
+        try:
+            segment_paths = self.render_segments_parallel(
+                video_path, viral_moments, text_overlays_per_moment,
+                workers, ffmpeg_threads, segment_dir=segment_dir
+            )
+            
+            # Prefetched cuts are stream copies, so they share their source's parameters
+            sources = {
+                moment.get('source_path', moment.get('video_path', video_path))
+                for moment in viral_moments
+            }
+            if len(sources) > 1:
+                # Segments from different uploads may not share stream
+                # parameters, so they cannot be stream-copied together
+                clips = [VideoFileClip(path) for path in segment_paths]
+                return self.compile_clips(clips, output_path, add_transitions=False)
+            
+            return self.concat_segments(segment_paths, output_path)
+        
+        except Exception as e:
+            print(f"Error creating parallel compilation: {e}")
+            raise
+        
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+    
+    def _create_compilation_ffmpeg(self, video_path: str, viral_moments: List[Dict],
+                                   text_overlays_per_moment: List[List[Dict]],
+                                   output_name: str, audio_path: str = None,
+                                   audio_volume: float = 0.5,
+                                   video_volume: float = 0.3) -> str:
+        """
+        Render a compilation with one ffmpeg filter_complex invocation.
+        
+        Text is rasterized through the same renderer and cache as the
+        MoviePy path and fed in as still images; every other step runs
+        inside ffmpeg, so frames never pass through Python.
+        
+        Args:
+            video_path: Path to the default source video
+            viral_moments: List of viral moments with timing
+            text_overlays_per_moment: Text overlays for each moment
+            output_name: Name of output file
+            audio_path: Optional narration audio to mix in
+            audio_volume: Volume of narration audio (0-1)
+            video_volume: Volume of original video audio (0-1)
+            
+        Returns:
+            Path to final compilation
+        """
+        output_path = os.path.join(self.output_dir, output_name)
+        overlay_dir = tempfile.mkdtemp(prefix='overlays_', dir=self.scratch_dir)
+        
+        try:
+            probes = {}
+            segments = []
+            for i, moment in enumerate(viral_moments):
+                source_path = moment.get('video_path', video_path)
+                if source_path not in probes:
+                    probes[source_path] = probe_media(source_path)
+                probe = probes[source_path]
+                
+                overlays = []
+                moment_overlays = text_overlays_per_moment[i] if i < len(text_overlays_per_moment) else []
+                for j, overlay in enumerate(moment_overlays):
+                    try:
+                        image = self.render_text_image(
+                            overlay.get('text', ''), self._text_width(probe['width'])
+                        )
+                        image_path = os.path.join(overlay_dir, f"overlay_{i}_{j}.png")
+                        Image.fromarray(image, 'RGBA').save(image_path)
+                    except Exception as e:
+                        print(f"Error creating text overlay '{overlay.get('text', '')}': {e}")
+                        continue
+                    
+                    x, y = self._overlay_origin(
+                        image.shape[1], image.shape[0],
+                        probe['width'], probe['height'],
+                        overlay.get('position', 'top'),
+                        self.text_scale
+                    )
+                    delay = overlay.get('delay', 0)
+                    overlays.append({
+                        'image_path': image_path,
+                        'x': x,
+                        'y': y,
+                        'start': delay,
+                        'end': min(delay + overlay.get('duration', 2.0),
+                                   moment['end_time'] - moment['start_time'])
+                    })
+                
+                segments.append({
+                    'video_path': source_path,
+                    'start_time': moment['start_time'],
+                    'end_time': moment['end_time'],
+                    'width': probe['width'],
+                    'height': probe['height'],
+                    'has_audio': probe['has_audio'],
+                    'overlays': overlays
+                })
+            
+            source_fps = max((probe['fps'] or 0) for probe in probes.values()) or None
+            command = build_compilation_command(
+                segments,
+                output_path,
+                narration_path=audio_path if audio_path and os.path.exists(audio_path) else None,
+                audio_volume=audio_volume,
+                video_volume=video_volume,
+                text_fade_duration=TEXT_FADE_DURATION,
+                fps=resolve_fps(self.profile, source_fps) or 24,
+                encoder_args=ffmpeg_encoder_args(self.profile)
+            )
+            self._report('compile', 0.0)
+            run_ffmpeg(command)
+            self._report('compile', 1.0)
+            
+            return output_path
+        
+        except Exception as e:
+            print(f"Error creating ffmpeg compilation: {e}")
+            raise
+        
+        finally:
+            shutil.rmtree(overlay_dir, ignore_errors=True)
+    
+    def get_proxy(self, video_path: str, height: int = 360, proxy_dir: str = None) -> str:
+        """
+        Get a low-resolution proxy of a source, generating it on first use.
+        
+        Proxies are keyed on the source's path, size, modification time and
+        the proxy height, so each upload is transcoded only once.
+        
+        Args:
+            video_path: Path to source video
+            height: Proxy height in pixels
+            proxy_dir: Where proxies live (defaults to '.proxies' next to the source)
+            
+        Returns:
+            Path to the proxy video
+        """
+        if proxy_dir is None:
+            proxy_dir = os.path.join(os.path.dirname(os.path.abspath(video_path)), '.proxies')
+        os.makedirs(proxy_dir, exist_ok=True)
+        
+        stat = os.stat(video_path)
+        fingerprint = f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}:{height}"
+        digest = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        proxy_path = os.path.join(proxy_dir, f"{name}_{height}p_{digest}.mp4")
+        
+        if os.path.exists(proxy_path):
+            return proxy_path
+        
+        # Short GOPs keep seeking in the proxy cheap
+        tmp_path = f"{proxy_path}.{os.getpid()}.tmp.mp4"
+        try:
+            run_ffmpeg([
+                FFMPEG_BINARY, '-y', '-v', 'error',
+                '-i', video_path,
+                '-vf', f"scale=-2:{height}",
+                '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '28', '-g', '30',
+                '-c:a', 'aac', '-b:a', '64k',
+                '-movflags', '+faststart',
+                tmp_path
+            ])
+            os.replace(tmp_path, proxy_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        return proxy_path
+    
+    def create_preview(self, video_path: str, viral_moments: List[Dict],
+                       text_overlays_per_moment: List[List[Dict]],
+                       output_name: str = "preview.mp4", proxy_height: int = 360,
+                       proxy_dir: str = None, **options) -> str:
+        """
+        Render a quick preview of a compilation from low-resolution proxies.
+        
+        Takes the same edit decision list (moments and overlays) as
+        create_viral_compilation, so the final render only needs the same
+        call against the original sources. Text is scaled to the proxy size
+        so the layout matches the full-resolution render.
+        
+        Args:
+            video_path: Path to the default source video
+            viral_moments: List of viral moments with timing
+            text_overlays_per_moment: Text overlays for each moment
+            output_name: Name of output file
+            proxy_height: Proxy height in pixels
+            proxy_dir: Where proxies live
+            **options: Extra create_viral_compilation options
+            
+        Returns:
+            Path to the preview video
+        """
+        proxies = {}
+        
+        def proxy_for(path):
+            if path not in proxies:
+                proxies[path] = self.get_proxy(path, proxy_height, proxy_dir)
+            return proxies[path]
+        
+        proxy_moments = [
+            {**moment, 'video_path': proxy_for(moment.get('video_path', video_path))}
+            for moment in viral_moments
+        ]
+        source_height = probe_media(video_path)['height'] or proxy_height
+        
+        preview_editor = ViralVideoEditor(
+            output_dir=self.output_dir,
+            overlay_cache=self.overlay_cache,
+            text_backend=self.text_backend,
+            profile='preview',
+            text_scale=self.text_scale * proxy_height / source_height,
+            progress=self.progress,
+            scratch_dir=self.scratch_dir
+        )
+        return preview_editor.create_viral_compilation(
+            proxies.get(video_path, video_path),
+            proxy_moments,
+            text_overlays_per_moment,
+            output_name,
+            **options
+        )
+    
     def create_viral_compilation(self, video_path: str, viral_moments: List[Dict],
                                 text_overlays_per_moment: List[List[Dict]],
-                                output_name: str = "viral_compilation.mp4") -> str:
+                                output_name: str = "viral_compilation.mp4",
+                                fast_extract: bool = False,
+                                single_pass: bool = False,
+                                audio_path: str = None,
+                                audio_volume: float = 0.5,
+                                video_volume: float = 0.3,
+                                workers: int = None,
+                                ffmpeg_threads: int = None,
+                                backend: str = "moviepy") -> str:
         """
         Create a complete viral compilation from identified moments.
         
@@ -232,35 +1216,92 @@ class ViralVideoEditor:
             viral_moments: List of viral moments with timing
             text_overlays_per_moment: Text overlays for each moment
             output_name: Name of output file
+            fast_extract: Cut on keyframes with stream copy instead of re-encoding
+                (multi-pass only; parallel workers already encode each moment once)
+            single_pass: Render straight from the source with one encode and no temp files
+            audio_path: Optional narration audio mixed in (single-pass and ffmpeg only)
+            audio_volume: Volume of narration audio (0-1)
+            video_volume: Volume of original video audio (0-1)
+            workers: Render moments in this many worker processes and join
+                them without re-encoding (ignored in single-pass mode)
+            ffmpeg_threads: Encoder threads per worker process
+            backend: 'moviepy', or 'ffmpeg' to render everything (including
+                the narration mix) in a single ffmpeg filtergraph
             
         Returns:
             Path to final compilation
         """
-        temp_clips = []
+        if backend == 'ffmpeg':
+            return self._create_compilation_ffmpeg(
+                video_path, viral_moments, text_overlays_per_moment,
+                output_name, audio_path, audio_volume, video_volume
+            )
+        if backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unknown render backend: {backend}")
+        
+        if single_pass:
+            with self.source_session():
+                return self._create_compilation_single_pass(
+                    video_path, viral_moments, text_overlays_per_moment,
+                    output_name, audio_path, audio_volume, video_volume
+                )
+        
+        if workers and workers > 1:
+            if fast_extract:
+                print("fast_extract is ignored with workers > 1: each moment is cut and encoded once in its worker")
+            return self._create_compilation_parallel(
+                video_path, viral_moments, text_overlays_per_moment,
+                output_name, workers, ffmpeg_threads
+            )
+        
+        clip_dir = tempfile.mkdtemp(prefix='clips_', dir=self.scratch_dir)
         clip_objects = []
         
         try:
-            # Extract each viral moment
-            for i, moment in enumerate(viral_moments):
-                temp_clip_path = os.path.join(
-                    self.output_dir,
-                    f"temp_clip_{i}.mp4"
-                )
-                
-                # Extract the clip
-                self.extract_clip(
-                    video_path,
-                    moment['start_time'],
-                    moment['end_time'],
-                    temp_clip_path
-                )
-                temp_clips.append(temp_clip_path)
-                
+            # Extract each viral moment, in timestamp order per source so the
+            # shared reader only ever seeks forward
+            overlay_offsets = {}
+            with self.source_session():
+                order = self._extraction_order(video_path, viral_moments)
+                for done, i in enumerate(order):
+                    moment = viral_moments[i]
+                    self._report('extract', done / len(order), moment=i, moments=len(order))
+                    source_path = moment.get('video_path', video_path)
+                    temp_clip_path = os.path.join(
+                        clip_dir,
+                        f"temp_clip_{i}.mp4"
+                    )
+                    
+                    # Extract the clip
+                    if fast_extract:
+                        cut = self.extract_clip_fast(
+                            source_path,
+                            moment['start_time'],
+                            moment['end_time'],
+                            temp_clip_path
+                        )
+                        overlay_offsets[i] = moment['start_time'] - cut['start_time']
+                    else:
+                        self.extract_clip(
+                            source_path,
+                            moment['start_time'],
+                            moment['end_time'],
+                            temp_clip_path,
+                            on_progress=self._stage_progress(
+                                'extract', done / len(order), 1 / len(order),
+                                moment=i, moments=len(order)
+                            )
+                        )
+            
+            for i in range(len(viral_moments)):
                 # Load clip and add text overlays
-                clip = VideoFileClip(temp_clip_path)
+                clip = VideoFileClip(os.path.join(clip_dir, f"temp_clip_{i}.mp4"))
                 
                 if i < len(text_overlays_per_moment):
-                    clip = self.add_text_overlay(clip, text_overlays_per_moment[i])
+                    overlays = text_overlays_per_moment[i]
+                    if overlay_offsets.get(i):
+                        overlays = self._shift_overlays(overlays, overlay_offsets[i])
+                    clip = self.add_text_overlay(clip, overlays)
                 
                 clip_objects.append(clip)
             
@@ -268,17 +1309,61 @@ class ViralVideoEditor:
             output_path = os.path.join(self.output_dir, output_name)
             self.compile_clips(clip_objects, output_path, add_transitions=True)
             
-            # Clean up temporary files
-            for temp_clip in temp_clips:
-                if os.path.exists(temp_clip):
-                    os.remove(temp_clip)
-            
             return output_path
         
         except Exception as e:
             print(f"Error creating viral compilation: {e}")
-            # Clean up on error
-            for temp_clip in temp_clips:
-                if os.path.exists(temp_clip):
-                    os.remove(temp_clip)
             raise
+        
+        finally:
+            # Temporary clips live in their own directory, removed either way
+            shutil.rmtree(clip_dir, ignore_errors=True)
+    
+    def _create_compilation_single_pass(self, video_path: str, viral_moments: List[Dict],
+                                        text_overlays_per_moment: List[List[Dict]],
+                                        output_name: str, audio_path: str = None,
+                                        audio_volume: float = 0.5,
+                                        video_volume: float = 0.3) -> str:
+        """
+        Render a compilation with a single encode.
+        
+        Subclips, overlays, transitions and the narration mix are built as
+        one clip graph against the original source, then written once.
+        
+        Args:
+            video_path: Path to source video
+            viral_moments: List of viral moments with timing
+            text_overlays_per_moment: Text overlays for each moment
+            output_name: Name of output file
+            audio_path: Optional narration audio to mix in
+            audio_volume: Volume of narration audio (0-1)
+            video_volume: Volume of original video audio (0-1)
+            
+        Returns:
+            Path to final compilation
+        """
+        output_path = os.path.join(self.output_dir, output_name)
+        audio = None
+        
+        try:
+            final_video = self.build_compilation(
+                video_path, viral_moments, text_overlays_per_moment
+            )
+            
+            if audio_path and os.path.exists(audio_path):
+                audio = AudioFileClip(audio_path)
+                final_video = self.mix_audio(final_video, audio, audio_volume, video_volume)
+            
+            self._report('compile', 0.0)
+            self.write_video(final_video, output_path, on_progress=self._stage_progress('compile'))
+            final_video.close()
+            
+            return output_path
+        
+        except Exception as e:
+            print(f"Error creating single-pass compilation: {e}")
+            raise
+        
+        finally:
+            if audio is not None:
+                audio.close()
@@ -5,41 +5,494 @@ A tool that processes video files with transcriptions to identify and compile vi
 
 import os
 import json
-from typing import List, Dict, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Tuple, Optional
+import httpx
 from groq import Groq
 from dotenv import load_dotenv
+from llm_cache import ResponseCache
+from call_policy import CallPolicy, LLMCallError
+from json_extract import JSONArrayStream, extract_json_array
+from transcript_index import TranscriptIndex
+from prefilter import prune_transcript
+from heuristic_analyzer import HeuristicAnalyzer
 
 load_dotenv()
 
+_shared_lock = threading.Lock()
+_shared_clients: Dict[str, Groq] = {}
+_shared_analyzers: Dict[Tuple[str, bool], "ViralMomentAnalyzer"] = {}
+
+ANALYSIS_MODEL = "llama-3.2-90b-text-preview"  # Using Groq's reasoning model
+ANALYSIS_SYSTEM = (
+    "You are an expert video editor specializing in viral social media content. "
+    "Always respond with valid JSON only."
+)
+TTS_SYSTEM = "You are a viral video content creator. Write punchy, engaging scripts."
+OVERLAY_SYSTEM = (
+    "You are a viral video editor. Create attention-grabbing text overlays. "
+    "Always respond with valid JSON only."
+)
+
+# 'groq' prompts the LLM, 'heuristic' scores the transcript locally and offline
+ANALYZER_BACKENDS = ['groq', 'heuristic']
+_shared_cache: Optional[ResponseCache] = None
+_shared_policy: Optional[CallPolicy] = None
+
+def get_groq_client(api_key: str) -> Groq:
+    """
+    Get the process-wide Groq client for an API key.
+    
+    The client keeps a pool of keep-alive connections that is reused across
+    requests and threads. Pool size and timeouts come from GROQ_POOL_SIZE
+    (default 20), GROQ_TIMEOUT (default 60s) and GROQ_CONNECT_TIMEOUT
+    (default 5s). GROQ_BASE_URL points it at another server, such as
+    mock_groq_server.py. The SDK's own retries are off; CallPolicy owns them.
+    
+    Args:
+        api_key: Groq API key
+        
+    Returns:
+        Shared Groq client
+    """
+    with _shared_lock:
+        client = _shared_clients.get(api_key)
+        if client is None:
+            pool_size = int(os.getenv('GROQ_POOL_SIZE', '20'))
+            timeout = httpx.Timeout(
+                float(os.getenv('GROQ_TIMEOUT', '60')),
+                connect=float(os.getenv('GROQ_CONNECT_TIMEOUT', '5'))
+            )
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size,
+                    keepalive_expiry=60
+                ),
+                timeout=timeout
+            )
+            client = Groq(
+                api_key=api_key,
+                base_url=os.getenv('GROQ_BASE_URL') or None,
+                timeout=timeout,
+                max_retries=0,
+                http_client=http_client
+            )
+            _shared_clients[api_key] = client
+        return client
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide LLM response cache."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
+
+
+def get_call_policy() -> CallPolicy:
+    """Get the process-wide Groq call policy, so latency history and stats are shared."""
+    global _shared_policy
+    with _shared_lock:
+        if _shared_policy is None:
+            _shared_policy = CallPolicy()
+        return _shared_policy
+
+
+def create_analyzer(backend: str = None, **kwargs):
+    """
+    Create an analyzer for the named backend.
+    
+    Args:
+        backend: One of ANALYZER_BACKENDS. If None, uses ANALYZER_BACKEND from
+            environment (default 'groq').
+        **kwargs: Passed to ViralMomentAnalyzer for the 'groq' backend
+        
+    Returns:
+        ViralMomentAnalyzer or HeuristicAnalyzer
+    """
+    backend = backend or os.getenv('ANALYZER_BACKEND', 'groq')
+    if backend == 'heuristic':
+        return HeuristicAnalyzer()
+    if backend == 'groq':
+        return ViralMomentAnalyzer(**kwargs)
+    raise ValueError(f"Unknown analyzer backend: {backend}. Choose from {', '.join(ANALYZER_BACKENDS)}")
+
+
+def get_shared_analyzer(use_cache: bool = None, backend: str = None):
+    """
+    Get a process-wide analyzer, creating it on first use.
+    
+    Analyzers hold no per-request state, so one instance can serve every
+    request and thread.
+    
+    Args:
+        use_cache: Whether the analyzer uses the response cache (None for the default)
+        backend: Analyzer backend (None for ANALYZER_BACKEND, default 'groq')
+        
+    Returns:
+        Shared analyzer
+    """
+    if use_cache is None:
+        use_cache = not os.getenv('LLM_CACHE_DISABLED')
+    backend = backend or os.getenv('ANALYZER_BACKEND', 'groq')
+    
+    analyzer = _shared_analyzers.get((backend, use_cache))
+    if analyzer is None:
+        analyzer = create_analyzer(backend, use_cache=use_cache)
+        with _shared_lock:
+            analyzer = _shared_analyzers.setdefault((backend, use_cache), analyzer)
+    return analyzer
+
 
 class ViralMomentAnalyzer:
     """Analyzes video transcriptions to identify viral moments using Groq."""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, max_concurrency: int = None,
+                 cache: ResponseCache = None, use_cache: bool = None,
+                 client: Groq = None, fallback=None, policy: CallPolicy = None):
         """
         Initialize the analyzer with Groq API.
         
         Args:
             api_key: Groq API key. If None, uses GROQ_API_KEY from environment.
+            max_concurrency: Maximum Groq requests in flight for batched calls.
+                If None, uses GROQ_MAX_CONCURRENCY from environment (default 4).
+            cache: Response cache. If None, a SQLite cache at LLM_CACHE_PATH is used.
+            use_cache: Set False to bypass the cache. If None, caching is on
+                unless LLM_CACHE_DISABLED is set.
+            client: Groq client. If None, the shared pooled client for the key is used.
+            fallback: Analyzer used when a Groq call fails. If None, a HeuristicAnalyzer
+                is used when ANALYZER_FALLBACK=heuristic, otherwise failures raise LLMCallError.
+            policy: Deadline, retry and hedging policy. If None, the shared policy is used.
         """
         self.api_key = api_key or os.getenv('GROQ_API_KEY')
         if not self.api_key:
             raise ValueError("Groq API key not found. Set GROQ_API_KEY environment variable.")
-        self.client = Groq(api_key=self.api_key)
+        self.client = client or get_groq_client(self.api_key)
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv('GROQ_MAX_CONCURRENCY', '4')))
+        
+        if use_cache is None:
+            use_cache = not os.getenv('LLM_CACHE_DISABLED')
+        self.cache = (cache or get_response_cache()) if use_cache else None
+        
+        if fallback is None and os.getenv('ANALYZER_FALLBACK') == 'heuristic':
+            fallback = HeuristicAnalyzer()
+        self.fallback = fallback
+        self.policy = policy or get_call_policy()
     
-    def analyze_transcription(self, transcription: str, visuals_description: str = "") -> List[Dict]:
+    def _chat(self, system: str, prompt: str, model: str, temperature: float,
+              max_tokens: int, parse=None):
+        """
+        Run a chat completion, serving repeats from the response cache.
+        
+        Misses go through the call policy: each attempt has a timeout, failed
+        or unparseable attempts are retried with backoff, and slow attempts
+        may be hedged with a duplicate request.
+        
+        Args:
+            system: System message
+            prompt: User message
+            model: Model name
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            parse: Optional callable applied to the content; a response is
+                only cached if it parses
+            
+        Returns:
+            Response content, or parse(content) when parse is given
+            
+        Raises:
+            LLMCallError: When no attempt succeeds within the policy
+        """
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+        key = ResponseCache.make_key(model, messages, temperature, max_tokens)
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                try:
+                    return parse(cached) if parse else cached
+                except Exception:
+                    pass  # Stale or unparseable entry, fetch a fresh response
+        
+        def attempt(timeout):
+            response = self.client.chat.completions.create(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout
+            )
+            content = response.choices[0].message.content.strip()
+            return content, (parse(content) if parse else content)
+        
+        content, result = self.policy.call(attempt, label=model)
+        
+        if self.cache is not None:
+            self.cache.put(key, content)
+        return result
+    
+    @staticmethod
+    def _parse_json_content(content: str):
+        """
+        Parse the JSON array in a response, tolerating fences and surrounding prose.
+        
+        Args:
+            content: Response content
+            
+        Returns:
+            Parsed JSON array
+        """
+        return extract_json_array(content)
+    
+    def analyze_transcription(self, transcription: str, visuals_description: str = "",
+                              long_input: bool = None, keep_ratio: float = None) -> List[Dict]:
         """
         Analyze transcription and visuals to identify viral moments.
         
         Args:
             transcription: Transcription with timestamps in format "[00:00:00] text"
             visuals_description: Description of visual elements with timestamps
+            long_input: Use chunked map-reduce analysis. If None, it is used when
+                the transcription is longer than LONG_TRANSCRIPT_CHARS (default 12000).
+            keep_ratio: Fraction of transcript segments the local pre-filter keeps
+                before prompting. If None, uses PREFILTER_KEEP_RATIO (default 1, no pruning).
             
         Returns:
             List of viral moments with start_time, end_time, score, and reason
+            
+        Raises:
+            LLMCallError: When the Groq call fails and there is no fallback analyzer
+        """
+        full_transcription, full_visuals = transcription, visuals_description
+        transcription, visuals_description = self._prefilter(transcription, visuals_description, keep_ratio)
+        
+        if long_input is None:
+            long_input = len(transcription) > int(os.getenv('LONG_TRANSCRIPT_CHARS', '12000'))
+        
+        try:
+            if long_input:
+                return self.analyze_transcription_chunked(transcription, visuals_description)
+            
+            viral_moments = self._analyze_window(transcription, visuals_description)
+            viral_moments = self.snap_moments(viral_moments, TranscriptIndex.parse(full_transcription))
+            return sorted(viral_moments, key=lambda x: x['score'], reverse=True)
+        
+        except Exception as e:
+            print(f"Error analyzing transcription: {e}")
+            if self.fallback is not None:
+                return self.fallback.analyze_transcription(full_transcription, full_visuals)
+            if isinstance(e, LLMCallError):
+                raise
+            return []
+    
+    @staticmethod
+    def _prefilter(transcription: str, visuals_description: str,
+                   keep_ratio: float = None) -> Tuple[str, str]:
+        """
+        Prune the transcript locally before prompting.
+        
+        Args:
+            transcription: Transcription with timestamps
+            visuals_description: Visual descriptions with timestamps
+            keep_ratio: Fraction of segments to keep. If None, uses
+                PREFILTER_KEEP_RATIO (default 1, no pruning).
+            
+        Returns:
+            Tuple of (transcription, visuals_description) to prompt with
+        """
+        if keep_ratio is None:
+            keep_ratio = float(os.getenv('PREFILTER_KEEP_RATIO', '1.0'))
+        if keep_ratio >= 1:
+            return transcription, visuals_description
+        
+        transcription, visuals_description, stats = prune_transcript(
+            transcription, visuals_description, keep_ratio
+        )
+        print(
+            f"Pre-filter kept {stats['kept_segments']}/{stats['segments']} segments "
+            f"({stats['pruning_ratio']:.0%} pruned, "
+            f"{stats['chars_before']} -> {stats['chars_after']} chars)"
+        )
+        return transcription, visuals_description
+    
+    def analyze_transcription_chunked(self, transcription: str, visuals_description: str = "",
+                                      window_seconds: float = 300, overlap_seconds: float = 30,
+                                      top_k: int = 5) -> List[Dict]:
+        """
+        Analyze a long transcription with map-reduce over overlapping windows.
+        
+        Each window is scored concurrently with a bounded prompt, overlapping
+        candidates are merged locally, and a short rerank call picks the
+        final top_k. Cost grows linearly with transcript length while the
+        latency of each call stays bounded.
+        
+        Args:
+            transcription: Transcription with timestamps in format "[00:00:00] text"
+            visuals_description: Description of visual elements with timestamps
+            window_seconds: Length of each window
+            overlap_seconds: Overlap between consecutive windows
+            top_k: Number of moments to return
+            
+        Returns:
+            List of viral moments sorted by score
+            
+        Raises:
+            LLMCallError: When the Groq call fails for every window
+        """
+        transcript = TranscriptIndex.parse(transcription)
+        if not transcript.has_timestamps:
+            return sorted(
+                self._analyze_window(transcription, visuals_description),
+                key=lambda x: x['score'], reverse=True
+            )
+        
+        visuals = TranscriptIndex.parse(visuals_description)
+        windows = self._split_windows(transcript, window_seconds, overlap_seconds)
+        errors = []
+        
+        def analyze(window):
+            start, end = window
+            try:
+                return self._analyze_window(
+                    transcript.slice_text(start, end), visuals.slice_text(start, end), (start, end)
+                )
+            except Exception as e:
+                print(f"Error analyzing window {start:.0f}s-{end:.0f}s: {e}")
+                if isinstance(e, LLMCallError):
+                    errors.append(e)
+                return []
+        
+        workers = min(self.max_concurrency, len(windows))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            candidates = [moment for moments in executor.map(analyze, windows) for moment in moments]
+        
+        if len(errors) == len(windows):
+            raise errors[0]
+        
+        merged = self._merge_candidates(self.snap_moments(candidates, transcript))
+        return self._rerank_moments(merged, top_k)
+    
+    def stream_viral_moments(self, transcription: str, visuals_description: str = "",
+                             keep_ratio: float = None) -> Iterator[Dict]:
+        """
+        Yield viral moments one by one while the model is still generating.
+        
+        The completion is streamed and each moment object is parsed as soon
+        as it closes, so callers can start cutting the first clip before the
+        last one is written. Moments arrive in generation order, not by score.
+        
+        Args:
+            transcription: Transcription with timestamps in format "[00:00:00] text"
+            visuals_description: Description of visual elements with timestamps
+            keep_ratio: Fraction of transcript segments the local pre-filter keeps
+                before prompting. If None, uses PREFILTER_KEEP_RATIO (default 1, no pruning).
+            
+        Yields:
+            Viral moments with start_time, end_time, score, reason and hook
+            
+        Raises:
+            LLMCallError: When the Groq call fails before any moment was
+                yielded and there is no fallback analyzer
+        """
+        transcript = TranscriptIndex.parse(transcription)
+        prompt_transcription, prompt_visuals = self._prefilter(transcription, visuals_description, keep_ratio)
+        messages = [
+            {"role": "system", "content": ANALYSIS_SYSTEM},
+            {"role": "user", "content": self._analysis_prompt(prompt_transcription, prompt_visuals)}
+        ]
+        key = ResponseCache.make_key(ANALYSIS_MODEL, messages, 0.7, 2000)
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                try:
+                    moments = [item for item in self._parse_json_content(cached) if isinstance(item, dict)]
+                except ValueError:
+                    moments = None  # Unparseable entry, fetch a fresh response
+                if moments:
+                    yield from self.snap_moments(moments, transcript)
+                    return
+        
+        yielded = 0
+        parts = []
+        try:
+            stream = self.policy.call(
+                lambda timeout: self.client.chat.completions.create(
+                    messages=messages,
+                    model=ANALYSIS_MODEL,
+                    temperature=0.7,
+                    max_tokens=2000,
+                    stream=True,
+                    timeout=timeout
+                ),
+                label=ANALYSIS_MODEL,
+                hedge=False
+            )
+            parser = JSONArrayStream()
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                parts.append(delta)
+                moments = [item for item in parser.feed(delta) if isinstance(item, dict)]
+                for moment in self.snap_moments(moments, transcript):
+                    yielded += 1
+                    yield moment
+        
+        except Exception as e:
+            print(f"Error streaming viral moments: {e}")
+            if not yielded and self.fallback is not None:
+                yield from self.fallback.analyze_transcription(transcription, visuals_description)
+            elif not yielded and isinstance(e, LLMCallError):
+                raise
+            return
+        
+        if self.cache is not None and yielded:
+            self.cache.put(key, ''.join(parts))
+    
+    def _analyze_window(self, transcription: str, visuals_description: str = "",
+                        time_range: Tuple[float, float] = None) -> List[Dict]:
+        """
+        Ask Groq for viral moments in one transcription (or window of one).
+        
+        Args:
+            transcription: Transcription text
+            visuals_description: Visual descriptions for the same span
+            time_range: Optional (start, end) in seconds the moments must fall within
+            
+        Returns:
+            Unsorted list of viral moments
         """
-        prompt = f"""Analyze the following video transcription and visual descriptions to identify the most viral moments.
+        return self._chat(
+            ANALYSIS_SYSTEM,
+            self._analysis_prompt(transcription, visuals_description, time_range),
+            model=ANALYSIS_MODEL,
+            temperature=0.7,
+            max_tokens=2000,
+            parse=self._parse_json_content
+        )
+    
+    @staticmethod
+    def _analysis_prompt(transcription: str, visuals_description: str = "",
+                         time_range: Tuple[float, float] = None) -> str:
+        """Build the viral moment prompt for a transcription or window of one."""
+        window_note = ""
+        if time_range is not None:
+            window_note = (
+                f"\nThis is the part of a longer video from {time_range[0]:.0f}s to "
+                f"{time_range[1]:.0f}s. Only return moments inside that range, and at "
+                f"most 3 of them.\n"
+            )
         
+        return f"""Analyze the following video transcription and visual descriptions to identify the most viral moments.
+        {window_note}
 Transcription:
 {transcription}
 
@@ -62,38 +515,135 @@ Return ONLY a JSON array with this exact structure:
   }}
 ]
 """
+    
+    @staticmethod
+    def _split_windows(transcript: TranscriptIndex, window_seconds: float,
+                       overlap_seconds: float) -> List[Tuple[float, float]]:
+        """
+        Cover the transcript with overlapping (start, end) windows.
+        """
+        step = max(1.0, window_seconds - overlap_seconds)
+        windows = []
+        start = transcript.starts[0]
+        while True:
+            windows.append((start, start + window_seconds))
+            if start + window_seconds >= transcript.duration:
+                break
+            start += step
+        return windows
+    
+    @staticmethod
+    def snap_moments(viral_moments: List[Dict], transcript: TranscriptIndex,
+                     tolerance: float = 2.0) -> List[Dict]:
+        """
+        Validate LLM-returned moment times against the transcript.
         
-        try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert video editor specializing in viral social media content. Always respond with valid JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.2-90b-text-preview",  # Using Groq's reasoning model
-                temperature=0.7,
-                max_tokens=2000
+        Times are clamped to the transcript and snapped to the nearest
+        segment boundary within tolerance; moments with unusable times are
+        dropped. Transcripts without timestamps are returned unchanged.
+        
+        Args:
+            viral_moments: Moments with start_time and end_time
+            transcript: Index of the analyzed transcript
+            tolerance: Maximum distance to snap, in seconds
+            
+        Returns:
+            Moments with validated times
+        """
+        if not transcript.has_timestamps:
+            return viral_moments
+        
+        snapped = []
+        for moment in viral_moments:
+            times = transcript.snap_range(
+                moment.get('start_time'), moment.get('end_time'), tolerance
             )
+            if times is None:
+                print(f"Dropping moment with invalid times: {moment.get('start_time')}-{moment.get('end_time')}")
+                continue
+            snapped.append({**moment, 'start_time': times[0], 'end_time': times[1]})
+        return snapped
+    
+    @staticmethod
+    def _merge_candidates(candidates: List[Dict]) -> List[Dict]:
+        """
+        Collapse candidates that cover mostly the same span, keeping the best score.
+        
+        Windows overlap, so the same moment is often found twice.
+        """
+        merged = []
+        for moment in sorted(candidates, key=lambda x: x.get('score', 0), reverse=True):
+            try:
+                start, end = float(moment['start_time']), float(moment['end_time'])
+            except (KeyError, TypeError, ValueError):
+                continue
             
-            content = response.choices[0].message.content.strip()
-            # Extract JSON from markdown code blocks if present
-            if content.startswith("```"):
-                lines = content.split('\n')
-                content = '\n'.join(lines[1:-1]) if len(lines) > 2 else content
-                if content.startswith('json'):
-                    content = content[4:].strip()
-            
-            viral_moments = json.loads(content)
-            return sorted(viral_moments, key=lambda x: x['score'], reverse=True)
+            duplicate = False
+            for kept in merged:
+                overlap = min(end, kept['end_time']) - max(start, kept['start_time'])
+                shorter = min(end - start, kept['end_time'] - kept['start_time'])
+                if shorter > 0 and overlap / shorter > 0.5:
+                    duplicate = True
+                    break
+            
+            if not duplicate:
+                merged.append(moment)
+        return merged
+    
+    def _rerank_moments(self, candidates: List[Dict], top_k: int) -> List[Dict]:
+        """
+        Pick the final top_k candidates with one short Groq call.
         
+        Only the candidate summaries are sent, not the transcript. Falls
+        back to the per-window scores if the call fails.
+        
+        Args:
+            candidates: Merged candidate moments
+            top_k: Number of moments to return
+            
+        Returns:
+            Final moments sorted best first
+        """
+        by_score = sorted(candidates, key=lambda x: x.get('score', 0), reverse=True)
+        if len(candidates) <= top_k:
+            return by_score
+        
+        summary = json.dumps([
+            {
+                'id': i,
+                'start_time': moment['start_time'],
+                'end_time': moment['end_time'],
+                'score': moment.get('score'),
+                'reason': moment.get('reason', '')
+            }
+            for i, moment in enumerate(candidates)
+        ])
+        prompt = f"""These candidate viral moments were found in different parts of one long video:
+{summary}
+
+Pick the {top_k} moments that together make the strongest social media compilation.
+
+Return ONLY a JSON array of their ids, best first, e.g. [3, 0, 7]"""
+        
+        try:
+            ids = self._chat(
+                ANALYSIS_SYSTEM,
+                prompt,
+                model=ANALYSIS_MODEL,
+                temperature=0.2,
+                max_tokens=100,
+                parse=self._parse_json_content
+            )
+            ranked = []
+            for i in ids:
+                if isinstance(i, int) and 0 <= i < len(candidates) and candidates[i] not in ranked:
+                    ranked.append(candidates[i])
+            if ranked:
+                return ranked[:top_k]
         except Exception as e:
-            print(f"Error analyzing transcription: {e}")
-            return []
+            print(f"Error reranking moments, using window scores: {e}")
+        
+        return by_score[:top_k]
     
     def generate_tts_script(self, viral_moments: List[Dict], style: str = "engaging") -> str:
         """
@@ -105,6 +655,9 @@ Return ONLY a JSON array with this exact structure:
             
         Returns:
             TTS script text
+            
+        Raises:
+            LLMCallError: When the Groq call fails and there is no fallback analyzer
         """
         moments_summary = "\n".join([
             f"- Moment {i+1} ({m['start_time']}s-{m['end_time']}s): {m['reason']}"
@@ -127,26 +680,20 @@ Create a 15-30 second script that:
 Return ONLY the script text, no additional formatting or explanations."""
 
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a viral video content creator. Write punchy, engaging scripts."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.2-90b-text-preview",
+            return self._chat(
+                TTS_SYSTEM,
+                prompt,
+                model=ANALYSIS_MODEL,
                 temperature=0.8,
                 max_tokens=500
             )
-            
-            return response.choices[0].message.content.strip()
         
         except Exception as e:
             print(f"Error generating TTS script: {e}")
+            if self.fallback is not None:
+                return self.fallback.generate_tts_script(viral_moments, style)
+            if isinstance(e, LLMCallError):
+                raise
             return "Check out these incredible moments!"
     
     def generate_onscreen_text(self, moment: Dict) -> List[Dict]:
@@ -158,6 +705,9 @@ Return ONLY the script text, no additional formatting or explanations."""
             
         Returns:
             List of text overlays with timing and position
+            
+        Raises:
+            LLMCallError: When the Groq call fails and there is no fallback analyzer
         """
         prompt = f"""Create 1-3 punchy on-screen text overlays for this viral moment:
 
@@ -181,32 +731,175 @@ Return ONLY a JSON array:
 ]"""
 
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a viral video editor. Create attention-grabbing text overlays. Always respond with valid JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.2-90b-text-preview",
+            return self._chat(
+                OVERLAY_SYSTEM,
+                prompt,
+                model=ANALYSIS_MODEL,
                 temperature=0.8,
-                max_tokens=500
+                max_tokens=500,
+                parse=self._parse_json_content
             )
-            
-            content = response.choices[0].message.content.strip()
-            # Extract JSON from markdown code blocks if present
-            if content.startswith("```"):
-                lines = content.split('\n')
-                content = '\n'.join(lines[1:-1]) if len(lines) > 2 else content
-                if content.startswith('json'):
-                    content = content[4:].strip()
-            
-            return json.loads(content)
         
         except Exception as e:
             print(f"Error generating on-screen text: {e}")
+            if self.fallback is not None:
+                return self.fallback.generate_onscreen_text(moment)
+            if isinstance(e, LLMCallError):
+                raise
             return [{"text": moment.get('hook', 'Watch this!'), "delay": 0, "duration": 2.0, "position": "top"}]
+    
+    def generate_onscreen_text_batch(self, viral_moments: List[Dict]) -> List[List[Dict]]:
+        """
+        Generate on-screen text for every moment in a single request.
+        
+        Entries missing from the reply or failing validation fall back to
+        one generate_onscreen_text call per affected moment.
+        
+        Args:
+            viral_moments: List of viral moments
+            
+        Returns:
+            Text overlays for each moment, in the same order
+            
+        Raises:
+            LLMCallError: When the Groq call fails, other than with an
+                unparseable reply, and there is no fallback analyzer
+        """
+        if not viral_moments:
+            return []
+        
+        moments_summary = json.dumps([
+            {
+                "moment": i,
+                "reason": moment.get('reason', ''),
+                "duration": round(moment['end_time'] - moment['start_time'], 1),
+                "hook": moment.get('hook', '')
+            }
+            for i, moment in enumerate(viral_moments)
+        ], indent=1)
+        
+        prompt = f"""Create 1-3 punchy on-screen text overlays for each of these viral moments:
+
+{moments_summary}
+
+Generate text that:
+- Is short and impactful (3-8 words)
+- Appears at key moments (delay is seconds from the start of the moment)
+- Uses social media language
+
+Return ONLY a JSON array with one entry per moment, in the same order:
+[
+  {{
+    "moment": 0,
+    "overlays": [
+      {{"text": "WAIT FOR IT...", "delay": 0, "duration": 2.0, "position": "top"}}
+    ]
+  }}
+]"""
+        
+        entries = []
+        try:
+            entries = self._chat(
+                OVERLAY_SYSTEM,
+                prompt,
+                model=ANALYSIS_MODEL,
+                temperature=0.8,
+                max_tokens=min(4000, 200 + 250 * len(viral_moments)),
+                parse=self._parse_json_content
+            )
+        except Exception as e:
+            print(f"Error generating batched on-screen text: {e}")
+            if self.fallback is None and isinstance(e, LLMCallError) and e.kind != 'parse':
+                raise
+        
+        results: List[Optional[List[Dict]]] = [None] * len(viral_moments)
+        for position, entry in enumerate(entries):
+            index, overlays = position, entry
+            if isinstance(entry, dict):
+                index, overlays = entry.get('moment', position), entry.get('overlays')
+            if isinstance(index, int) and 0 <= index < len(viral_moments) and results[index] is None:
+                results[index] = self._validate_overlays(overlays, viral_moments[index])
+        
+        missing = [i for i, overlays in enumerate(results) if overlays is None]
+        if missing:
+            print(f"Generating on-screen text separately for {len(missing)} moment(s)")
+            workers = min(self.max_concurrency, len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                fallbacks = executor.map(
+                    lambda i: self.generate_onscreen_text(viral_moments[i]), missing
+                )
+                for i, overlays in zip(missing, fallbacks):
+                    results[i] = overlays
+        
+        return results
+    
+    @staticmethod
+    def _validate_overlays(overlays, moment: Dict) -> Optional[List[Dict]]:
+        """
+        Check and normalize the overlays generated for one moment.
+        
+        Overlays without text or with unusable timing are dropped, timing is
+        clamped to the moment and unknown positions become 'top'.
+        
+        Args:
+            overlays: Overlays from the model reply
+            moment: The moment they belong to
+            
+        Returns:
+            Normalized overlays, or None if none are usable
+        """
+        if not isinstance(overlays, list):
+            return None
+        
+        length = moment['end_time'] - moment['start_time']
+        valid = []
+        for overlay in overlays:
+            if not isinstance(overlay, dict) or not str(overlay.get('text') or '').strip():
+                continue
+            try:
+                delay = max(0.0, float(overlay.get('delay', 0)))
+                duration = float(overlay.get('duration', 2.0))
+            except (TypeError, ValueError):
+                continue
+            if duration <= 0 or delay >= length:
+                continue
+            
+            position = overlay.get('position', 'top')
+            valid.append({
+                "text": str(overlay['text']).strip(),
+                "delay": delay,
+                "duration": min(duration, length - delay),
+                "position": position if position in ('top', 'center', 'bottom') else 'top'
+            })
+        
+        return valid or None
+    
+    def generate_moment_content(self, viral_moments: List[Dict], style: str = "engaging",
+                                include_tts: bool = True) -> Tuple[List[List[Dict]], Optional[str]]:
+        """
+        Generate text overlays for every moment and the TTS script concurrently.
+        
+        Overlays for all moments come from one batched request, which runs
+        alongside the TTS script request; wall time approaches that of the
+        slower call.
+        
+        Args:
+            viral_moments: List of viral moments
+            style: Style of narration (engaging, dramatic, casual)
+            include_tts: Whether to generate the TTS script as well
+            
+        Returns:
+            Tuple of (text overlays per moment, TTS script or None)
+            
+        Raises:
+            LLMCallError: When either request fails and there is no fallback analyzer
+        """
+        if not include_tts:
+            return self.generate_onscreen_text_batch(viral_moments), None
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            tts_future = executor.submit(self.generate_tts_script, viral_moments, style)
+            text_overlays = self.generate_onscreen_text_batch(viral_moments)
+            tts_script = tts_future.result()
+        
+        return text_overlays, tts_script